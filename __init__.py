@@ -1,7 +1,22 @@
 import os
-
-from .typical_frames_main import frame_info
-from .typical_frames_main import load_corpus
-from .typical_frames_main import contrastive_analysis
+import importlib
 
 dir_path = os.path.dirname(os.path.realpath(__file__))
+
+#the public functions are imported on first use, so that importing the package does not load lxml, numpy or scipy
+_LAZY_ATTRIBUTES = {'frame_info': 'typical_frames_main',
+                    'load_corpus': 'typical_frames_main',
+                    'contrastive_analysis': 'typical_frames_main'}
+
+__all__ = ['dir_path'] + list(_LAZY_ATTRIBUTES)
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(f".{_LAZY_ATTRIBUTES[name]}", __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
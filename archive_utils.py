@@ -0,0 +1,146 @@
+import gzip
+import os
+import tarfile
+import time
+import zipfile
+from collections import OrderedDict
+from contextlib import contextmanager
+
+MEMBER_SEPARATOR = '::' #a NAF file inside an archive is referred to as <archive path>::<member name>
+NAF_EXTENSIONS = ('.naf', '.naf.gz', '.naf.zst')
+ARCHIVE_EXTENSIONS = ('.tar', '.tar.gz', '.tgz', '.zip')
+
+MAX_OPEN_ARCHIVES = 8 #the least recently used archive is closed when another one is opened
+_ARCHIVES = OrderedDict() #(process id, archive path) -> (mtime, size, archive, members), every process opens its own archives
+
+def split_reference(naf_root):
+    """returns the path of the file on disk and the name of the member in the archive (None for a NAF file on disk)"""
+    if MEMBER_SEPARATOR in naf_root:
+        archive_path, member = naf_root.split(MEMBER_SEPARATOR, 1)
+        return archive_path, member
+    return naf_root, None
+
+def member_reference(archive_path, member):
+    """returns the reference to a NAF file inside an archive"""
+    return f"{archive_path}{MEMBER_SEPARATOR}{member}"
+
+def is_naf_name(name):
+    """returns whether a file name is a (compressed) NAF file"""
+    return name.endswith(NAF_EXTENSIONS)
+
+def is_archive_name(name):
+    """returns whether a file name is a tar or zip archive"""
+    return name.endswith(ARCHIVE_EXTENSIONS)
+
+def doc_name(name):
+    """returns the name of a NAF file without folders and without the NAF and compression extensions"""
+    name = os.path.basename(name)
+    for extension in sorted(NAF_EXTENSIONS, key=len, reverse=True):
+        if name.endswith(extension):
+            return name[:-len(extension)]
+    return name
+
+def zstd_reader(fileobj):
+    """returns a stream that decompresses a zstandard compressed file object. requires the zstandard package."""
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("reading .zst files requires the zstandard package: pip install zstandard")
+    return zstandard.ZstdDecompressor().stream_reader(fileobj, closefd=True)
+
+def decompress(fileobj, name):
+    """wrap a binary file object in a decompression stream according to the extension of name"""
+    if name.endswith('.gz') or name.endswith('.tgz'):
+        return gzip.GzipFile(fileobj=fileobj, mode='rb')
+    if name.endswith('.zst'):
+        return zstd_reader(fileobj)
+    return fileobj
+
+def open_archive(archive_path):
+    """
+    returns the opened archive and a dictionary with its members by name. the archive is kept open per process and
+    reopened when it changes on disk, so that the members are read by offset instead of by scanning the archive.
+    at most MAX_OPEN_ARCHIVES archives are kept open, see close_archives.
+    the members of a .tar.gz archive are found by decompressing it from the start; use an uncompressed tar of compressed NAF files
+    or a zip archive for fast random access.
+    """
+    stat = os.stat(archive_path)
+    key = (os.getpid(), os.path.abspath(archive_path))
+    cached = _ARCHIVES.get(key)
+    if cached != None:
+        if cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            _ARCHIVES.move_to_end(key)
+            return cached[2], cached[3]
+        del _ARCHIVES[key]
+        cached[2].close()
+
+    if archive_path.endswith('.zip'):
+        archive = zipfile.ZipFile(archive_path)
+        members = {info.filename: info for info in archive.infolist() if not info.is_dir()}
+    else:
+        archive = tarfile.open(archive_path, mode='r:*')
+        members = {info.name: info for info in archive.getmembers() if info.isfile()}
+    _ARCHIVES[key] = (stat.st_mtime_ns, stat.st_size, archive, members)
+    while len(_ARCHIVES) > MAX_OPEN_ARCHIVES:
+        evicted_key, evicted = _ARCHIVES.popitem(last=False)
+        evicted[2].close()
+    return archive, members
+
+def close_archives():
+    """
+    close all archives that open_archive keeps open. a forked worker process closes only its own copy of the archives of its parent.
+    """
+    while _ARCHIVES:
+        key, cached = _ARCHIVES.popitem()
+        cached[2].close()
+
+def archive_members(archive_path):
+    """returns the names of the NAF files in an archive"""
+    archive, members = open_archive(archive_path)
+    return [name for name in members if is_naf_name(name)]
+
+@contextmanager
+def open_naf(naf_root):
+    """
+    open a NAF file for reading as a binary stream. naf_root is the path to a .naf, .naf.gz or .naf.zst file,
+    or a reference <archive>::<member> to a NAF file in a tar or zip archive. the content is decompressed while it is read,
+    nothing is extracted to disk.
+    :param naf_root: path or reference to a NAF file
+    :type naf_root: string
+    """
+    path, member = split_reference(naf_root)
+    if member == None:
+        with open(path, 'rb') as raw:
+            stream = decompress(raw, path)
+            yield stream
+        return
+
+    archive, members = open_archive(path)
+    if member not in members:
+        raise FileNotFoundError(f"{member} not found in {path}")
+    if isinstance(archive, zipfile.ZipFile):
+        raw = archive.open(members[member])
+    else:
+        raw = archive.extractfile(members[member])
+    with raw:
+        yield decompress(raw, member)
+
+def naf_stat(naf_root):
+    """returns the modification time in nanoseconds and the size of a NAF file, or of the member of an archive"""
+    path, member = split_reference(naf_root)
+    if member == None:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    archive, members = open_archive(path)
+    info = members[member]
+    if isinstance(info, zipfile.ZipInfo):
+        mtime = time.mktime(info.date_time + (0, 0, -1))
+        return int(mtime) * 10 ** 9, info.file_size
+    return int(info.mtime) * 10 ** 9, info.size
+
+def naf_abspath(naf_root):
+    """returns naf_root with an absolute path to the file on disk"""
+    path, member = split_reference(naf_root)
+    if member == None:
+        return os.path.abspath(path)
+    return member_reference(os.path.abspath(path), member)
@@ -0,0 +1,206 @@
+import numpy as np
+from collections import Counter
+from scipy.sparse import csr_matrix
+from .corpus_utils import iter_parallel_map
+from .fficf_utils import frames_from_dict, ff_icf_matrix
+from .vocab_utils import FrameVocabulary
+
+def document_frame_matrix(collections):
+    """
+    count the frames of every document once.
+    returns the event types, the frame vocabulary, a document x frame csr count matrix and the first row of each event type.
+    the documents of event type i are rows offsets[i] to offsets[i+1].
+    :param collections: collection of collections of dictionaries per event type
+    :type collections: dictionary
+    """
+    event_types = list(collections)
+    counters = []
+    offsets = [0]
+
+    for event_type in event_types:
+        for info_dict in collections[event_type]:
+            counters.append(Counter(frames_from_dict(info_dict)))
+        offsets.append(len(counters))
+
+    vocabulary = FrameVocabulary.from_counters(counters)
+    doc_matrix = vocabulary.count_matrix(counters)
+    return event_types, vocabulary, doc_matrix, np.array(offsets)
+
+def draw_samples(rng, offsets, sample_size, n_replicates, replace):
+    """returns an array of shape (replicates, event types, sample size) with document row indices"""
+    n_event_types = len(offsets) - 1
+    samples = np.empty((n_replicates, n_event_types, sample_size), dtype=np.int64)
+
+    for position in range(n_event_types):
+        start, end = offsets[position], offsets[position + 1]
+        if replace:
+            samples[:, position, :] = rng.integers(start, end, size=(n_replicates, sample_size))
+        else:
+            samples[:, position, :] = start + rng.random((n_replicates, end - start)).argsort(axis=1)[:, :sample_size]
+    return samples
+
+WORKER_DOCUMENTS = {} #the document matrix and event type offsets of a process, set once per process by share_documents
+
+def share_documents(doc_matrix, offsets):
+    """initializer of the processes of bootstrap_ff_icf: keep the document matrix and the offsets, so they are not sent with every batch"""
+    WORKER_DOCUMENTS['doc matrix'] = doc_matrix
+    WORKER_DOCUMENTS['offsets'] = offsets
+
+def score_replicates(task):
+    """
+    score one batch of replicates of the documents shared by share_documents.
+    the sampled documents of all replicates are summed into event type frame counts with one sparse matrix product.
+    returns a float32 array of shape (replicates, event types, frames) with the ff*icf scores of each replicate.
+    :param task: tuple of the sample size, sampling with replacement, the seed sequence and the number of replicates
+    :type task: tuple
+    """
+    sample_size, replace, seed_sequence, n_replicates = task
+    doc_matrix = WORKER_DOCUMENTS['doc matrix']
+    offsets = WORKER_DOCUMENTS['offsets']
+    rng = np.random.default_rng(seed_sequence)
+    samples = draw_samples(rng, offsets, sample_size, n_replicates, replace)
+    n_event_types = len(offsets) - 1
+
+    n_rows = n_replicates * n_event_types
+    rows = np.repeat(np.arange(n_rows), sample_size)
+    selection = csr_matrix((np.ones(rows.size), (rows, samples.ravel())), shape=(n_rows, doc_matrix.shape[0]))
+    counts = (selection @ doc_matrix).toarray().reshape(n_replicates, n_event_types, doc_matrix.shape[1])
+
+    scores = ff_icf_matrix(counts, total_n_docs=n_event_types * sample_size)
+    return scores.astype(np.float32)
+
+class ScoreStatistics(object):
+    """
+    Running statistics of the scores of the replicates per event type and frame, updated one batch of replicates at a time, so the scores
+    of all replicates are never held at once. the mean and variance are merged per batch and are exact. the percentiles are read from a
+    histogram of the scores over [0, 1] with the given number of bins and are within 1 / bins of the exact percentiles.
+    nan scores (frames that do not occur in a replicate) are left out.
+    """
+    def __init__(self, shape, bins=200):
+        self.bins = bins
+        self.n = np.zeros(shape, dtype=np.int64)
+        self.mean = np.zeros(shape)
+        self.squared_deviations = np.zeros(shape)
+        self.minimum = np.full(shape, np.inf)
+        self.maximum = np.full(shape, -np.inf)
+        self.histogram = np.zeros(shape + (bins,), dtype=np.int32)
+
+    def add(self, scores):
+        """
+        add a batch of replicates.
+        :param scores: array of shape (replicates, event types, frames) with the scores of the batch
+        :type scores: numpy.ndarray
+        """
+        scores = scores.astype(np.float64)
+        scored = ~np.isnan(scores)
+        n = scored.sum(axis=0)
+        values = np.where(scored, scores, 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            batch_mean = values.sum(axis=0) / n
+            batch_squared_deviations = np.where(scored, (values - batch_mean) ** 2, 0.0).sum(axis=0)
+            total = self.n + n
+            delta = batch_mean - self.mean
+            #merge the mean and the sum of squared deviations of the batch with those of the earlier batches
+            self.mean = np.where(n > 0, self.mean + delta * n / total, self.mean)
+            self.squared_deviations = np.where(n > 0, self.squared_deviations + batch_squared_deviations + delta ** 2 * self.n * n / total,
+                                               self.squared_deviations)
+        self.n = total
+        self.minimum = np.fmin(self.minimum, np.fmin.reduce(scores, axis=0))
+        self.maximum = np.fmax(self.maximum, np.fmax.reduce(scores, axis=0))
+
+        bin_ids = np.clip((values * self.bins).astype(np.int64), 0, self.bins - 1)
+        cell_ids = np.arange(self.n.size).reshape(self.n.shape)
+        flat_ids = (cell_ids * self.bins + bin_ids)[scored]
+        self.histogram += np.bincount(flat_ids, minlength=self.histogram.size).reshape(self.histogram.shape)
+
+    def variance(self):
+        """returns the sample variance (ddof=1) per event type and frame, nan if a frame is scored in fewer than two replicates"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.n > 1, self.squared_deviations / (self.n - 1), np.nan)
+
+    def percentile(self, q):
+        """
+        returns the q-th percentile per event type and frame, interpolated linearly between order statistics like numpy.nanpercentile.
+        every order statistic is the center of its histogram bin, clipped to the minimum and maximum score of the cell.
+        :param q: percentile between 0 and 100
+        :type q: float
+        """
+        cumulative = self.histogram.cumsum(axis=-1, dtype=np.int32)
+        with np.errstate(invalid='ignore'):
+            position = (self.n - 1) * q / 100
+        lower_rank = np.floor(np.maximum(position, 0))
+        upper_rank = np.minimum(lower_rank + 1, np.maximum(self.n - 1, 0))
+
+        def order_statistic(rank):
+            bin_ids = (cumulative <= rank[..., None]).sum(axis=-1)
+            return np.clip((bin_ids + 0.5) / self.bins, self.minimum, self.maximum)
+
+        lower = order_statistic(lower_rank)
+        upper = order_statistic(upper_rank)
+        values = lower + (position - lower_rank) * (upper - lower)
+        return np.where(self.n > 0, values, np.nan)
+
+def bootstrap_ff_icf(collections, n_replicates=1000, seed=None, confidence=0.95, replace=True, batch_size=50, workers=1, bins=200, verbose=0):
+    """
+    resample the corpus n_replicates times and compute the ff*icf scores of every replicate.
+    like sample_corpus, every replicate draws as many documents per event type as the smallest event type has.
+    the replicates are drawn from seeded generators per batch, so results only depend on the seed and the batch size, not on the number of workers.
+    the document matrix is sent to every process once and the statistics are updated per batch, so the scores of all replicates are never held at once.
+    returns a dictionary with event type as key and a dictionary with the mean, variance and confidence interval of the score per frame as value.
+    frames that do not occur in a replicate are left out of the statistics of that replicate.
+    :param collections: collection of collections of dictionaries per event type
+    :param n_replicates: the number of replicates
+    :param seed: seed of the random generator
+    :param confidence: the confidence level of the percentile interval
+    :param replace: sample documents with replacement (bootstrap). without replacement (like sample_corpus) every replicate has all documents
+    of the smallest event type, so its scores vary only through the other event types and may have confidence intervals of width zero
+    :param batch_size: the number of replicates scored at once
+    :param workers: the number of processes over which the batches are distributed
+    :param bins: the number of histogram bins of the scores, the confidence interval is within 1 / bins of the exact percentile interval
+    :type collections: dictionary
+    :type n_replicates: integer
+    :type seed: integer
+    :type confidence: float
+    :type replace: boolean
+    :type batch_size: integer
+    :type workers: integer
+    :type bins: integer
+    """
+    event_types, vocabulary, doc_matrix, offsets = document_frame_matrix(collections)
+    sample_size = int(np.diff(offsets).min())
+    assert sample_size > 0, "an event type without documents cannot be sampled"
+
+    batch_sizes = [min(batch_size, n_replicates - start) for start in range(0, n_replicates, batch_size)]
+    seed_sequences = np.random.SeedSequence(seed).spawn(len(batch_sizes))
+    tasks = [(sample_size, replace, seed_sequence, size) for seed_sequence, size in zip(seed_sequences, batch_sizes)]
+    statistics = ScoreStatistics((len(event_types), len(vocabulary)), bins=bins)
+    for scores in iter_parallel_map(score_replicates, tasks, workers=workers, initializer=share_documents, initargs=(doc_matrix, offsets)):
+        statistics.add(scores)
+    WORKER_DOCUMENTS.clear()
+
+    alpha = (1 - confidence) / 2
+    mean = np.where(statistics.n > 0, statistics.mean, np.nan)
+    variance = statistics.variance()
+    lower = statistics.percentile(alpha * 100)
+    upper = statistics.percentile((1 - alpha) * 100)
+    n_scored = statistics.n
+
+    bootstrap_dict = {}
+
+    for position, event_type in enumerate(event_types):
+        frame_dict = {}
+        for frame_id, frame in enumerate(vocabulary.labels):
+            frame_dict[frame] = {'mean': float(mean[position, frame_id]),
+                                    'variance': float(variance[position, frame_id]),
+                                    'ci lower': float(lower[position, frame_id]),
+                                    'ci upper': float(upper[position, frame_id]),
+                                    'replicates': int(n_scored[position, frame_id])}
+        bootstrap_dict[event_type] = frame_dict
+
+    if verbose >= 2:
+        print(f"scored {n_replicates} replicates of {sample_size} documents per event type")
+    if verbose >= 3:
+        for event_type, frame_dict in bootstrap_dict.items():
+            top = sorted(frame_dict.items(), key=lambda item: item[1]['mean'], reverse=True)[:3]
+            print(f"{event_type}: top mean ranking: {[(frame, round(stats['mean'], 3)) for frame, stats in top]}")
+    return bootstrap_dict
@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+from .xml_utils import EXTRACTOR_VERSION
+from .archive_utils import open_naf, naf_stat, naf_abspath
+
+class FrameInfoCache(object):
+    """
+    On-disk cache of frame_info results with one json file per document.
+    With key='stat' an entry is found by the path of the NAF file and is valid as long as the mtime and size of the file are unchanged.
+    For a NAF file in an archive, the path is the archive reference and the mtime and size are those of the member.
+    With key='content' an entry is found by the sha1 digest of the content of the NAF file, so renamed or copied files are hits as well.
+    Entries written by another extractor version are never used.
+    """
+    def __init__(self, cache_folder, key='stat'):
+        assert key in {'stat', 'content'}, f"unknown cache key {key}"
+        self.cache_folder = cache_folder
+        self.key = key
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_folder, exist_ok=True)
+
+    def fingerprint(self, naf_root):
+        """returns the cache file name and the fingerprint that validates the entry of a NAF file"""
+        if self.key == 'content':
+            digest = hashlib.sha1()
+            with open_naf(naf_root) as infile: #the decompressed content, so a compressed copy is a hit as well
+                for block in iter(lambda: infile.read(1 << 20), b''):
+                    digest.update(block)
+            name = digest.hexdigest()
+            fingerprint = {'version': EXTRACTOR_VERSION, 'sha1': name}
+        else:
+            mtime, size = naf_stat(naf_root)
+            path = naf_abspath(naf_root)
+            name = hashlib.sha1(path.encode('utf-8')).hexdigest()
+            fingerprint = {'version': EXTRACTOR_VERSION, 'path': path, 'mtime': mtime, 'size': size}
+        entry_path = os.path.join(self.cache_folder, name[:2], f"{name}.json")
+        return entry_path, fingerprint
+
+    def lookup(self, naf_root):
+        """
+        returns the fingerprint of a NAF file and its cached frame info (None on a miss). the fingerprint is passed on to put,
+        so that it is computed once per document. a NAF file that cannot be read has no fingerprint (None) and is a miss.
+        """
+        try:
+            fingerprint = self.fingerprint(naf_root)
+        except (OSError, KeyError, ValueError):
+            self.misses += 1
+            return None, None
+        return fingerprint, self.get(naf_root, fingerprint=fingerprint)
+
+    def get(self, naf_root, fingerprint=None):
+        """
+        returns the cached frame info of a NAF file or None if there is no valid entry.
+        a NAF file that cannot be read and a truncated or corrupt entry are misses.
+        :param naf_root: path or reference to a NAF file
+        :param fingerprint: the result of self.fingerprint(naf_root), computed if None
+        :type naf_root: string
+        :type fingerprint: tuple
+        """
+        try:
+            if fingerprint == None:
+                fingerprint = self.fingerprint(naf_root)
+            entry_path, entry_fingerprint = fingerprint
+            with open(entry_path, 'r') as infile:
+                entry = json.load(infile)
+            if entry['fingerprint'] == entry_fingerprint:
+                frame_info_dict = dict(entry['frame info'])
+                self.hits += 1
+                return frame_info_dict
+        except (OSError, ValueError, KeyError, TypeError): #no entry, an unreadable NAF file or a corrupt entry
+            pass
+        self.misses += 1
+        return None
+
+    def put(self, naf_root, frame_info_dict, fingerprint=None):
+        """
+        stores the frame info of a NAF file. The entry is written to a temporary file first, so readers never see half an entry.
+        :param naf_root: path or reference to a NAF file
+        :param frame_info_dict: the frame info of the NAF file
+        :param fingerprint: the fingerprint returned by lookup, computed if None
+        :type naf_root: string
+        :type frame_info_dict: dictionary
+        :type fingerprint: tuple
+        """
+        if fingerprint == None:
+            fingerprint = self.fingerprint(naf_root)
+        entry_path, entry_fingerprint = fingerprint
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        entry = {'fingerprint': entry_fingerprint, 'frame info': list(frame_info_dict.items())}
+        temp_path = f"{entry_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as outfile:
+            json.dump(entry, outfile)
+        os.replace(temp_path, entry_path)
+
+    def get_frame_count(self, naf_root, fingerprint):
+        """
+        returns the number of annotated frames that prefilter_collections counted in a NAF file, or None if there is no valid entry.
+        the count is stored next to the frame info entry with the same fingerprint, so that documents below the frame threshold,
+        which are never extracted, are not counted again on a rerun.
+        """
+        try:
+            entry_path, entry_fingerprint = fingerprint
+            with open(f"{entry_path[:-len('.json')]}.count.json", 'r') as infile:
+                entry = json.load(infile)
+            if entry['fingerprint'] == entry_fingerprint:
+                return int(entry['frame count'])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return None
+
+    def put_frame_count(self, naf_root, frame_count, fingerprint):
+        """stores the number of annotated frames of a NAF file under the fingerprint returned by lookup"""
+        entry_path, entry_fingerprint = fingerprint
+        count_path = f"{entry_path[:-len('.json')]}.count.json"
+        os.makedirs(os.path.dirname(count_path), exist_ok=True)
+        temp_path = f"{count_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as outfile:
+            json.dump({'fingerprint': entry_fingerprint, 'frame count': frame_count}, outfile)
+        os.replace(temp_path, count_path)
+
+    def report(self):
+        """returns the number of cache hits and misses"""
+        return {'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,172 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+from .corpus_utils import parallel_map
+from .fficf_utils import frames_from_dict
+from .vocab_utils import FrameVocabulary
+from .xml_utils import NafIndex
+
+def safe_document_frames(naf_root):
+    """
+    returns the frames of a NAF file (None on failure) and the error message (None on success), for the worker processes of DocumentScorer.
+    only the frame labels are sent back to the main process.
+    """
+    try:
+        return frames_from_dict(NafIndex.from_naf(naf_root).frame_info_dict()), None
+    except Exception as error:
+        return None, f"{type(error).__name__}: {error}"
+
+class DocumentScorer(object):
+    """
+    Scores documents against the ff*icf profiles of event types.
+    The score of a document for an event type is the typicality score of each of its frames for that event type, weighted by the
+    relative frequency of the frame in the document: the frame count vectors of a batch of documents (a sparse document x frame matrix)
+    are multiplied with the frame x event type score matrix in one sparse matrix product, and the event types are ranked per document
+    with one argsort. frames without a score for an event type, and frames that are not in the profiles, add nothing to a score.
+    documents that cannot be read, and documents without any frame of the profiles, have no score: their scores are nan and
+    their ranked event types None, so that no event type is predicted for them.
+    :param event_types: event types in the order of the rows of the score matrix
+    :param frames: frames in the order of the columns of the score matrix
+    :param score_matrix: event type x frame matrix with typicality scores, e.g. of ff_icf_matrix, TypicalityModel.scores or a ScoreIndex
+    :type event_types: list
+    :type frames: list
+    :type score_matrix: numpy.ndarray
+    """
+    def __init__(self, event_types, frames, score_matrix):
+        assert np.shape(score_matrix) == (len(event_types), len(frames)), "score matrix does not match the event types and frames"
+        self.event_types = np.array(event_types, dtype=object)
+        self.vocabulary = FrameVocabulary()
+        for frame in frames:
+            self.vocabulary.add(frame)
+        assert len(self.vocabulary) == len(frames), "frames are not unique"
+        scores = np.nan_to_num(np.asarray(score_matrix, dtype=np.float64), nan=0.0)
+        self.profiles = csr_matrix(scores.T) #frame x event type
+
+    @classmethod
+    def from_fficf_dict(cls, fficf_dict):
+        """create a scorer from the output of ff_icf: event type -> list of (frame, score) tuples"""
+        event_types = list(fficf_dict)
+        frames = sorted({frame for scores in fficf_dict.values() for frame, score in scores})
+        frame_ids = {frame: column for column, frame in enumerate(frames)}
+        score_matrix = np.full((len(event_types), len(frames)), np.nan)
+
+        for row, event_type in enumerate(event_types):
+            for frame, score in fficf_dict[event_type]:
+                score_matrix[row, frame_ids[frame]] = score
+        return cls(event_types, frames, score_matrix)
+
+    @classmethod
+    def from_index(cls, index_folder):
+        """create a scorer from a score index written by index_utils.scores_to_index or matrix_to_index"""
+        from .index_utils import ScoreIndex
+        index = ScoreIndex(index_folder)
+        return cls(index.event_types, index.frames, index.matrix)
+
+    @classmethod
+    def from_model(cls, model):
+        """create a scorer from the current scores of a TypicalityModel"""
+        event_types, frames, score_matrix = model.scores()
+        return cls(event_types, frames, score_matrix)
+
+    def document_frames(self, documents, workers=1, verbose=0):
+        """
+        returns a list with the frames of every document, None for the NAF files that cannot be read.
+        :param documents: frame_info dictionaries, as returned by frame_info, or paths to NAF files, which are parsed over workers processes
+        :param workers: the number of processes over which the NAF files are distributed
+        :type documents: list
+        :type workers: integer
+        """
+        paths = [position for position, document in enumerate(documents) if isinstance(document, str)]
+        frames = [None if isinstance(document, str) else frames_from_dict(document) for document in documents]
+        if paths:
+            results = parallel_map(safe_document_frames, [documents[position] for position in paths], workers=workers)
+            errors = 0
+            for position, (document_frames, error) in zip(paths, results):
+                frames[position] = document_frames
+                if error != None:
+                    errors += 1
+                    if verbose >= 1:
+                        print(f"could not extract frames from {documents[position]}: {error}")
+            if verbose >= 1 and errors:
+                print(f"{errors} documents could not be processed and get nan scores")
+        return frames
+
+    def document_matrix(self, documents, workers=1, verbose=0):
+        """
+        returns the sparse document x frame count matrix of a batch of documents, with the columns of the score matrix,
+        and the total number of frames per document, including the frames that are not in the profiles. NAF files that cannot be read have no frames.
+        :param documents: frame_info dictionaries or paths to NAF files
+        :param workers: the number of processes over which the NAF files are distributed
+        :type documents: list
+        :type workers: integer
+        """
+        frames = [document_frames or [] for document_frames in self.document_frames(documents, workers=workers, verbose=verbose)]
+        totals = np.fromiter(map(len, frames), dtype=np.int64, count=len(frames))
+        frame_ids = self.vocabulary.ids
+        columns = np.fromiter((frame_ids.get(frame, -1) for document_frames in frames for frame in document_frames),
+                                dtype=np.int64, count=int(totals.sum())) #-1 for frames that are not in the profiles
+        rows = np.repeat(np.arange(len(frames)), totals)
+        known = columns >= 0
+
+        doc_matrix = csr_matrix((np.ones(known.sum()), (rows[known], columns[known])), shape=(len(frames), len(self.vocabulary)))
+        doc_matrix.sum_duplicates()
+        return doc_matrix, totals
+
+    def score_counts(self, doc_matrix, totals=None):
+        """
+        returns the document x event type score matrix of a document x frame count matrix.
+        the scores of a document without any frame of the profiles are nan.
+        :param doc_matrix: sparse document x frame count matrix with the columns of the score matrix
+        :param totals: the number of frames per document, the row sums of doc_matrix if None
+        :type doc_matrix: scipy.sparse.csr_matrix
+        :type totals: numpy.ndarray
+        """
+        known = np.asarray(doc_matrix.sum(axis=1)).ravel()
+        if totals is None:
+            totals = known
+        totals = np.asarray(totals, dtype=np.float64)
+        scores = np.asarray((doc_matrix @ self.profiles).todense())
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores = np.where(known[:, None] > 0, scores / totals[:, None], np.nan) #documents without known frames have no score
+        return scores
+
+    def scores(self, documents, workers=1, verbose=0):
+        """
+        returns the document x event type matrix with the typicality score of every document for every event type.
+        :param documents: frame_info dictionaries or paths to NAF files
+        :param workers: the number of processes over which the NAF files are distributed
+        :type documents: list
+        :type workers: integer
+        """
+        doc_matrix, totals = self.document_matrix(documents, workers=workers, verbose=verbose)
+        return self.score_counts(doc_matrix, totals)
+
+    def rank(self, scores, k=None):
+        """
+        returns the event types in descending order of their scores per document and the corresponding scores, as document x k arrays.
+        event types with equal scores keep the order of the rows of the score matrix. the event types of nan scores are None.
+        :param scores: document x event type score matrix
+        :param k: the number of event types per document, all event types if None
+        :type scores: numpy.ndarray
+        :type k: integer
+        """
+        order = np.argsort(-scores, axis=1, kind='stable') #nan scores last
+        if k != None:
+            order = order[:, :k]
+        ranked_scores = np.take_along_axis(scores, order, axis=1)
+        ranked_event_types = self.event_types[order]
+        ranked_event_types[np.isnan(ranked_scores)] = None
+        return ranked_event_types, ranked_scores
+
+    def predict(self, documents, k=None, workers=1, verbose=0):
+        """
+        score a batch of documents and rank the event types per document.
+        returns the ranked event types and their scores as document x k arrays; the first column is the predicted event type,
+        None for the documents that cannot be read or have no frame of the profiles.
+        :param documents: frame_info dictionaries or paths to NAF files
+        :param k: the number of event types per document, all event types if None
+        :param workers: the number of processes over which the NAF files are distributed
+        :type documents: list
+        :type k: integer
+        :type workers: integer
+        """
+        return self.rank(self.scores(documents, workers=workers, verbose=verbose), k=k)
@@ -2,28 +2,165 @@ import json
 import os
 import shutil
 import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.util import Finalize
+from .archive_utils import close_archives
+from .xml_utils import count_srl_predicates
+from .instrument_utils import stage, count_predicates
 
-def delete_smallest_texts(collections, minimal_n_frames, verbose):
+def start_worker(initializer=None, initargs=()):
+    """
+    initializer of every pool worker: closes the archives inherited from the parent process and registers closing the archives
+    of the worker when it exits, then calls initializer with initargs.
+    """
+    close_archives()
+    Finalize(None, close_archives, exitpriority=0)
+    if initializer != None:
+        initializer(*initargs)
+
+def parallel_map(function, items, workers=1, chunksize=None):
+    """
+    apply a function to every item, in a process pool if more than one worker is asked for. the results are returned in the order of the items.
+    :param function: a picklable function of one argument
+    :param items: the items to process
+    :param workers: the number of processes
+    :param chunksize: the number of items sent to a process at once. By default the items are divided in four chunks per worker.
+    :type items: list
+    :type workers: integer
+    :type chunksize: integer
+    """
+    if workers > 1 and len(items) > 1:
+        if chunksize == None:
+            chunksize = max(1, len(items) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=start_worker) as executor:
+            return list(executor.map(function, items, chunksize=chunksize))
+    return [function(item) for item in items]
+
+def iter_parallel_map(function, items, workers=1, window=None, initializer=None, initargs=()):
+    """
+    apply a function to every item and yield the results in the order of the items. at most window items are in flight,
+    so neither the items nor the results are all held in memory. one process pool is used for all items.
+    :param function: a picklable function of one argument
+    :param items: an iterable of items
+    :param workers: the number of processes
+    :param window: the maximal number of submitted items whose result has not been yielded yet, by default four per worker
+    :param initializer: called with initargs once in every process before the items, e.g. to send data that all items share only once
+    :param initargs: the arguments of the initializer
+    :type workers: integer
+    :type window: integer
+    :type initargs: tuple
+    """
+    if workers <= 1:
+        if initializer != None:
+            initializer(*initargs)
+        for item in items:
+            yield function(item)
+        return
+
+    if window == None:
+        window = workers * 4
+    with ProcessPoolExecutor(max_workers=workers, initializer=start_worker, initargs=(initializer, initargs)) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(function, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def safe_count_srl_predicates(naf_root):
+    """count the annotated frames of a NAF file, returns None if the file cannot be read"""
+    try:
+        return count_srl_predicates(naf_root)
+    except Exception:
+        return None
+
+def prefilter_collections(collections, minimal_n_frames, workers=1, cache=None, verbose=0, instrumentation=None):
+    """
+    drop the NAF files with fewer than minimal_n_frames annotated frames before the full extraction, by counting the predicates in the SRL layer only.
+    the frames of documents in the cache are counted from their cached frame info or frame count, only the other files are read.
+    files that cannot be read are kept, so that the full extraction reports them.
+    returns the filtered collections, a dictionary with the frame count per path and the number of removed files.
+    :param collections: a collection of collections of NAF paths per event type
+    :param minimal_n_frames: filter of minimum number of annotated frames in a text
+    :param workers: the number of processes over which the files are distributed
+    :param cache: cache with the frame info of previously processed documents
+    :param instrumentation: records the duration and memory use of the stage
+    :type collections: dictionary
+    :type minimal_n_frames: integer
+    :type workers: integer
+    :type cache: FrameInfoCache
+    :type instrumentation: Instrumentation
+    """
+    paths = sorted({path for collection in collections.values() for path in collection})
+    frame_counts = {}
+    with stage(instrumentation, 'prefilter_collections', documents=len(paths)) as record:
+        fingerprints = {}
+        if cache != None:
+            for path in paths:
+                fingerprint, cached = cache.lookup(path)
+                if cached != None:
+                    frame_counts[path] = sum(stats['frame frequency'] for stats in cached.values())
+                elif fingerprint != None:
+                    n_frames = cache.get_frame_count(path, fingerprint)
+                    if n_frames != None:
+                        frame_counts[path] = n_frames
+                    else:
+                        fingerprints[path] = fingerprint
+        missing = [path for path in paths if path not in frame_counts]
+        counts = parallel_map(safe_count_srl_predicates, missing, workers=workers)
+        frame_counts.update(zip(missing, counts))
+        for path, n_frames in zip(missing, counts):
+            if n_frames != None and path in fingerprints:
+                cache.put_frame_count(path, n_frames, fingerprints[path])
+        record['parsed'] = len(missing)
+        if instrumentation != None: #only counted for the stage record
+            record['predicates'] = sum(count for count in frame_counts.values() if count != None)
+    filtered_collections = {}
+    count = 0
+
+    for event_type, collection in collections.items():
+        kept = set()
+        for path in collection:
+            n_frames = frame_counts[path]
+            if n_frames == None or n_frames >= minimal_n_frames:
+                kept.add(path)
+            else:
+                count += 1
+        filtered_collections[event_type] = kept
+
+    if verbose >= 2:
+        print(f"prefilter: {count} texts with less than {minimal_n_frames} frames skipped before extraction, {len(paths) - len(missing)} counted from the cache")
+    return filtered_collections, frame_counts, count
+
+def delete_smallest_texts(collections, minimal_n_frames, verbose, n_prefiltered=0, instrumentation=None):
     """
     load the event_type_info_dict and delete the smallest texts.
     :param collections: collection of collections of dictionaries per event type
     :param minimal_n_frames: filter of minimum number of annotated frames in a text
+    :param n_prefiltered: the number of texts that were already removed by prefilter_collections
+    :param instrumentation: records the duration and memory use of the stage
     :type collections: dictionary
     :type minimal_n_frames: integer
+    :type n_prefiltered: integer
+    :type instrumentation: Instrumentation
     """
     sliced_corpus = {}
-    count = 0
-    for event_type, events in collections.items():
-        new_list = []
-        for event in events:
-            for title, stats in event.items():
-                if stats['frame frequency'] >= minimal_n_frames:
-                    new_list.append(event)
-                else:
-                    count += 1
-                    continue
-        assert len(new_list) != 0, "no documents containing more frames than provided threshold"
-        sliced_corpus[event_type] = new_list
+    count = n_prefiltered
+    with stage(instrumentation, 'delete_smallest_texts') as record:
+        for event_type, events in collections.items():
+            new_list = []
+            for event in events:
+                for title, stats in event.items():
+                    if stats['frame frequency'] >= minimal_n_frames:
+                        new_list.append(event)
+                    else:
+                        count += 1
+                        continue
+            assert len(new_list) != 0, "no documents containing more frames than provided threshold"
+            sliced_corpus[event_type] = new_list
+        record['documents'] = sum(len(events) for events in collections.values())
     if verbose >= 1:
         print(f"{count} texts with less than {minimal_n_frames} frames removed")
     return sliced_corpus
@@ -41,15 +178,18 @@ def create_output_folder(output_folder, start_from_scratch, verbose):
         if verbose >= 1:
             print(f"created folder at {output_folder}")
 
-def corpus_to_json(corpus_dict, output_folder, start_from_scratch, verbose):
+def corpus_to_json(corpus_dict, output_folder, start_from_scratch, verbose, instrumentation=None):
     """export loaded and sliced corpus to json"""
     if output_folder != None:
         create_output_folder(output_folder=output_folder,
                             start_from_scratch=start_from_scratch,
                             verbose=verbose)
         json_path = f'{output_folder}/corpus_info.json'
-        with open(json_path, 'w') as outfile:
-            json.dump(corpus_dict, outfile, indent=4, sort_keys=True)
+        with stage(instrumentation, 'corpus_to_json') as record:
+            if instrumentation != None:
+                record['documents'], record['predicates'] = count_predicates(corpus_dict)
+            with open(json_path, 'w') as outfile:
+                json.dump(corpus_dict, outfile, indent=4, sort_keys=True)
 
         if verbose >= 1:
             print(f"loaded and sliced corpus exported to {json_path}")
@@ -68,12 +208,18 @@ def select_event_types(event_types, corpus_dict, verbose):
     assert len(event_type_info_dict) == len(event_types), "list of event types not represented in selected corpus"
     return event_type_info_dict
 
-def sample_corpus(collections, verbose):
+def sample_corpus(collections, verbose, seed=None):
     """
     create proportional sizes of subcorpora across event types. randomize when selecting the texts for this sample.
     :param collections: collection of collections of dictionaries per event type
+    :param seed: seed of the random selection, for a reproducible sample
     :type collections: dictionary
+    :type seed: integer
     """
+    if seed != None:
+        sampler = random.Random(seed)
+    else:
+        sampler = random
     lengths_dict = {}
 
     for event_type, info_dicts in collections.items():
@@ -83,7 +229,7 @@ def sample_corpus(collections, verbose):
     sampled_collections = {}
 
     for event_type, info_dicts in collections.items():
-        sampled_list = random.sample(info_dicts, len_smallest_corpus)
+        sampled_list = sampler.sample(info_dicts, len_smallest_corpus)
         sampled_collections[event_type] = sampled_list
 
     if verbose >= 3:
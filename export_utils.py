@@ -0,0 +1,99 @@
+import csv
+import os
+import tempfile
+from contextlib import contextmanager
+
+@contextmanager
+def atomic_write(path, mode='w'):
+    """
+    open a temporary file next to path for writing and rename it to path when the block finishes without errors.
+    readers of path see either the previous or the complete new file, never a half-written one.
+    """
+    folder = os.path.dirname(os.path.abspath(path))
+    file_descriptor, temp_path = tempfile.mkstemp(dir=folder, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(file_descriptor, mode) as outfile:
+            yield outfile
+            outfile.flush()
+            os.fsync(outfile.fileno())
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(temp_path, 0o666 & ~umask) #the permissions of a file created with open instead of those of mkstemp
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def write_csv(rows, path, headers):
+    """write rows to a csv file one at a time. returns the number of rows written."""
+    n_rows = 0
+    with open(path, 'w', newline='') as outfile:
+        writer = csv.writer(outfile)
+        writer.writerow(headers)
+        for row in rows:
+            writer.writerow(row)
+            n_rows += 1
+    return n_rows
+
+def write_xlsx(rows, path, headers):
+    """write rows to an excel file with a write-only workbook, which streams the rows to disk. returns the number of rows written."""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet()
+    worksheet.append(headers)
+    n_rows = 0
+    for row in rows:
+        worksheet.append(row)
+        n_rows += 1
+    workbook.save(path)
+    return n_rows
+
+def write_parquet(rows, path, headers, batch_size=10000):
+    """write rows to a parquet file in row groups of batch_size rows. requires pyarrow. returns the number of rows written."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("exporting to parquet requires pyarrow, install it with: pip install pyarrow")
+
+    writer = None
+    n_rows = 0
+    batch = []
+
+    def flush(batch, writer):
+        columns = {header: [row[position] for row in batch] for position, header in enumerate(headers)}
+        if writer == None:
+            table = pa.Table.from_pydict(columns)
+            writer = pq.ParquetWriter(path, table.schema)
+        else:
+            table = pa.Table.from_pydict(columns, schema=writer.schema)
+        writer.write_table(table)
+        return writer
+
+    for row in rows:
+        batch.append(row)
+        n_rows += 1
+        if len(batch) == batch_size:
+            writer = flush(batch, writer)
+            batch = []
+    if batch or writer == None:
+        writer = flush(batch, writer)
+    writer.close()
+    return n_rows
+
+EXPORT_WRITERS = {'xlsx': write_xlsx, 'csv': write_csv, 'parquet': write_parquet}
+
+def export_rows(rows, path, headers, file_format):
+    """
+    stream rows to a file in the given format.
+    :param rows: iterable of rows, which can be a generator
+    :param path: output path
+    :param headers: column headers
+    :param file_format: 'xlsx', 'csv' or 'parquet'
+    :type headers: list
+    :type file_format: string
+    """
+    assert file_format in EXPORT_WRITERS, f"unknown export format {file_format}, choose from {sorted(EXPORT_WRITERS)}"
+    return EXPORT_WRITERS[file_format](rows, path, headers)
@@ -6,9 +6,13 @@ import statistics
 import math
 import json
 import shutil
-import pandas as pd
 from collections import Counter, defaultdict
-from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer
+from scipy.sparse import csr_matrix
+from .vocab_utils import FrameVocabulary, frame_counters
+from .export_utils import export_rows, atomic_write
+from .instrument_utils import stage
+
+PREMON_FRAME_PREFIX = "http://premon.fbk.eu/resource/fn17-"
 
 def frames_from_dict(frame_info_dict):
     """
@@ -53,22 +57,40 @@ def frames_collections(event_type_frame_collections, verbose):
                 print(f'{event_type}: {len(frames)} frames')
     return event_type_frames_dict
 
-def frame_stats(event_type_frames_dict,verbose):
+def frame_stats(event_type_frames_dict,verbose,instrumentation=None):
     """
     returns a dictionary with event type as key and a dictionary with (relative) frequency for each frame as value
     :param event_type_frames_dict: dictionary with for each event type a list of corresponding frames
+    :param instrumentation: records the duration and memory use of the stage
     :type event_type_frame_dict: dictionary
+    :type instrumentation: Instrumentation
     """
     event_type_frame_freq_dict = {}
 
     for key in event_type_frames_dict:
         assert type(event_type_frames_dict[key]) == list, "no list of frames"
+        assert len(event_type_frames_dict[key]) != 0, "no frames in list"
+
+    with stage(instrumentation, 'frame_stats') as record:
+        if instrumentation != None:
+            record['predicates'] = sum(len(frames) for frames in event_type_frames_dict.values())
+        counters = frame_counters(event_type_frames_dict)
+        event_type_frame_freq_dict = counter_stats(counters)
+    return event_type_frame_freq_dict
+
+def counter_stats(counters):
+    """
+    returns the output of frame_stats for frame counts, e.g. those of store_utils.event_type_frame_counts
+    :param counters: dictionary with event type as key and a Counter of its frames as value
+    :type counters: dictionary
+    """
+    event_type_frame_freq_dict = {}
+
+    for key, count_dict in counters.items():
         frame_stats_dict = {}
-        frames = event_type_frames_dict[key]
-        assert len(frames) != 0, "no frames in list"
-        count_dict = Counter(frames)
+        n_frames = sum(count_dict.values())
         for frame, freq in count_dict.items():
-            relative_freq = (freq/len(frames))*100
+            relative_freq = (freq/n_frames)*100
             info_dict = {'absolute frequency': freq, 'relative frequency': relative_freq}
             frame_stats_dict[frame] = info_dict
         event_type_frame_freq_dict[key] = frame_stats_dict
@@ -104,9 +126,134 @@ def normalize_data(data):
     the_array = (data - np.min(data)) / (np.max(data) - np.min(data))
     return list(the_array)
 
-def ff_icf(collections, event_type_frames_dict, frame_freq_dict, verbose):
+def ff_icf_matrix(count_matrix, total_n_docs):
     """
-    calculates ff_icf scores.
+    calculates the normalized ff*icf scores of all frames of all event types at once.
+    the frame frequency of each cell is divided by the total frequency of its row, multiplied by the log of the total number of documents
+    divided by the frequency of its column, min-max scaled per row and rounded to 6 decimals, like c_tf_idf and normalize_data do per cell.
+    a stack of matrices (e.g. replicates x event types x frames) is scored matrix by matrix. frames that do not occur in a matrix get nan.
+    :param count_matrix: event type x frame matrix with absolute frame frequencies (dense or scipy sparse)
+    :param total_n_docs: the total number of documents across event types
+    :type count_matrix: numpy.ndarray
+    :type total_n_docs: integer
+    """
+    if hasattr(count_matrix, 'toarray'):
+        count_matrix = count_matrix.toarray()
+    counts = np.asarray(count_matrix, dtype=np.float64)
+    total_freq_frames_event_types = counts.sum(axis=-1, keepdims=True) #total number of frame occurrences per event type
+    frame_freq_event_types = counts.sum(axis=-2, keepdims=True) #number of occurrences per frame across event types
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        icf = np.log(np.divide(total_n_docs, frame_freq_event_types))
+        icf[frame_freq_event_types == 0] = np.nan
+        scores = (counts / total_freq_frames_event_types) * icf
+    return normalize_rows(scores)
+
+def normalize_rows(scores):
+    """min-max scale every row of a score matrix (nan values are ignored) and round to 6 decimals"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        minimum = np.nanmin(scores, axis=-1, keepdims=True)
+        maximum = np.nanmax(scores, axis=-1, keepdims=True)
+        normalized_scores = (scores - minimum) / (maximum - minimum)
+    return np.round(normalized_scores, decimals=6)
+
+def ranked_scores(score_matrix, event_types, column_headers):
+    """
+    returns a dictionary with event type as key and a list of (frame, score) tuples sorted in descending order of the scores.
+    frames with equal scores keep the order of the column headers.
+    :param score_matrix: event type x frame matrix with scores
+    :param event_types: event types in the order of the rows
+    :param column_headers: frames in the order of the columns
+    :type score_matrix: numpy.ndarray
+    :type event_types: list
+    :type column_headers: list
+    """
+    ranked_dict = {}
+
+    for event_type, row in zip(event_types, score_matrix):
+        order = np.argsort(-row, kind='stable')
+        ranked_dict[event_type] = [(column_headers[index], row[index]) for index in order]
+    return ranked_dict
+
+def top_k_frames(score_matrix, event_types, column_headers, k):
+    """
+    returns a dictionary with event type as key and a list of its k best (frame, score) tuples in descending order of the scores.
+    the k best columns are selected with argpartition, so only those k are sorted. the result equals the first k tuples of ranked_scores
+    without the nan scores, so an event type with only nan scores gets an empty list.
+    :param score_matrix: event type x frame matrix with scores
+    :param event_types: event types in the order of the rows
+    :param column_headers: frames in the order of the columns
+    :param k: the number of frames per event type
+    :type score_matrix: numpy.ndarray
+    :type event_types: list
+    :type column_headers: list
+    :type k: integer
+    """
+    top_k_dict = {}
+
+    for event_type, row in zip(event_types, score_matrix):
+        scored = ~np.isnan(row)
+        n = min(k, int(scored.sum())) #nan scores are never selected
+        if n == 0:
+            top_k_dict[event_type] = []
+            continue
+        candidates = np.argpartition(np.where(scored, -row, np.inf), n - 1)[:n]
+        threshold = row[candidates].min()
+        above = np.flatnonzero(row > threshold)
+        tied = np.flatnonzero(row == threshold)[:n - len(above)] #frames with equal scores keep the order of the column headers
+        selected = np.concatenate([above, tied])
+        order = selected[np.lexsort((selected, -row[selected]))]
+        top_k_dict[event_type] = [(column_headers[index], row[index]) for index in order]
+    return top_k_dict
+
+def nonzero_scores(score_matrix, event_types, column_headers):
+    """
+    returns a dictionary with event type as key and a list of the (frame, score) tuples with a score above zero, in descending order of the scores.
+    :param score_matrix: event type x frame matrix with scores
+    :param event_types: event types in the order of the rows
+    :param column_headers: frames in the order of the columns
+    :type score_matrix: numpy.ndarray
+    :type event_types: list
+    :type column_headers: list
+    """
+    sparse_scores = csr_matrix(np.where(score_matrix > 0, score_matrix, 0))
+    nonzero_dict = {}
+
+    for event_type, position in zip(event_types, range(sparse_scores.shape[0])):
+        start, end = sparse_scores.indptr[position], sparse_scores.indptr[position + 1]
+        indices = sparse_scores.indices[start:end]
+        values = sparse_scores.data[start:end]
+        order = np.lexsort((indices, -values))
+        nonzero_dict[event_type] = [(column_headers[indices[index]], values[index]) for index in order]
+    return nonzero_dict
+
+def matrix_stats(event_types, frames, count_matrix):
+    """
+    returns the output of frame_stats for an event type x frame count matrix, e.g. that of InternedCorpus.frame_count_matrix.
+    only the frames that occur in an event type are included.
+    :param event_types: event types in the order of the rows
+    :param frames: frames in the order of the columns
+    :param count_matrix: dense event type x frame matrix with absolute frame frequencies
+    :type event_types: list
+    :type frames: list
+    :type count_matrix: numpy.ndarray
+    """
+    event_type_frame_freq_dict = {}
+
+    for event_type, row in zip(event_types, count_matrix):
+        n_frames = int(row.sum())
+        assert n_frames != 0, "no frames in list"
+        frame_stats_dict = {}
+        for index in np.flatnonzero(row):
+            freq = int(row[index])
+            frame_stats_dict[frames[index]] = {'absolute frequency': freq, 'relative frequency': (freq/n_frames)*100}
+        event_type_frame_freq_dict[event_type] = frame_stats_dict
+    return event_type_frame_freq_dict
+
+def ff_icf_scores(collections, event_type_frames_dict, frame_freq_dict):
+    """
+    calculates the ff_icf score matrix.
+    returns the event types of the rows, the frames of the columns and the event type x frame matrix with normalized scores.
     :param collections: collection of collections of event types with corresponding dictionaries with linguistc NAF info
     :param event_type_frames_dict: dictionary with event types: list of frames
     :param frame_freq_dict: absolute and relative frequency per frame per event type
@@ -119,53 +266,107 @@ def ff_icf(collections, event_type_frames_dict, frame_freq_dict, verbose):
     for event_type, info in collections.items(): #iterate over event type: list of info-dictionaries
         total_n_docs += len(info) #add the length of the list (equal to the number of texts) to counter
 
-    lists_frames = []
+    counters = {}
 
     for key in event_type_frames_dict: #iterate over the key:value (event type:list of frames) pairs
         values = event_type_frames_dict[key] #create a variable for each list of frames
         assert type(values) == list, "no list of frames"
         assert len(values) != 0, "no frames in list"
-        space = ' '
-        space = space.join(values) #join the frames
-        lists_frames.append(space) #append the string to a list. this results in a list with a joined string of frames per event type
+        counters[key] = {frame: info['absolute frequency'] for frame, info in frame_freq_dict[key].items()} #reuse the counts of frame_stats
+    assert len(counters) == len(collections), "not all event types are represented in matrix"
+    return ff_icf_counts(counters, total_n_docs)
 
-    vectorizer = CountVectorizer(lowercase=False, analyzer=split_on_space)
-    frames_vector_data = vectorizer.fit_transform(lists_frames) #vectorize the frames per event type
+def ff_icf_counts(counters, total_n_docs):
+    """
+    calculates the ff_icf score matrix from the frame counts per event type.
+    returns the event types of the rows, the frames of the columns and the event type x frame matrix with normalized scores.
+    :param counters: dictionary with event type as key and a Counter of its frames as value
+    :param total_n_docs: the number of documents of all event types
+    :type counters: dictionary
+    :type total_n_docs: integer
+    """
+    vocabulary = FrameVocabulary.from_counters(counters.values()) #intern the frames as column ids
+    frames_vector_data = vocabulary.count_matrix(counters.values()) #sparse event type x frame count matrix
     vector_shape = frames_vector_data.shape
-    column_headers = vectorizer.get_feature_names() #get the matrix's columnh headers
-    assert vector_shape[0] == len(collections), "not all event types are represented in matrix"
+    column_headers = vocabulary.labels #get the matrix's column headers
+    assert vector_shape[0] == len(counters), "not all event types are represented in matrix"
     assert vector_shape[1] == len(column_headers), "not all frames are represented in matrix"
-    frames_vector_array = frames_vector_data.toarray()
-    list_of_lists = []
-
-    for row in frames_vector_array: #iterate over the vectors
-        assert len(row) == len(column_headers), "certain frames in column headers not represented in vector"
-        total_freq_frames_event_type = sum(row) #create variable for the sum of all frames of the event type
-        scores = []
-        for frame_freq_event_type, frame in zip(row, column_headers): #iterate over both the absolute frequencies in the vector and the corresponding column headers
-            frame_freq_event_types = 0
-            for event_type, freq_dict in frame_freq_dict.items(): #iterate over event_type:dictionary with frequencies
-                if frame in freq_dict: #if the frame is in the dictionary of the event type
-                    frame_freq_event_types += freq_dict[frame]['absolute frequency'] #add the absolute frequency to counter
-            assert frame_freq_event_types != 0, f"{frame} not in corpus"
-            c_tf_idf_score = c_tf_idf(frame_freq_event_type, total_freq_frames_event_type, total_n_docs, frame_freq_event_types)
-            #if c_tf_idf_score < 0:
-            #    c_tf_idf_score = 0
-            scores.append(c_tf_idf_score) #append the score to a list
-        normalized_scores = normalize_data(scores)
-        list_of_lists.append(normalized_scores) #append the list to another list. The result is a list of scores per each event type
-
-    c_tf_idf_round = np.round(list_of_lists, decimals=6)
-    assert len(c_tf_idf_round) == len(collections), "not all event types are represented as list with c-tf-idf scores"
-    c_tf_idfdict = {}
-
-    for event_type, array in zip(event_type_frames_dict, c_tf_idf_round): #iterate over the event types and the list of corresponding arrays of tf-idf values
-        frame_valuedict = {}
-        for frame, value in zip(column_headers, array): #iterate over each frame and its corresponding value
-            frame_valuedict[frame] = value #add the frame and value as key-value pair to a dictionary
-        sorted_tuples = sorted(frame_valuedict.items(), key=operator.itemgetter(1), reverse=True) #convert the dictionary to a list of tuples sorted in descending order of the values
-        assert len(sorted_tuples) == len(column_headers), "not all frames across event types have a c-tf-idf score in event type"
-        c_tf_idfdict[event_type] = sorted_tuples #add the event type and its list of tuples as a key-value pair to the tf_idfdict
+
+    c_tf_idf_round = ff_icf_matrix(frames_vector_data, total_n_docs) #matrix with a row of normalized scores per event type
+    assert len(c_tf_idf_round) == len(counters), "not all event types are represented as list with c-tf-idf scores"
+    return list(counters), column_headers, c_tf_idf_round
+
+def ff_icf(collections, event_type_frames_dict, frame_freq_dict, verbose, top_k=None, instrumentation=None):
+    """
+    calculates ff_icf scores.
+    returns a dictionary with event type as key and a list of (frame, score) tuples in descending order of the scores.
+    :param collections: collection of collections of event types with corresponding dictionaries with linguistc NAF info
+    :param event_type_frames_dict: dictionary with event types: list of frames
+    :param frame_freq_dict: absolute and relative frequency per frame per event type
+    :param top_k: only return the k best frames per event type. all frames are returned if None
+    :param instrumentation: records the duration and memory use of the stage
+    :type collections: dictionary
+    :type event_type_frames_dict: dictionary
+    :type frame_freq_dict: dictionary
+    :type top_k: integer
+    :type instrumentation: Instrumentation
+    """
+    with stage(instrumentation, 'ff_icf') as record:
+        record['documents'] = sum(len(info) for info in collections.values())
+        event_types, column_headers, c_tf_idf_round = ff_icf_scores(collections=collections,
+                                                                    event_type_frames_dict=event_type_frames_dict,
+                                                                    frame_freq_dict=frame_freq_dict)
+        c_tf_idfdict = rank_frames(c_tf_idf_round, event_types, column_headers, verbose, top_k)
+        record['frames'] = len(column_headers)
+    return c_tf_idfdict
+
+def ff_icf_from_counts(counters, total_n_docs, verbose, top_k=None, instrumentation=None):
+    """
+    calculates ff_icf scores from the frame counts per event type, e.g. those that store_utils.event_type_frame_counts reads from the corpus store.
+    returns the same dictionary as ff_icf.
+    :param counters: dictionary with event type as key and a Counter of its frames as value
+    :param total_n_docs: the number of documents of all event types
+    :param top_k: only return the k best frames per event type. all frames are returned if None
+    :param instrumentation: records the duration and memory use of the stage
+    :type counters: dictionary
+    :type total_n_docs: integer
+    :type top_k: integer
+    :type instrumentation: Instrumentation
+    """
+    with stage(instrumentation, 'ff_icf', documents=total_n_docs) as record:
+        event_types, column_headers, c_tf_idf_round = ff_icf_counts(counters, total_n_docs)
+        c_tf_idfdict = rank_frames(c_tf_idf_round, event_types, column_headers, verbose, top_k)
+        record['frames'] = len(column_headers)
+    return c_tf_idfdict
+
+def ff_icf_from_matrix(event_types, frames, count_matrix, total_n_docs, verbose, top_k=None, instrumentation=None):
+    """
+    calculates ff_icf scores from an event type x frame count matrix, e.g. that of InternedCorpus.frame_count_matrix.
+    returns the same dictionary as ff_icf.
+    :param event_types: event types in the order of the rows
+    :param frames: frames in the order of the columns
+    :param count_matrix: dense event type x frame matrix with absolute frame frequencies
+    :param total_n_docs: the number of documents of all event types
+    :param top_k: only return the k best frames per event type. all frames are returned if None
+    :param instrumentation: records the duration and memory use of the stage
+    :type event_types: list
+    :type frames: list
+    :type count_matrix: numpy.ndarray
+    :type total_n_docs: integer
+    :type top_k: integer
+    :type instrumentation: Instrumentation
+    """
+    with stage(instrumentation, 'ff_icf', documents=total_n_docs, frames=len(frames)):
+        c_tf_idf_round = ff_icf_matrix(count_matrix, total_n_docs)
+        c_tf_idfdict = rank_frames(c_tf_idf_round, event_types, frames, verbose, top_k)
+    return c_tf_idfdict
+
+def rank_frames(score_matrix, event_types, column_headers, verbose, top_k=None):
+    """returns per event type the (top_k) frames in descending order of their scores"""
+    if top_k != None:
+        c_tf_idfdict = top_k_frames(score_matrix, event_types, column_headers, top_k)
+    else:
+        c_tf_idfdict = ranked_scores(score_matrix, event_types, column_headers)
 
     if verbose >= 3:
         for event_type, scores in c_tf_idfdict.items():
@@ -186,69 +387,150 @@ def create_output_folder(output_folder, start_from_scratch, verbose):
         if verbose >= 1:
             print(f"created folder at {output_folder}")
 
-def scores_to_format(fficf_dict, frame_freq_dict, output_folder, start_from_scratch, event_types, verbose):
-    """exports the output of the ff*icf analysis to an excel format"""
-    headers = ['event type', 'rank', 'frame', 'ff*icf value', 'absolute freq', 'relative freq', 'judgement']
-    list_of_lists = []
+SCORE_HEADERS = ['event type', 'rank', 'frame', 'ff*icf value', 'absolute freq', 'relative freq', 'judgement']
 
+def score_rows(fficf_dict, frame_freq_dict, top_k=None):
+    """
+    generates the rows of the typicality score export, one per (event type, frame), with an empty judgement column for annotators.
+    :param fficf_dict: event type -> list of (frame, score) tuples
+    :param frame_freq_dict: absolute and relative frequency per frame per event type
+    :param top_k: only generate the k best frames per event type. by default all frames of the first event type's ranking are generated
+    :type fficf_dict: dictionary
+    :type frame_freq_dict: dictionary
+    :type top_k: integer
+    """
     for key in fficf_dict:
         cutoff_point = len(fficf_dict[key])
         break
 
+    if top_k != None:
+        cutoff_point = min(cutoff_point, top_k)
+
     for key in fficf_dict:
         for tupl, number in zip(fficf_dict[key][:cutoff_point], range(1,(cutoff_point+1))):
-            one_row = [key, number]
             frame = tupl[0]
-            score = tupl[1]
-            one_row.append(frame)
-            one_row.append(score)
+            score = float(tupl[1])
             if frame in frame_freq_dict[key]:
                 abs_freq = frame_freq_dict[key][frame]['absolute frequency']
                 rel_freq = frame_freq_dict[key][frame]['relative frequency']
             else:
                 abs_freq = 0
-                rel_freq = 0
-            one_row.append(abs_freq)
-            one_row.append(rel_freq)
-            one_row.append('')
-            list_of_lists.append(one_row)
-
-    df = pd.DataFrame(list_of_lists, columns=headers)
+                rel_freq = 0.0
+            yield [key, number, frame, score, abs_freq, rel_freq, '']
 
+def scores_to_format(fficf_dict, frame_freq_dict, output_folder, start_from_scratch, event_types, verbose, top_k=None, file_format='xlsx', instrumentation=None):
+    """
+    exports the output of the ff*icf analysis to an excel format. the rows are streamed to the file while they are generated.
+    :param top_k: only export the k best frames per event type. by default all frames of the first event type's ranking are exported
+    :param file_format: 'xlsx' (default), 'csv' or 'parquet'
+    :param instrumentation: records the duration and memory use of the stage
+    :type top_k: integer
+    :type file_format: string
+    :type instrumentation: Instrumentation
+    """
     if output_folder != None:
         create_output_folder(output_folder=output_folder,
                             start_from_scratch=start_from_scratch,
                             verbose=verbose)
         if event_types != None:
             identifiers = "_".join(event_types)
-            xlsx_path = f"{output_folder}/typicality_scores_{identifiers}.xlsx"
-        df.to_excel(xlsx_path, index=False)
+        else:
+            identifiers = "_".join(fficf_dict)
+        export_path = f"{output_folder}/typicality_scores_{identifiers}.{file_format}"
+        rows = score_rows(fficf_dict=fficf_dict,
+                            frame_freq_dict=frame_freq_dict,
+                            top_k=top_k)
+        with stage(instrumentation, 'scores_to_format', format=file_format) as record:
+            n_rows = export_rows(rows=rows,
+                                path=export_path,
+                                headers=SCORE_HEADERS,
+                                file_format=file_format)
+            record['rows'] = n_rows
         if verbose:
-            print(f"exported typicality scores to {xlsx_path}")
+            print(f"exported {n_rows} typicality scores to {export_path}")
     return
 
-def scores_to_json(fficf_dict, output_folder, start_from_scratch, verbose):
-    """exports the output of the ff-icf analysis to a json format per event type"""
+def scores_to_json(fficf_dict, output_folder, start_from_scratch, verbose, top_k=None, instrumentation=None):
+    """
+    exports the output of the ff-icf analysis to a json format per event type
+    :param top_k: only export the k best frames per event type. all frames are exported if None
+    :param instrumentation: records the duration and memory use of the stage
+    :type top_k: integer
+    :type instrumentation: Instrumentation
+    """
     json_dict = {}
 
-    for key in fficf_dict:
-        scores_dict = {}
-        for tupl in fficf_dict[key]:
-            frame = tupl[0].lower()
-            premon_frame = "http://premon.fbk.eu/resource/fn17-"+frame
-            score = tupl[1]
-            scores_dict[premon_frame] = score
-        if output_folder != None:
-            create_output_folder(output_folder=output_folder,
-                                start_from_scratch=start_from_scratch,
-                                verbose=verbose)
-            json_path = f"{output_folder}/typicality_scores_{key}.json"
-            with open(json_path, 'w') as outfile:
-                json.dump(scores_dict, outfile, indent=4, sort_keys=True)
-            if verbose:
-                print(f"exported typicality scores to {json_path}")
+    if output_folder != None:
+        create_output_folder(output_folder=output_folder,
+                            start_from_scratch=start_from_scratch,
+                            verbose=verbose)
+
+    with stage(instrumentation, 'scores_to_json', files=len(fficf_dict)):
+        for key in fficf_dict:
+            scores_dict = {}
+            for tupl in fficf_dict[key][:top_k]:
+                frame = tupl[0].lower()
+                premon_frame = PREMON_FRAME_PREFIX+frame
+                score = tupl[1]
+                scores_dict[premon_frame] = score
+            if output_folder != None:
+                json_path = f"{output_folder}/typicality_scores_{key}.json"
+                with open(json_path, 'w') as outfile: #one small file per event type, scores_to_bulk_json writes all event types atomically
+                    json.dump(scores_dict, outfile, indent=4, sort_keys=True)
+                if verbose:
+                    print(f"exported typicality scores to {json_path}")
     return
 
+def scores_to_bulk_json(fficf_dict, output_folder, start_from_scratch, verbose, top_k=None, bulk_format='jsonl', instrumentation=None):
+    """
+    exports the output of the ff-icf analysis of all event types to one file in a single streaming pass.
+    'jsonl' writes typicality_scores.jsonl with one line {"event type": ..., "scores": {premon uri: score}} per event type.
+    'table' writes typicality_scores.json with a shared table of PreMOn frame uris and per event type a list of scores
+    in the order of that table (null for frames without a score).
+    the file is written to a temporary file and renamed when complete, so readers never see a half-written set of scores.
+    :param top_k: only export the k best frames per event type. all frames are exported if None
+    :param bulk_format: 'jsonl' or 'table'
+    :param instrumentation: records the duration and memory use of the stage
+    :type top_k: integer
+    :type bulk_format: string
+    :type instrumentation: Instrumentation
+    """
+    assert bulk_format in {'jsonl', 'table'}, f"unknown bulk format {bulk_format}"
+    if output_folder == None:
+        return
+
+    create_output_folder(output_folder=output_folder,
+                        start_from_scratch=start_from_scratch,
+                        verbose=verbose)
+
+    with stage(instrumentation, 'scores_to_bulk_json', format=bulk_format):
+        if bulk_format == 'jsonl':
+            json_path = f"{output_folder}/typicality_scores.jsonl"
+            with atomic_write(json_path) as outfile:
+                for key in fficf_dict:
+                    scores_dict = {PREMON_FRAME_PREFIX+frame.lower(): score for frame, score in fficf_dict[key][:top_k]}
+                    outfile.write(json.dumps({"event type": key, "scores": scores_dict}, sort_keys=True))
+                    outfile.write("\n")
+        else:
+            json_path = f"{output_folder}/typicality_scores.json"
+            frames = sorted({frame for key in fficf_dict for frame, score in fficf_dict[key][:top_k]})
+            frame_ids = {frame: position for position, frame in enumerate(frames)}
+            with atomic_write(json_path) as outfile:
+                outfile.write('{"frames": ')
+                outfile.write(json.dumps([PREMON_FRAME_PREFIX+frame.lower() for frame in frames]))
+                outfile.write(', "event types": {')
+                for position, key in enumerate(fficf_dict):
+                    scores = [None] * len(frames)
+                    for frame, score in fficf_dict[key][:top_k]:
+                        scores[frame_ids[frame]] = score
+                    if position:
+                        outfile.write(', ')
+                    outfile.write(f"{json.dumps(key)}: {json.dumps(scores)}")
+                outfile.write('}}')
+
+    if verbose:
+        print(f"exported typicality scores of {len(fficf_dict)} event types to {json_path}")
+    return
 
 ###other possibly useful functions###
 
@@ -277,32 +559,59 @@ def top_n_frames(typicality_scores, top_n_typical_frames, verbose=0):
 
     return the_target_frames
 
+def time_bucket_frame_counts(big_df,
+                             target_frames=None):
+    """
+    sum the frame frequencies of all documents per time bucket in one grouped aggregation.
+    returns a time bucket x frame dataframe, restricted to the target frames if they are given.
+    :param big_df: dataframe with a 'time bucket' column and a column with frame frequencies per frame
+    :param target_frames: the frames to count
+    :type big_df: pandas.DataFrame
+    :type target_frames: list
+    """
+    if target_frames:
+        target_frames = set(target_frames)
+    frame_columns = [frame_label for frame_label in big_df.columns
+                     if frame_label != 'time bucket' and (not target_frames or frame_label in target_frames)]
+    return big_df.groupby('time bucket')[frame_columns].sum()
+
 def get_time_bucket_to_frame_to_freq(big_df,
                                      target_frames=None):
 
-    the_time_buckets = set(big_df['time bucket'])
-    time_bucket_to_frame_to_freq = {}
-    frame_to_freq = defaultdict(int)
-    time_bucket_to_total_frame_occurrences = defaultdict(int)
-
-    for time_bucket in the_time_buckets:
-        time_bucket_df = big_df[big_df['time bucket'] == time_bucket]
-        time_bucket_to_frame_to_freq[time_bucket] = {}
+    frame_counts = time_bucket_frame_counts(big_df=big_df,
+                                            target_frames=target_frames)
 
-        for frame_label in time_bucket_df.columns:
-            if frame_label != 'time bucket':
-
-                if target_frames:
-                    if frame_label not in target_frames:
-                        continue
-
-                total = sum(time_bucket_df[frame_label])
-                time_bucket_to_frame_to_freq[time_bucket][frame_label] = total
-                frame_to_freq[frame_label] += total
-                time_bucket_to_total_frame_occurrences[time_bucket] += total
+    time_bucket_to_frame_to_freq = frame_counts.to_dict(orient='index')
+    frame_to_freq = defaultdict(int, frame_counts.sum(axis=0).to_dict())
+    time_bucket_to_total_frame_occurrences = defaultdict(int, frame_counts.sum(axis=1).to_dict())
 
     return time_bucket_to_frame_to_freq, frame_to_freq, time_bucket_to_total_frame_occurrences
 
+def c_tf_idf_frame_counts(frame_counts,
+                          number_of_docs):
+    """
+    calculates c_tf_idf for every cell of a time bucket x frame dataframe at once, see c_tf_idf.
+    returns a long-format dataframe with the columns 'time bucket', 'frame' and 'c_tf_idf'.
+    :param frame_counts: time bucket x frame dataframe with summed frame frequencies
+    :param number_of_docs: the total number of documents
+    :type frame_counts: pandas.DataFrame
+    :type number_of_docs: integer
+    """
+    counts = frame_counts.to_numpy(dtype=np.float64)
+    time_bucket_totals = counts.sum(axis=1, keepdims=True)
+    frame_totals = counts.sum(axis=0, keepdims=True)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = (counts / time_bucket_totals) * np.log(np.divide(number_of_docs, frame_totals))
+
+    import pandas as pd #pandas is only needed for the time bucket analysis
+    n_time_buckets, n_frames = counts.shape
+    c_tf_idf_df = pd.DataFrame({'time bucket': np.repeat(frame_counts.index.to_numpy(), n_frames),
+                                'frame': np.tile(frame_counts.columns.to_numpy(), n_time_buckets),
+                                'c_tf_idf': scores.ravel()},
+                               columns=['time bucket', 'frame', 'c_tf_idf'])
+    return c_tf_idf_df
+
 def compute_c_tf_idf_between_time_buckets(typicality_scores,
                                           train_df,
                                           dev_df,
@@ -313,37 +622,61 @@ def compute_c_tf_idf_between_time_buckets(typicality_scores,
                                      top_n_typical_frames=top_n_typical_frames,
                                      verbose=verbose)
 
+    import pandas as pd
     the_big_df = pd.concat([train_df,
                                 dev_df,
                                 test_df], axis=0)
 
-
-    # time_bucket -> frame -> frequency
-    # total frequency of a frame across time buckets
-    # total number of frame occurrences per time bucket
-    time_bucket_to_frame_to_freq,\
-    frame_to_freq, \
-    time_bucket_to_total_frame_occurrences = get_time_bucket_to_frame_to_freq(big_df=the_big_df,
-                                                                              target_frames=the_target_frames)
-
+    # time bucket x frame frequencies, restricted to the target frames
+    frame_counts = time_bucket_frame_counts(big_df=the_big_df,
+                                            target_frames=the_target_frames)
 
     # total number of docs
     number_of_docs = len(the_big_df)
 
-    list_of_lists = []
-    headers = ['time bucket', 'frame', 'c_tf_idf']
-
-    for time_bucket, tb_frame_to_freq in time_bucket_to_frame_to_freq.items():
+    c_tf_idf_df = c_tf_idf_frame_counts(frame_counts=frame_counts,
+                                        number_of_docs=number_of_docs)
+    return c_tf_idf_df
 
-        for frame, tb_freq in tb_frame_to_freq.items():
+def compute_c_tf_idf_between_time_buckets_for_event_types(event_type_to_typicality_scores,
+                                                          train_df,
+                                                          dev_df,
+                                                          test_df,
+                                                          top_n_typical_frames,
+                                                          verbose=0):
+    """
+    compute_c_tf_idf_between_time_buckets for the typicality scores of several event types in one call.
+    the frame frequencies per time bucket are aggregated once for the union of the target frames of all event types.
+    returns a long-format dataframe with the columns 'event type', 'time bucket', 'frame' and 'c_tf_idf'.
+    :param event_type_to_typicality_scores: event type -> frame -> typicality score
+    :param top_n_typical_frames: the number of most typical frames per event type, or 'all'
+    :type event_type_to_typicality_scores: dictionary
+    """
+    event_type_to_target_frames = {}
+    for event_type, typicality_scores in event_type_to_typicality_scores.items():
+        event_type_to_target_frames[event_type] = top_n_frames(typicality_scores=typicality_scores,
+                                                               top_n_typical_frames=top_n_typical_frames,
+                                                               verbose=verbose)
+    all_target_frames = set()
+    for target_frames in event_type_to_target_frames.values():
+        all_target_frames.update(target_frames)
+
+    import pandas as pd
+    the_big_df = pd.concat([train_df,
+                                dev_df,
+                                test_df], axis=0)
 
-            c_tf_idf_score = c_tf_idf(frame_freq_event_type=tb_freq,
-                                      total_freq_frames_event_type=time_bucket_to_total_frame_occurrences[time_bucket],
-                                      total_n_docs=number_of_docs,
-                                      frame_freq_event_types=frame_to_freq[frame])
-            one_row = [time_bucket, frame, c_tf_idf_score]
-            list_of_lists.append(one_row)
+    frame_counts = time_bucket_frame_counts(big_df=the_big_df,
+                                            target_frames=all_target_frames)
+    number_of_docs = len(the_big_df)
 
+    dfs = []
+    for event_type, target_frames in event_type_to_target_frames.items():
+        target_frames = set(target_frames)
+        columns = [frame_label for frame_label in frame_counts.columns if frame_label in target_frames]
+        c_tf_idf_df = c_tf_idf_frame_counts(frame_counts=frame_counts[columns],
+                                            number_of_docs=number_of_docs)
+        c_tf_idf_df.insert(0, 'event type', event_type)
+        dfs.append(c_tf_idf_df)
 
-    c_tf_idf_df = pd.DataFrame(list_of_lists, columns=headers)
-    return c_tf_idf_df
+    return pd.concat(dfs, axis=0, ignore_index=True)
@@ -0,0 +1,120 @@
+import json
+import os
+import numpy as np
+from .fficf_utils import PREMON_FRAME_PREFIX, create_output_folder, top_k_frames
+
+MATRIX_NAME = 'typicality_scores.npy'
+LABELS_NAME = 'typicality_labels.json'
+
+def matrix_to_index(score_matrix, event_types, frames, output_folder, start_from_scratch=False, verbose=0):
+    """
+    write an event type x frame score matrix as a score index: a float32 .npy matrix that can be memory-mapped and a json file with the
+    event types of the rows and the frames of the columns.
+    :param score_matrix: event type x frame matrix with typicality scores
+    :param event_types: event types in the order of the rows
+    :param frames: frame labels in the order of the columns
+    :param output_folder: output folder
+    :type score_matrix: numpy.ndarray
+    :type event_types: list
+    :type frames: list
+    :type output_folder: string
+    """
+    assert np.shape(score_matrix) == (len(event_types), len(frames)), "score matrix does not match the event types and frames"
+    create_output_folder(output_folder=output_folder,
+                        start_from_scratch=start_from_scratch,
+                        verbose=verbose)
+    np.save(os.path.join(output_folder, MATRIX_NAME), np.ascontiguousarray(score_matrix, dtype=np.float32))
+    with open(os.path.join(output_folder, LABELS_NAME), 'w') as outfile:
+        json.dump({'event types': list(event_types), 'frames': list(frames)}, outfile)
+    if verbose >= 1:
+        print(f"exported score index of {len(event_types)} event types and {len(frames)} frames to {output_folder}")
+
+def scores_to_index(fficf_dict, output_folder, start_from_scratch=False, verbose=0):
+    """
+    write the output of ff_icf as a score index. frames that are not scored for an event type get nan.
+    :param fficf_dict: event type -> list of (frame, score) tuples
+    :param output_folder: output folder
+    :type fficf_dict: dictionary
+    :type output_folder: string
+    """
+    event_types = list(fficf_dict)
+    frames = sorted({frame for scores in fficf_dict.values() for frame, score in scores})
+    frame_ids = {frame: column for column, frame in enumerate(frames)}
+    score_matrix = np.full((len(event_types), len(frames)), np.nan, dtype=np.float32)
+
+    for row, event_type in enumerate(event_types):
+        for frame, score in fficf_dict[event_type]:
+            score_matrix[row, frame_ids[frame]] = score
+
+    matrix_to_index(score_matrix=score_matrix,
+                    event_types=event_types,
+                    frames=frames,
+                    output_folder=output_folder,
+                    start_from_scratch=start_from_scratch,
+                    verbose=verbose)
+
+class ScoreIndex(object):
+    """
+    Read-only typicality score index written by scores_to_index or matrix_to_index.
+    The score matrix is memory-mapped, so opening the index does not read the scores, and worker processes that open the same
+    index share its pages. Frames can be given as FrameNet labels or as PreMOn uris.
+    """
+    def __init__(self, index_folder):
+        self.matrix = np.load(os.path.join(index_folder, MATRIX_NAME), mmap_mode='r')
+        with open(os.path.join(index_folder, LABELS_NAME), 'r') as infile:
+            labels = json.load(infile)
+        self.event_types = labels['event types']
+        self.frames = labels['frames']
+        self.event_type_ids = {event_type: row for row, event_type in enumerate(self.event_types)}
+        self.frame_ids = {}
+        for column, frame in enumerate(self.frames):
+            self.frame_ids[frame] = column
+            self.frame_ids[PREMON_FRAME_PREFIX + frame.lower()] = column
+
+    def row(self, event_type):
+        """returns the row of an event type"""
+        assert event_type in self.event_type_ids, f"{event_type} not in score index"
+        return self.event_type_ids[event_type]
+
+    def column(self, frame):
+        """returns the column of a frame label or PreMOn uri"""
+        assert frame in self.frame_ids, f"{frame} not in score index"
+        return self.frame_ids[frame]
+
+    def score(self, event_type, frame):
+        """returns the typicality score of a frame for an event type"""
+        return float(self.matrix[self.row(event_type), self.column(frame)])
+
+    def scores(self, pairs):
+        """
+        returns an array with the typicality scores of a batch of (event type, frame) pairs.
+        :param pairs: (event type, frame) tuples
+        :type pairs: list
+        """
+        rows = np.array([self.row(event_type) for event_type, frame in pairs], dtype=np.int64)
+        columns = np.array([self.column(frame) for event_type, frame in pairs], dtype=np.int64)
+        return np.asarray(self.matrix[rows, columns], dtype=np.float64)
+
+    def top_k(self, event_type, k):
+        """returns the k (frame, score) tuples with the highest scores for an event type"""
+        row = np.nan_to_num(np.asarray(self.matrix[self.row(event_type)], dtype=np.float64), nan=-np.inf)
+        top = top_k_frames(row[None, :], [event_type], self.frames, k)[event_type]
+        return [(frame, float(score)) for frame, score in top if score != -np.inf]
+
+    def event_types_for_frame(self, frame, k=None, threshold=None):
+        """
+        returns the (event type, score) tuples of the event types for which a frame is most typical, in descending order of the scores.
+        :param frame: frame label or PreMOn uri
+        :param k: the maximum number of event types
+        :param threshold: the minimal score
+        :type frame: string
+        :type k: integer
+        :type threshold: float
+        """
+        column = np.nan_to_num(np.asarray(self.matrix[:, self.column(frame)], dtype=np.float64), nan=-np.inf)
+        if threshold != None:
+            column[column < threshold] = -np.inf
+        if k == None:
+            k = len(self.event_types)
+        top = top_k_frames(column[None, :], [frame], self.event_types, k)[frame]
+        return [(event_type, float(score)) for event_type, score in top if score != -np.inf]
@@ -0,0 +1,253 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+try:
+    import resource
+except ImportError: #not available on windows, peak memory is then not recorded
+    resource = None
+
+logger = logging.getLogger('typical_frames')
+
+def peak_rss_mb(who='self'):
+    """returns the peak resident set size of this process ('self') or of its terminated worker processes ('children') in megabytes"""
+    if resource == None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if who == 'children' else resource.RUSAGE_SELF)
+    peak = usage.ru_maxrss
+    if sys.platform == 'darwin': #bytes on macOS, kilobytes elsewhere
+        peak = peak / 1024
+    return round(peak / 1024, 1)
+
+try:
+    PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError, OSError): #no sysconf on windows, the resident memory is then not sampled
+    PAGE_SIZE = None
+
+def current_rss_mb():
+    """returns the current resident set size of this process (Linux) in megabytes, or None"""
+    if PAGE_SIZE == None:
+        return None
+    try:
+        with open('/proc/self/statm', 'r') as infile:
+            return round(int(infile.read().split()[1]) * PAGE_SIZE / 1024 ** 2, 1)
+    except (OSError, IndexError, ValueError):
+        return None
+
+def max_of(first, second):
+    """returns the maximum of two values that can be None"""
+    if first == None:
+        return second
+    if second == None:
+        return first
+    return max(first, second)
+
+class StagePeaks(object):
+    """
+    Measures the peak resident memory of this process per stage, where stages can be nested. while a stage is open a background thread
+    samples the resident memory every interval seconds and every sample counts for all open stages, so an enclosing stage reports the maximum
+    over its own code and its inner stages. the state of the process is not changed, so a peak that lasts shorter than the interval can be missed.
+    the peak of a stage is None where the resident memory cannot be read (outside Linux).
+    :param interval: seconds between two samples
+    :type interval: float
+    """
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.open_peaks = []
+        self.process_peak = None
+        self.lock = threading.Lock()
+        self.sampler = None
+        self.stopped = None
+
+    def sample(self):
+        """read the resident memory, add it to the peaks of the open stages and return it"""
+        current = current_rss_mb()
+        with self.lock:
+            self.open_peaks = [max_of(peak, current) for peak in self.open_peaks]
+        return current
+
+    def run_sampler(self, stopped):
+        while not stopped.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        """start measuring a stage"""
+        with self.lock:
+            self.open_peaks.append(None)
+        if self.sample() != None and self.sampler == None:
+            self.stopped = threading.Event()
+            self.sampler = threading.Thread(target=self.run_sampler, args=(self.stopped,), name='typical_frames stage peaks', daemon=True)
+            self.sampler.start()
+
+    def stop(self):
+        """stop measuring the innermost stage and return its peak resident memory in megabytes"""
+        self.sample()
+        with self.lock:
+            peak = self.open_peaks.pop()
+            last = not self.open_peaks
+        if last and self.sampler != None:
+            self.stopped.set()
+            self.sampler.join()
+            self.sampler = None
+        self.process_peak = max_of(self.process_peak, max_of(peak, peak_rss_mb()))
+        return peak
+
+def children_cpu_seconds():
+    """returns the cpu time spent by terminated worker processes"""
+    if resource == None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+class LogSink(object):
+    """sends every stage record as one line to the typical_frames logger"""
+    def __init__(self, level=logging.INFO, log=None):
+        self.level = level
+        self.log = log or logger
+
+    def __call__(self, record):
+        self.log.log(self.level, "stage %s: %s", record['stage'], json.dumps(record, sort_keys=True))
+
+class JsonSink(object):
+    """appends every stage record as one json line to a file, so that the records of a crashed run are kept"""
+    def __init__(self, path):
+        self.path = path
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+
+    def __call__(self, record):
+        with open(self.path, 'a') as outfile:
+            outfile.write(json.dumps(record, sort_keys=True))
+            outfile.write("\n")
+
+class MemorySink(object):
+    """keeps the stage records in a list, e.g. for tests"""
+    def __init__(self):
+        self.records = []
+
+    def __call__(self, record):
+        self.records.append(record)
+
+    def stages(self):
+        """returns the names of the recorded stages in order"""
+        return [record['stage'] for record in self.records]
+
+    def get(self, stage):
+        """returns the last record of a stage or None"""
+        for record in reversed(self.records):
+            if record['stage'] == stage:
+                return record
+        return None
+
+class Instrumentation(object):
+    """
+    Records per pipeline stage the wall time, the cpu time (including terminated worker processes), the peak resident memory
+    of the stage ('peak rss mb', Linux only) and of the process and its terminated workers so far ('process peak rss mb', 'process peak worker rss mb'), the number of documents and predicates processed and the throughput, and sends a record per stage to every sink.
+    Stages for which profiling is switched on are run under cProfile and/or tracemalloc.
+    :param sinks: callables that receive a dictionary per stage, by default a LogSink
+    :param profile: names of the stages that are run under cProfile, or True for all stages
+    :param trace_memory: names of the stages for which the Python heap peak is traced with tracemalloc, or True for all stages
+    :param profile_folder: folder in which the cProfile statistics are written as <stage>.prof. without a folder the 20 most expensive functions are added to the record
+    :type sinks: list
+    :type profile: set
+    :type trace_memory: set
+    :type profile_folder: string
+    """
+    def __init__(self, sinks=None, profile=(), trace_memory=(), profile_folder=None):
+        if sinks == None:
+            sinks = [LogSink()]
+        self.sinks = list(sinks)
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.profile_folder = profile_folder
+        self.profiling = False
+        self.peaks = StagePeaks()
+
+    def switched_on(self, setting, stage):
+        """returns whether a per-stage setting (True or a collection of stage names) holds for stage"""
+        return setting is True or stage in setting
+
+    @contextmanager
+    def stage(self, name, **counts):
+        """
+        time the body of the with statement as stage name. yields the record, in which the body can fill in
+        'documents', 'predicates' or other counts when they are known only afterwards.
+        """
+        record = {'stage': name, 'documents': None, 'predicates': None}
+        record.update(counts)
+
+        profiler = None
+        if self.switched_on(self.profile, name) and not self.profiling:
+            import cProfile
+            profiler = cProfile.Profile()
+            self.profiling = True
+        tracing = self.switched_on(self.trace_memory, name) and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+
+        self.peaks.start()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time() + children_cpu_seconds()
+        if profiler != None:
+            profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler != None:
+                profiler.disable()
+                self.profiling = False
+            record['wall seconds'] = round(time.perf_counter() - wall_start, 6)
+            record['cpu seconds'] = round(time.process_time() + children_cpu_seconds() - cpu_start, 6)
+            record['peak rss mb'] = self.peaks.stop()
+            record['process peak rss mb'] = self.peaks.process_peak
+            record['process peak worker rss mb'] = peak_rss_mb('children')
+            if tracing:
+                record['traced peak mb'] = round(tracemalloc.get_traced_memory()[1] / 1024 ** 2, 3)
+                tracemalloc.stop()
+            if profiler != None:
+                record['profile'] = self.profile_stats(name, profiler)
+            for unit in ['documents', 'predicates']:
+                if record[unit] != None and record['wall seconds'] > 0:
+                    record[f'{unit} per second'] = round(record[unit] / record['wall seconds'], 2)
+            for sink in self.sinks:
+                sink(record)
+
+    def profile_stats(self, name, profiler):
+        """writes the statistics of a profiled stage to the profile folder and returns its path, or returns the top of the statistics as text"""
+        import pstats
+        if self.profile_folder != None:
+            os.makedirs(self.profile_folder, exist_ok=True)
+            path = os.path.join(self.profile_folder, f"{name}.prof")
+            profiler.dump_stats(path)
+            return path
+        import io
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(20)
+        return stream.getvalue()
+
+@contextmanager
+def stage(instrumentation, name, **counts):
+    """
+    time a stage with instrumentation, or do nothing if instrumentation is None.
+    yields a record dictionary in both cases, so that the counts can always be filled in.
+    """
+    if instrumentation == None:
+        yield dict(counts)
+    else:
+        with instrumentation.stage(name, **counts) as record:
+            yield record
+
+def count_predicates(collections):
+    """returns the number of documents and annotated predicates of a collection of collections of frame info dictionaries"""
+    n_documents = 0
+    n_predicates = 0
+    for collection in collections.values():
+        for info_dict in collection:
+            n_documents += 1
+            for title, info in info_dict.items():
+                n_predicates += len(info['frame info'])
+    return n_documents, n_predicates
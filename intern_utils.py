@@ -0,0 +1,141 @@
+import json
+import sqlite3
+from array import array
+import numpy as np
+from .vocab_utils import FrameVocabulary
+from .corpus_utils import select_event_types
+from .store_utils import SQL_COLUMNS, check_partition, check_event_types, event_type_filter
+
+INTERNED_COLUMNS = ('frame', 'lemma', 'POS') #the predicate columns that can be interned
+
+class InternedCorpus(object):
+    """
+    The reference texts per event type with the frames of every text as a NumPy array of frame ids. the frames are interned in self.frames
+    while the corpus is read, so no dictionary per predicate is kept, and are decoded only for the exported scores.
+    self.documents is a dictionary with event type as key and a list with an array of frame ids per document as value.
+    the lemma and POS of the predicates are interned in the same way when they are among the columns: self.vocabularies has a vocabulary
+    per column and self.interned has per column the arrays of ids per event type, in the order of self.documents, which is self.interned['frame'].
+    :param columns: the predicate columns that are read, see INTERNED_COLUMNS. the frame is always read
+    :type columns: tuple
+    """
+    def __init__(self, columns=('frame',)):
+        for column in columns:
+            assert column in INTERNED_COLUMNS, f"{column} cannot be interned"
+        self.columns = ('frame',) + tuple(column for column in columns if column != 'frame')
+        self.vocabularies = {column: FrameVocabulary() for column in self.columns}
+        self.interned = {column: {} for column in self.columns}
+        self.frames = self.vocabularies['frame']
+        self.documents = self.interned['frame']
+
+    def column_ids(self, column, labels):
+        """returns the array of ids of a sequence of labels of a column, adding new labels to the vocabulary of the column"""
+        return np.fromiter(map(self.vocabularies[column].add, labels), dtype=np.int32, count=len(labels))
+
+    def frame_ids(self, frames):
+        """returns the array of ids of a sequence of frame labels, adding new labels to the vocabulary"""
+        return self.column_ids('frame', frames)
+
+    def decode(self, column, ids):
+        """returns the labels of an array of ids of a column"""
+        labels = self.vocabularies[column].labels
+        return [labels[label_id] for label_id in ids.tolist()]
+
+    @classmethod
+    def from_store(cls, path, event_types=None, project=None, language=None, columns=('frame',)):
+        """
+        read the frames of the documents in a sqlite store written by load_corpus. only the frame column of the predicates is read,
+        and the lemma and POS columns if they are among the columns.
+        a store with several projects or languages requires a project and language.
+        :param path: path to the sqlite store
+        :param event_types: event types to read, all event types if None
+        :param project: only read the documents of this project
+        :param language: only read the documents of this language
+        :param columns: the predicate columns that are read, see INTERNED_COLUMNS
+        :type path: string
+        :type event_types: list
+        :type project: string
+        :type language: string
+        :type columns: tuple
+        """
+        check_partition(path, project, language)
+        check_event_types(path, event_types, project, language)
+        corpus = cls(columns=columns)
+        where, parameters = event_type_filter(event_types, project, language)
+        sql_columns = [SQL_COLUMNS[column][0] for column in corpus.columns]
+        connection = sqlite3.connect(path)
+        documents = connection.execute(f"SELECT doc_id, event_type FROM documents{where} ORDER BY doc_id", parameters).fetchall()
+        doc_column = array('q')
+        id_columns = [array('i') for column in corpus.columns]
+        adds = [corpus.vocabularies[column].add for column in corpus.columns]
+        for row in connection.execute(f"SELECT doc_id, {', '.join(sql_columns)} FROM predicates{where} ORDER BY rowid", parameters):
+            doc_column.append(row[0])
+            for id_column, add, label in zip(id_columns, adds, row[1:]):
+                id_column.append(add(label))
+        connection.close()
+
+        #the predicates of a document are consecutive, the ids of every document are a slice of one array per column
+        doc_ids = np.frombuffer(doc_column, dtype=np.int64)
+        order = np.argsort(doc_ids, kind='stable')
+        doc_ids = doc_ids[order]
+        id_arrays = [np.frombuffer(id_column, dtype=np.int32)[order] for id_column in id_columns]
+        document_ids = np.array([doc_id for doc_id, event_type in documents], dtype=np.int64)
+        starts = np.searchsorted(doc_ids, document_ids, side='left')
+        ends = np.searchsorted(doc_ids, document_ids, side='right')
+        for (doc_id, event_type), start, end in zip(documents, starts.tolist(), ends.tolist()):
+            for column, ids in zip(corpus.columns, id_arrays):
+                corpus.interned[column].setdefault(event_type, []).append(ids[start:end])
+        return corpus
+
+    @classmethod
+    def from_json(cls, path, event_types=None, columns=('frame',)):
+        """
+        read the frames of the documents in the corpus_info.json written by load_corpus. the frame of every predicate, and its lemma and POS
+        if they are among the columns, are interned while the file is parsed, so the dictionaries of the predicates are freed right away.
+        :param path: path to the json file
+        :param event_types: event types to read, all event types if None
+        :param columns: the predicate columns that are read, see INTERNED_COLUMNS
+        :type path: string
+        :type event_types: list
+        :type columns: tuple
+        """
+        corpus = cls(columns=columns)
+        with open(path, 'r') as infile:
+            corpus_dict = json.load(infile, object_hook=corpus.json_object)
+        if event_types != None:
+            corpus_dict = select_event_types(event_types=event_types, corpus_dict=corpus_dict, verbose=0)
+        for event_type, documents in corpus_dict.items():
+            for column in corpus.columns:
+                corpus.interned[column][event_type] = [np.concatenate([ids[column] for ids in document.values()]) for document in documents]
+        return corpus
+
+    def json_object(self, obj):
+        """
+        object_hook of json.load: keeps only the interned columns of a predicate and turns the frame info of a document into an array of ids per column
+        """
+        if 'frame info' in obj and 'frame frequency' in obj:
+            predicates = list(obj['frame info'].values())
+            return {column: self.column_ids(column, [predicate[position] for predicate in predicates])
+                    for position, column in enumerate(self.columns)}
+        if isinstance(obj.get('frame'), str):
+            return tuple(obj.get(column) for column in self.columns)
+        return obj
+
+    def frame_count_matrix(self, documents=None):
+        """
+        count the frames per event type with one bincount per event type.
+        returns the event types of the rows, the frames that occur as columns in sorted order and a dense event type x frame count matrix.
+        :param documents: event type -> list of frame id arrays, e.g. a sample of self.documents. all documents by default
+        :type documents: dictionary
+        """
+        if documents == None:
+            documents = self.documents
+        event_types = list(documents)
+        counts = np.zeros((len(event_types), len(self.frames)), dtype=np.int64)
+        for row, event_type in enumerate(event_types):
+            if documents[event_type]:
+                counts[row] = np.bincount(np.concatenate(documents[event_type]), minlength=len(self.frames))
+
+        occurring = np.flatnonzero(counts.sum(axis=0))
+        columns = sorted(occurring.tolist(), key=lambda frame_id: self.frames.labels[frame_id])
+        frames = [self.frames.labels[frame_id] for frame_id in columns]
+        return event_types, frames, counts[:, columns]
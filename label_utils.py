@@ -0,0 +1,139 @@
+import json
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+WIKIDATA_ENDPOINT = "https://www.wikidata.org/entity/{identifier}.json"
+SQLITE_BATCH = 500 #the number of identifiers per SELECT, below the SQLite limit on query parameters
+
+class LabelResolver(object):
+    """
+    Resolves Wikidata identifiers to their labels, with a persistent SQLite cache.
+    Identifiers that are not in the cache are fetched concurrently with a pool of at most max_workers threads that share one HTTP session.
+    In offline mode only the cache is used.
+    :param cache_path: path of the SQLite cache, or None for a cache in memory
+    :param endpoint: url template with an {identifier} field that returns the Wikidata entity json, e.g. of a local stand-in server
+    :param language: the language of the labels
+    :param offline: never fetch, unresolved identifiers get no label
+    :param max_workers: the maximal number of concurrent requests
+    :param timeout: the timeout per request in seconds
+    :type cache_path: string
+    :type endpoint: string
+    :type language: string
+    :type offline: boolean
+    :type max_workers: integer
+    :type timeout: float
+    """
+    def __init__(self, cache_path=None, endpoint=WIKIDATA_ENDPOINT, language='en', offline=False, max_workers=8, timeout=10):
+        if cache_path == None:
+            cache_path = ':memory:'
+        else:
+            folder = os.path.dirname(os.path.abspath(cache_path))
+            os.makedirs(folder, exist_ok=True)
+        self.endpoint = endpoint
+        self.language = language
+        self.offline = offline
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.session = None
+        self.errors = {}
+        self.connection = sqlite3.connect(cache_path)
+        self.connection.execute("""CREATE TABLE IF NOT EXISTS labels (
+                                    identifier TEXT NOT NULL,
+                                    language TEXT NOT NULL,
+                                    label TEXT NOT NULL,
+                                    PRIMARY KEY (identifier, language))""")
+        self.connection.commit()
+
+    def cached(self, identifiers):
+        """returns a dictionary with the cached label per identifier"""
+        labels = {}
+        identifiers = list(identifiers)
+        for start in range(0, len(identifiers), SQLITE_BATCH):
+            batch = identifiers[start:start + SQLITE_BATCH]
+            placeholders = ", ".join("?" * len(batch))
+            rows = self.connection.execute(f"SELECT identifier, label FROM labels WHERE language = ? AND identifier IN ({placeholders})",
+                                            [self.language] + batch)
+            labels.update(rows)
+        return labels
+
+    def store(self, labels):
+        """add labels to the cache in one transaction"""
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO labels (identifier, language, label) VALUES (?, ?, ?)",
+                                        [(identifier, self.language, label) for identifier, label in labels.items()])
+
+    def http_session(self):
+        """returns the HTTP session, with a connection pool as large as the number of workers"""
+        if self.session == None:
+            import requests
+            self.session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+            self.session.mount('http://', adapter)
+            self.session.mount('https://', adapter)
+        return self.session
+
+    def fetch(self, identifier):
+        """returns the label of one identifier from the endpoint, or None if the entity has no label in the language"""
+        response = self.http_session().get(self.endpoint.format(identifier=identifier), timeout=self.timeout)
+        response.raise_for_status()
+        entities = json.loads(response.text)["entities"]
+        if identifier in entities:
+            entity = entities[identifier]
+        else: #the identifier redirects to another entity
+            entity = next(iter(entities.values()))
+        label = entity.get("labels", {}).get(self.language)
+        if label == None:
+            return None
+        return label["value"]
+
+    def safe_fetch(self, identifier):
+        """fetch without raising, returns the identifier, the label and the error message"""
+        try:
+            return identifier, self.fetch(identifier), None
+        except Exception as error:
+            return identifier, None, f"{type(error).__name__}: {error}"
+
+    def resolve(self, identifiers, strict=False):
+        """
+        returns a dictionary with the label per identifier. identifiers that cannot be resolved get None,
+        the reason is kept in self.errors. with strict=True a LookupError is raised instead.
+        :param identifiers: wikidata identifiers
+        :param strict: raise if an identifier cannot be resolved
+        :type identifiers: list
+        :type strict: boolean
+        """
+        identifiers = list(dict.fromkeys(identifiers))
+        labels = self.cached(identifiers)
+        missing = [identifier for identifier in identifiers if identifier not in labels]
+
+        if missing and not self.offline:
+            fetched = {}
+            with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(missing)))) as executor:
+                for identifier, label, error in executor.map(self.safe_fetch, missing):
+                    if error != None:
+                        self.errors[identifier] = error
+                    elif label == None:
+                        self.errors[identifier] = f"no {self.language} label"
+                    else:
+                        fetched[identifier] = label
+            self.store(fetched)
+            labels.update(fetched)
+        elif missing:
+            for identifier in missing:
+                self.errors[identifier] = "not in cache (offline)"
+
+        unresolved = [identifier for identifier in identifiers if identifier not in labels]
+        if strict and unresolved:
+            raise LookupError(f"no label for {', '.join(unresolved)}: {self.errors[unresolved[0]]}")
+        return {identifier: labels.get(identifier) for identifier in identifiers}
+
+    def label(self, identifier, strict=False):
+        """returns the label of one identifier"""
+        return self.resolve([identifier], strict=strict)[identifier]
+
+    def close(self):
+        """close the cache and the HTTP session"""
+        self.connection.close()
+        if self.session != None:
+            self.session.close()
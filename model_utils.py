@@ -0,0 +1,157 @@
+import numpy as np
+from collections import Counter
+from .fficf_utils import frames_from_dict, normalize_rows, ranked_scores, top_k_frames
+from .vocab_utils import FrameVocabulary
+
+class TypicalityModel(object):
+    """
+    Persistent ff*icf model that is updated document by document.
+    It keeps the frame counts per event type, the total number of frames per event type, the total frequency per frame across
+    event types and the number of documents. add_documents and remove_documents only update the row of the event type and the
+    columns of the frames involved, after which the scores are recomputed and min-max scaled with array operations.
+    Unlike contrastive_analysis, all documents are used and no sample of equal size per event type is drawn.
+    """
+    def __init__(self):
+        self.vocabulary = FrameVocabulary()
+        self.event_types = []
+        self.event_type_ids = {}
+        self.counts = np.zeros((0, 0), dtype=np.int64) #event type x frame counts
+        self.event_type_totals = np.zeros(0, dtype=np.int64) #total number of frames per event type
+        self.frame_totals = np.zeros(0, dtype=np.int64) #total frequency per frame across event types
+        self.event_type_docs = np.zeros(0, dtype=np.int64) #number of documents per event type
+        self.tf = np.zeros((0, 0), dtype=np.float64) #relative frame frequency per event type
+
+    @classmethod
+    def from_corpus(cls, corpus_dict):
+        """create a model from a dictionary with event type as key and a list of frame_info dictionaries as value"""
+        model = cls()
+        for event_type, info_dicts in corpus_dict.items():
+            model.add_documents(event_type, info_dicts)
+        return model
+
+    @property
+    def n_docs(self):
+        """the total number of documents across event types"""
+        return int(self.event_type_docs.sum())
+
+    def event_type_row(self, event_type):
+        """returns the row of an event type, adding an empty row if it is new"""
+        if event_type not in self.event_type_ids:
+            self.event_type_ids[event_type] = len(self.event_types)
+            self.event_types.append(event_type)
+            n_frames = len(self.vocabulary)
+            self.counts = np.vstack([self.counts, np.zeros((1, n_frames), dtype=np.int64)])
+            self.tf = np.vstack([self.tf, np.zeros((1, n_frames))])
+            self.event_type_totals = np.append(self.event_type_totals, 0)
+            self.event_type_docs = np.append(self.event_type_docs, 0)
+        return self.event_type_ids[event_type]
+
+    def frame_columns(self, frames):
+        """returns the columns of frames, adding empty columns for new frames"""
+        columns = np.array([self.vocabulary.add(frame) for frame in frames], dtype=np.int64)
+        n_new = len(self.vocabulary) - self.counts.shape[1]
+        if n_new > 0:
+            n_event_types = len(self.event_types)
+            self.counts = np.hstack([self.counts, np.zeros((n_event_types, n_new), dtype=np.int64)])
+            self.tf = np.hstack([self.tf, np.zeros((n_event_types, n_new))])
+            self.frame_totals = np.append(self.frame_totals, np.zeros(n_new, dtype=np.int64))
+        return columns
+
+    def update(self, event_type, info_dicts, sign):
+        """add (sign=1) or subtract (sign=-1) the frame counts of documents of one event type"""
+        counter = Counter()
+        for info_dict in info_dicts:
+            counter.update(frames_from_dict(info_dict))
+
+        freqs = np.array(list(counter.values()), dtype=np.int64)
+        if sign > 0:
+            row = self.event_type_row(event_type)
+            columns = self.frame_columns(list(counter))
+        else: #validate against the current counts first, so that a failed removal leaves the model unchanged
+            assert event_type in self.event_type_ids, f"{event_type} is not in the model"
+            row = self.event_type_ids[event_type]
+            for frame in counter:
+                assert frame in self.vocabulary, f"removed frames that were not added to {event_type}"
+            columns = np.array([self.vocabulary.ids[frame] for frame in counter], dtype=np.int64)
+            assert (self.counts[row, columns] >= freqs).all(), f"removed frames that were not added to {event_type}"
+            assert self.event_type_docs[row] >= len(info_dicts), f"removed more documents than were added to {event_type}"
+        freqs = freqs * sign
+
+        self.counts[row, columns] += freqs
+        self.frame_totals[columns] += freqs
+        self.event_type_totals[row] += freqs.sum()
+        self.event_type_docs[row] += sign * len(info_dicts)
+
+        if self.event_type_totals[row] > 0:
+            self.tf[row] = self.counts[row] / self.event_type_totals[row]
+        else:
+            self.tf[row] = 0
+
+    def add_documents(self, event_type, info_dicts):
+        """
+        add documents to an event type and update its row and the columns of its frames.
+        :param event_type: the event type of the documents
+        :param info_dicts: frame_info dictionaries of the documents
+        :type event_type: string
+        :type info_dicts: list
+        """
+        self.update(event_type, info_dicts, 1)
+
+    def remove_documents(self, event_type, info_dicts):
+        """
+        remove previously added documents from an event type and update its row and the columns of its frames.
+        :param event_type: the event type of the documents
+        :param info_dicts: frame_info dictionaries of the documents
+        :type event_type: string
+        :type info_dicts: list
+        """
+        self.update(event_type, info_dicts, -1)
+
+    def scores(self):
+        """
+        returns the event types, the frames and the event type x frame matrix with normalized ff*icf scores.
+        event types without frames and frames without occurrences are left out, the frames are sorted.
+        """
+        rows = np.flatnonzero(self.event_type_totals > 0)
+        labels = self.vocabulary.labels
+        columns = np.array(sorted(np.flatnonzero(self.frame_totals > 0), key=lambda column: labels[column]), dtype=np.int64) #frames in sorted order, like ff_icf
+        with np.errstate(divide='ignore'):
+            icf = np.log(np.divide(self.n_docs, self.frame_totals[columns]))
+        score_matrix = normalize_rows(self.tf[np.ix_(rows, columns)] * icf)
+        event_types = [self.event_types[row] for row in rows]
+        frames = [labels[column] for column in columns]
+        return event_types, frames, score_matrix
+
+    def fficf_dict(self, top_k=None):
+        """returns the scores in the format of ff_icf: event type -> list of (frame, score) tuples in descending order of the scores"""
+        event_types, frames, score_matrix = self.scores()
+        if top_k != None:
+            return top_k_frames(score_matrix, event_types, frames, top_k)
+        return ranked_scores(score_matrix, event_types, frames)
+
+    def save(self, path):
+        """store the model in a .npz file"""
+        np.savez_compressed(path,
+                            event_types=np.array(self.event_types, dtype=str),
+                            frames=np.array(self.vocabulary.labels, dtype=str),
+                            counts=self.counts,
+                            event_type_docs=self.event_type_docs)
+
+    @classmethod
+    def load(cls, path):
+        """load a model stored with save"""
+        model = cls()
+        with np.load(path) as data:
+            model.event_types = [str(event_type) for event_type in data['event_types']]
+            model.vocabulary = FrameVocabulary()
+            for frame in data['frames']:
+                model.vocabulary.add(str(frame))
+            model.counts = data['counts'].astype(np.int64).reshape(len(model.event_types), len(model.vocabulary))
+            model.event_type_docs = data['event_type_docs'].astype(np.int64)
+        model.event_type_ids = {event_type: row for row, event_type in enumerate(model.event_types)}
+        model.event_type_totals = model.counts.sum(axis=1)
+        model.frame_totals = model.counts.sum(axis=0)
+        model.tf = np.zeros(model.counts.shape)
+        filled = model.event_type_totals > 0
+        model.tf[filled] = model.counts[filled] / model.event_type_totals[filled, None]
+        return model
@@ -1,31 +1,237 @@
-from .DFNDataReleases import get_relevant_info
-from .DFNDataReleases import dir_path as REPO_DIR
 from collections import defaultdict
 import os
 import json
+from .archive_utils import NAF_EXTENSIONS, ARCHIVE_EXTENSIONS, is_naf_name, doc_name, archive_members, member_reference
 
-def get_naf_paths(project,language,verbose=0):
+MANIFEST_CACHE = {} #(project, fingerprint) -> manifest, shared by all calls in this process
+
+def release_dir():
+    """returns the folder of the DFNDataReleases checkout. imported on first use, so the package can be used without it."""
+    from .DFNDataReleases import dir_path as REPO_DIR
+    return REPO_DIR
+
+def git_head(repo_dir):
     """
-    Get a dictionary with event type as key and a set of NAF paths as value.
+    returns the commit that is checked out in a git checkout, read from its HEAD without running git,
+    or None if repo_dir is not a git checkout or the commit cannot be resolved. a submodule, whose .git is a file, is followed to its git folder.
+    """
+    git_dir = os.path.join(repo_dir, '.git')
+    if os.path.isfile(git_dir):
+        with open(git_dir, 'r') as infile:
+            content = infile.read().strip()
+        if not content.startswith('gitdir:'):
+            return None
+        git_dir = os.path.join(repo_dir, content[len('gitdir:'):].strip())
+    head_path = os.path.join(git_dir, 'HEAD')
+    if not os.path.isfile(head_path):
+        return None
+    with open(head_path, 'r') as infile:
+        head = infile.read().strip()
+    if not head.startswith('ref:'):
+        return head #a detached HEAD is the commit itself
+    ref = head[len('ref:'):].strip()
+    ref_path = os.path.join(git_dir, ref)
+    if os.path.isfile(ref_path):
+        with open(ref_path, 'r') as infile:
+            return infile.read().strip()
+    packed_refs = os.path.join(git_dir, 'packed-refs')
+    if os.path.isfile(packed_refs):
+        with open(packed_refs, 'r') as infile:
+            for line in infile:
+                parts = line.split()
+                if len(parts) == 2 and parts[1] == ref:
+                    return parts[0]
+    return None
+
+def release_fingerprint(repo_dir=None):
+    """
+    returns the fingerprint of the DFNDataReleases checkout that the manifests are valid for: the commit of HEAD for a git checkout,
+    together with the relative path, mtime and size of every json file of the checkout, so json files that are edited or regenerated
+    without a commit are noticed as well. the NAF folders ('unstructured') and hidden folders are not walked, so it is cheap enough
+    to compute on every call and a long-running process notices an updated release.
+    :param repo_dir: the DFNDataReleases folder
+    :type repo_dir: string
+    """
+    if repo_dir == None:
+        repo_dir = release_dir()
+    repo_dir = os.path.abspath(repo_dir)
+
+    fingerprint = []
+    head = git_head(repo_dir)
+    if head != None:
+        fingerprint.append(['HEAD', head])
+    for folder, subfolders, files in os.walk(repo_dir):
+        subfolders[:] = sorted(subfolder for subfolder in subfolders if not subfolder.startswith('.') and subfolder != 'unstructured')
+        for file in sorted(files):
+            if file.endswith('.json'):
+                stat = os.stat(os.path.join(folder, file))
+                fingerprint.append([os.path.relpath(os.path.join(folder, file), repo_dir), stat.st_mtime_ns, stat.st_size])
+    return fingerprint
+
+def list_language_folder(folder):
+    """returns the names of the files in a folder with a single directory listing"""
+    if not os.path.isdir(folder):
+        return set()
+    with os.scandir(folder) as entries:
+        return {entry.name for entry in entries}
+
+def language_sources(unstructured, language):
+    """
+    returns a dictionary with the document name as key and the path or archive reference of its NAF file as value.
+    the NAF files of a language are either in the folder unstructured/<language>, as .naf, .naf.gz or .naf.zst files,
+    or in an archive unstructured/<language>.tar, .tar.gz, .tgz or .zip. a loose file is preferred over an archived one
+    and an uncompressed file over a compressed one.
+    """
+    folder = os.path.join(unstructured, language)
+    sources = {}
+    names = sorted(list_language_folder(folder), key=lambda name: [name.endswith(extension) for extension in NAF_EXTENSIONS], reverse=True)
+    for name in names:
+        if is_naf_name(name):
+            sources.setdefault(doc_name(name), os.path.join(folder, name))
+
+    for extension in ARCHIVE_EXTENSIONS:
+        archive_path = f"{folder}{extension}"
+        if os.path.isfile(archive_path):
+            for member in archive_members(archive_path):
+                sources.setdefault(doc_name(member), member_reference(archive_path, member))
+    return sources
+
+def naf_source(sources, folder, doc):
+    """returns the path or archive reference of the NAF file of doc, or None if it does not exist"""
+    if os.sep in doc:
+        for extension in NAF_EXTENSIONS:
+            path = os.path.join(folder, f"{doc}{extension}")
+            if os.path.exists(path):
+                return path
+        return None
+    return sources.get(doc)
+
+def manifest_paths(manifest, languages):
+    """
+    returns per language a dictionary with event type as key and a set of NAF paths as value. asserts that all NAF files of the manifest exist,
+    with one directory listing per language folder or archive.
+    """
+    language_paths = {}
+    for language in languages:
+        folder = os.path.join(manifest['unstructured'], language)
+        sources = language_sources(manifest['unstructured'], language)
+        event_type_collection = defaultdict(set)
+        for event_type, docs in manifest['languages'][language].items():
+            for doc in docs:
+                path = naf_source(sources, folder, doc)
+                assert path != None, f"{os.path.join(folder, doc)}.naf does not exist on disk"
+                event_type_collection[event_type].add(path)
+        language_paths[language] = event_type_collection
+    return language_paths
+
+def build_manifest(project, languages, fingerprint):
+    """
+    load the release information of a project once and collect the documents of every language per event type.
     :param project: the project under which the NAF files are generated.
-    :param language: the language of the reference texts.
+    :param languages: the languages of the reference texts.
+    :param fingerprint: the release fingerprint the manifest is valid for
     :type project: string
-    :type language: string
+    :type languages: list
+    :type fingerprint: list
     """
-    relevant_info = get_relevant_info(repo_dir=REPO_DIR,
+    from .DFNDataReleases import get_relevant_info
+
+    relevant_info = get_relevant_info(repo_dir=release_dir(),
                                     project=project,
                                     load_jsons=True)
-    event_type_collection = defaultdict(set)
+    language_docs = {language: defaultdict(list) for language in languages}
 
     incidents = relevant_info['proj2inc'][project]
     for incident in incidents:
-        if language in relevant_info['inc2lang2doc'][incident]:
-            doc_list = relevant_info['inc2lang2doc'][incident][language]
-            event_type = relevant_info['inc2type'][incident]
-            for doc in doc_list:
-                path = os.path.join(relevant_info["unstructured"], language, f"{doc}.naf")
-                assert os.path.exists(path), f"{path} does not exist on disk"
-                event_type_collection[event_type].add(path)
+        for language in languages:
+            if language in relevant_info['inc2lang2doc'][incident]:
+                doc_list = relevant_info['inc2lang2doc'][incident][language]
+                event_type = relevant_info['inc2type'][incident]
+                language_docs[language][event_type].extend(doc_list)
+
+    manifest = {'project': project,
+                'fingerprint': fingerprint,
+                'unstructured': relevant_info["unstructured"],
+                'languages': {language: dict(event_type_docs) for language, event_type_docs in language_docs.items()}}
+    return manifest
+
+def load_manifest(project, languages, cache_folder=None, verbose=0):
+    """
+    returns the manifest of a project with the documents per language and event type.
+    the manifest is reused within the process and, with a cache folder, across runs, as long as the release fingerprint of DFNDataReleases
+    is unchanged and all requested languages are in it, see release_fingerprint.
+    """
+    fingerprint = release_fingerprint()
+    manifest = MANIFEST_CACHE.get((project, json.dumps(fingerprint)))
+
+    manifest_path = None
+    if cache_folder != None:
+        manifest_path = os.path.join(cache_folder, f"manifest_{project}.json")
+        if manifest == None and os.path.isfile(manifest_path):
+            with open(manifest_path, 'r') as infile:
+                manifest = json.load(infile)
+            if manifest['fingerprint'] != fingerprint:
+                manifest = None
+
+    if manifest != None and not set(languages).issubset(manifest['languages']):
+        languages = sorted(set(languages) | set(manifest['languages']))
+        manifest = None
+
+    if manifest == None:
+        manifest = build_manifest(project=project,
+                                    languages=languages,
+                                    fingerprint=fingerprint)
+        if manifest_path != None:
+            os.makedirs(cache_folder, exist_ok=True)
+            temp_path = f"{manifest_path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w') as outfile:
+                json.dump(manifest, outfile)
+            os.replace(temp_path, manifest_path)
+        if verbose >= 2:
+            print(f"built manifest of {project} for languages {languages}")
+    elif verbose >= 2:
+        print(f"reused manifest of {project}")
+
+    MANIFEST_CACHE[(project, json.dumps(fingerprint))] = manifest
+    return manifest
+
+def get_naf_paths_multi(projects, languages, cache_folder=None, verbose=0):
+    """
+    Get a dictionary with (project, language) as key and a dictionary with event type as key and a set of NAF paths as value.
+    The release information is loaded once per project and the existence of the files is checked with one directory listing per language.
+    Compressed NAF files and NAF files in a tar or zip archive per language are found as well, see language_sources.
+    :param projects: the projects under which the NAF files are generated.
+    :param languages: the languages of the reference texts.
+    :param cache_folder: folder in which the manifest of each project is stored for later runs
+    :type projects: list
+    :type languages: list
+    :type cache_folder: string
+    """
+    naf_paths = {}
+
+    for project in projects:
+        manifest = load_manifest(project=project,
+                                    languages=languages,
+                                    cache_folder=cache_folder,
+                                    verbose=verbose)
+        for language, event_type_collection in manifest_paths(manifest, languages).items():
+            naf_paths[(project, language)] = event_type_collection
+    return naf_paths
+
+def get_naf_paths(project, language, verbose=0, cache_folder=None):
+    """
+    Get a dictionary with event type as key and a set of NAF paths as value.
+    :param project: the project under which the NAF files are generated.
+    :param language: the language of the reference texts.
+    :param cache_folder: folder in which the manifest of the project is stored for later runs
+    :type project: string
+    :type language: string
+    :type cache_folder: string
+    """
+    event_type_collection = get_naf_paths_multi(projects=[project],
+                                                languages=[language],
+                                                cache_folder=cache_folder,
+                                                verbose=verbose)[(project, language)]
     if verbose >= 2:
         for event_type, collection in event_type_collection.items():
             print(f'{event_type}: {len(collection)} reference texts')
@@ -0,0 +1,335 @@
+import os
+import random
+import sqlite3
+from collections import Counter
+from .corpus_utils import create_output_folder
+
+STORE_NAME = 'corpus_info.sqlite'
+PREDICATE_COLUMNS = ('frame', 'lemma', 'POS', 'sentence', 'article', 'compound')
+SQL_COLUMNS = {'frame': ('frame',),
+                'lemma': ('lemma',),
+                'POS': ('pos',),
+                'sentence': ('sentence',),
+                'article': ('article_definite', 'article_lemma'),
+                'compound': ('compound_function', 'compound_lemma')}
+
+SCHEMA = """
+CREATE TABLE documents (doc_id INTEGER PRIMARY KEY, event_type TEXT NOT NULL, title TEXT, frame_frequency INTEGER NOT NULL,
+                        project TEXT, language TEXT);
+CREATE TABLE predicates (event_type TEXT NOT NULL, doc_id INTEGER NOT NULL, term_id TEXT, frame TEXT, lemma TEXT, pos TEXT, sentence TEXT,
+                        article_definite INTEGER, article_lemma TEXT, compound_function TEXT, compound_lemma TEXT, project TEXT, language TEXT);
+CREATE INDEX documents_event_type ON documents (event_type);
+CREATE INDEX documents_partition ON documents (project, language, event_type);
+CREATE INDEX predicates_event_type ON predicates (event_type, doc_id);
+"""
+
+def store_path(output_folder):
+    """returns the path of the corpus store in the output folder"""
+    return f"{output_folder}/{STORE_NAME}"
+
+def partition_key(key, project=None, language=None):
+    """
+    returns the project, language and event type of a key of a corpus dictionary. the keys are event types, or
+    (project, language, event type) tuples for a corpus of several projects or languages, see load_corpus.
+    """
+    if isinstance(key, tuple):
+        return key
+    return project, language, key
+
+def predicate_row(event_type, doc_id, term_id, info, project=None, language=None):
+    """flatten the linguistic information of one predicate into a row of the predicates table"""
+    article = info.get('article', {})
+    compound = info.get('compound', {})
+    return (event_type, doc_id, term_id, info.get('frame'), info.get('lemma'), info.get('POS'), info.get('sentence'),
+            article.get('definite'), article.get('lemma'), compound.get('function'), compound.get('lemma'), project, language)
+
+class StoreWriter(object):
+    """
+    Appends documents to a new corpus store. The rows are buffered and written in one transaction when max_rows predicates are buffered,
+    so that the memory use is bounded while the corpus streams in. Used as a context manager, the store is closed when the with statement
+    ends: the buffered rows are written if it ends normally and dropped if it ends with an exception.
+    :param path: path of the sqlite store, an existing store is replaced
+    :param max_rows: the maximal number of buffered predicate rows
+    :type path: string
+    :type max_rows: integer
+    """
+    def __init__(self, path, max_rows=100000):
+        if os.path.isfile(path):
+            os.remove(path)
+        self.path = path
+        self.max_rows = max_rows
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+        self.doc_id = 0
+        self.documents = []
+        self.predicates = []
+        self.n_predicates = 0
+
+    def add_document(self, event_type, title, stats, project=None, language=None):
+        """buffer one document with its frame info and write the buffer when it is full. returns the id of the document"""
+        self.doc_id += 1
+        self.documents.append((self.doc_id, event_type, title, stats['frame frequency'], project, language))
+        for term_id, info in stats['frame info'].items():
+            self.predicates.append(predicate_row(event_type, self.doc_id, term_id, info, project, language))
+        if len(self.predicates) >= self.max_rows:
+            self.flush()
+        return self.doc_id
+
+    def flush(self):
+        """write the buffered rows"""
+        with self.connection:
+            self.connection.executemany("INSERT INTO documents VALUES (?, ?, ?, ?, ?, ?)", self.documents)
+            self.connection.executemany("INSERT INTO predicates VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", self.predicates)
+        self.n_predicates += len(self.predicates)
+        self.documents = []
+        self.predicates = []
+
+    def close(self):
+        """write the remaining rows and close the store"""
+        self.flush()
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type == None:
+            self.close()
+        else:
+            self.connection.close()
+        return False
+
+def corpus_to_sqlite(corpus_dict, output_folder, start_from_scratch, verbose, project=None, language=None):
+    """
+    export loaded and sliced corpus to a sqlite store with one row per predicate.
+    :param corpus_dict: collection of collections of dictionaries per event type, or per (project, language, event type)
+    :param output_folder: output folder
+    :param start_from_scratch: remove the output folder first
+    :param project: the project of the documents, if the keys are event types
+    :param language: the language of the documents, if the keys are event types
+    :type corpus_dict: dictionary
+    :type output_folder: string
+    :type start_from_scratch: boolean
+    :type project: string
+    :type language: string
+    """
+    if output_folder != None:
+        create_output_folder(output_folder=output_folder,
+                            start_from_scratch=start_from_scratch,
+                            verbose=verbose)
+        path = store_path(output_folder)
+        with StoreWriter(path) as writer:
+            for key in sorted(corpus_dict):
+                key_project, key_language, event_type = partition_key(key, project, language)
+                for document in corpus_dict[key]:
+                    for title, stats in document.items():
+                        writer.add_document(event_type, title, stats, key_project, key_language)
+
+        if verbose >= 1:
+            print(f"loaded and sliced corpus exported to {path}")
+
+def store_event_types(path, project=None, language=None):
+    """returns the event types in the store, or in one project and language, in the order in which they were written"""
+    where, parameters = event_type_filter(None, project, language)
+    connection = sqlite3.connect(path)
+    rows = connection.execute(f"SELECT event_type FROM documents{where} GROUP BY event_type ORDER BY MIN(doc_id)", parameters).fetchall()
+    connection.close()
+    return [event_type for (event_type,) in rows]
+
+def store_partitions(path):
+    """returns a dictionary with (project, language, event type) as key and the number of documents as value, in the order in which they were written"""
+    connection = sqlite3.connect(path)
+    rows = connection.execute("SELECT project, language, event_type, COUNT(*) FROM documents GROUP BY project, language, event_type ORDER BY MIN(doc_id)").fetchall()
+    connection.close()
+    return {(project, language, event_type): n_documents for project, language, event_type, n_documents in rows}
+
+def check_partition(path, project=None, language=None):
+    """
+    assert that the selected documents of the store belong to one project and language, so that the documents of an event type
+    in different projects or languages are not merged. a store of several projects or languages requires a project and a language.
+    """
+    partitions = sorted({(key_project, key_language) for key_project, key_language, event_type in store_partitions(path)
+                        if project in {None, key_project} and language in {None, key_language}}, key=str)
+    assert len(partitions) <= 1, f"the store contains the projects and languages {partitions}, select one project and language"
+
+def event_type_filter(event_types, project=None, language=None):
+    """returns a where clause and its parameters for a selection of event types, within one project and language if specified"""
+    conditions = []
+    parameters = []
+    if event_types != None:
+        placeholders = ", ".join("?" for event_type in event_types)
+        conditions.append(f"event_type IN ({placeholders})")
+        parameters.extend(event_types)
+    if project != None:
+        conditions.append("project = ?")
+        parameters.append(project)
+    if language != None:
+        conditions.append("language = ?")
+        parameters.append(language)
+    if not conditions:
+        return "", ()
+    return f" WHERE {' AND '.join(conditions)}", tuple(parameters)
+
+def check_event_types(path, event_types, project=None, language=None):
+    """assert that the selected event types are in the store"""
+    if event_types != None:
+        available = set(store_event_types(path, project, language))
+        for identifier in event_types:
+            assert identifier in available, f"{identifier} not in corpus"
+
+def event_type_frame_counts(path, event_types=None, doc_ids=None, project=None, language=None):
+    """
+    count the frames per event type in the store, without loading the predicates.
+    returns a dictionary with event type as key and a Counter of its frames as value, the input of FrameVocabulary.count_matrix.
+    :param path: path to the sqlite store
+    :param event_types: event types to count, all event types if None
+    :param doc_ids: only count the frames of these documents, e.g. the sample of sample_documents
+    :param project: only count the frames of this project
+    :param language: only count the frames of this language
+    :type path: string
+    :type event_types: list
+    :type doc_ids: iterable
+    :type project: string
+    :type language: string
+    """
+    check_partition(path, project, language)
+    counters = {}
+    where, parameters = event_type_filter(event_types, project, language)
+    connection = sqlite3.connect(path)
+    if doc_ids != None:
+        connection.execute("CREATE TEMP TABLE selection (doc_id INTEGER PRIMARY KEY)")
+        connection.executemany("INSERT INTO selection VALUES (?)", ((doc_id,) for doc_id in doc_ids))
+        where = f"{where} {'AND' if where else 'WHERE'} doc_id IN (SELECT doc_id FROM selection)"
+    for event_type, frame, freq in connection.execute(f"SELECT event_type, frame, COUNT(*) FROM predicates{where} GROUP BY event_type, frame", parameters):
+        counters.setdefault(event_type, Counter())[frame] = freq
+    connection.close()
+    return counters
+
+def sample_documents(path, event_types=None, seed=None, project=None, language=None, verbose=0):
+    """
+    draw the same sample as corpus_utils.sample_corpus from the store, without loading the documents:
+    per event type as many document ids as the smallest event type has documents.
+    returns a dictionary with event type as key and a list of document ids as value, in the order of the event types in the store.
+    :param path: path to the sqlite store
+    :param event_types: event types to sample, all event types if None
+    :param seed: seed of the random selection, for a reproducible sample
+    :param project: only sample the documents of this project
+    :param language: only sample the documents of this language
+    :type path: string
+    :type event_types: list
+    :type seed: integer
+    :type project: string
+    :type language: string
+    """
+    assert os.path.isfile(path), "corpus not found"
+    check_partition(path, project, language)
+    check_event_types(path, event_types, project, language)
+    if seed != None:
+        sampler = random.Random(seed)
+    else:
+        sampler = random
+
+    doc_ids = {}
+    where, parameters = event_type_filter(event_types, project, language)
+    connection = sqlite3.connect(path)
+    for event_type, doc_id in connection.execute(f"SELECT event_type, doc_id FROM documents{where} ORDER BY doc_id", parameters):
+        doc_ids.setdefault(event_type, []).append(doc_id)
+    connection.close()
+
+    len_smallest_corpus = min(len(ids) for ids in doc_ids.values())
+    sampled_doc_ids = {event_type: sampler.sample(ids, len_smallest_corpus) for event_type, ids in doc_ids.items()}
+
+    if verbose >= 3:
+        for event_type, ids in sampled_doc_ids.items():
+            print(f"{event_type}: {len(ids)} sampled reference texts")
+    return sampled_doc_ids
+
+def read_predicates(path, event_types=None, columns=PREDICATE_COLUMNS, project=None, language=None):
+    """
+    read the predicates of selected event types from the store column by column.
+    returns a dictionary with 'event type', 'document', 'term id' and the requested columns as keys and lists of values.
+    article and compound values are returned as the dictionaries of frame_info.
+    :param path: path to the sqlite store
+    :param event_types: event types to read, all event types if None
+    :param columns: predicate columns to read
+    :param project: only read the predicates of this project
+    :param language: only read the predicates of this language
+    :type path: string
+    :type event_types: list
+    :type columns: tuple
+    :type project: string
+    :type language: string
+    """
+    for column in columns:
+        assert column in SQL_COLUMNS, f"{column} is not a column of the corpus store"
+    sql_columns = [sql_column for column in columns for sql_column in SQL_COLUMNS[column]]
+    where, parameters = event_type_filter(event_types, project, language)
+    query = f"SELECT {', '.join(['event_type', 'doc_id', 'term_id'] + sql_columns)} FROM predicates{where} ORDER BY rowid"
+
+    table = {'event type': [], 'document': [], 'term id': []}
+    for column in columns:
+        table[column] = []
+
+    connection = sqlite3.connect(path)
+    for row in connection.execute(query, parameters):
+        table['event type'].append(row[0])
+        table['document'].append(row[1])
+        table['term id'].append(row[2])
+        position = 3
+        for column in columns:
+            if column == 'article':
+                definite = row[position]
+                table[column].append({"definite": None if definite == None else bool(definite), "lemma": row[position + 1]})
+                position += 2
+            elif column == 'compound':
+                table[column].append({"function": row[position], "lemma": row[position + 1]})
+                position += 2
+            else:
+                table[column].append(row[position])
+                position += 1
+    connection.close()
+    return table
+
+def sqlite_to_corpus(path, event_types=None, columns=PREDICATE_COLUMNS, project=None, language=None, verbose=0):
+    """
+    load the corpus dictionary written by corpus_to_sqlite, restricted to the selected event types and predicate columns.
+    a store with several projects or languages requires a project and language, see check_partition.
+    :param path: path to the sqlite store
+    :param event_types: event types to load, all event types if None
+    :param columns: predicate columns to load
+    :param project: only load the documents of this project
+    :param language: only load the documents of this language
+    :type path: string
+    :type event_types: list
+    :type columns: tuple
+    :type project: string
+    :type language: string
+    """
+    assert os.path.isfile(path), "corpus not found"
+    check_partition(path, project, language)
+    check_event_types(path, event_types, project, language)
+
+    corpus_dict = {}
+    documents = {}
+    where, parameters = event_type_filter(event_types, project, language)
+    connection = sqlite3.connect(path)
+    for doc_id, event_type, title, frame_frequency in connection.execute(f"SELECT doc_id, event_type, title, frame_frequency FROM documents{where} ORDER BY doc_id", parameters):
+        frame_info = {}
+        documents[doc_id] = frame_info
+        corpus_dict.setdefault(event_type, []).append({title: {'frame frequency': frame_frequency, 'frame info': frame_info}})
+    connection.close()
+
+    table = read_predicates(path, event_types=event_types, columns=columns, project=project, language=language)
+    for position, (doc_id, term_id) in enumerate(zip(table['document'], table['term id'])):
+        info = {}
+        for column in columns:
+            value = table[column][position]
+            if column == 'sentence' and value == None:
+                continue
+            info[column] = value
+        documents[doc_id][term_id] = info
+
+    if verbose >= 1:
+        print(f"loaded {len(documents)} documents of {len(corpus_dict)} event types from {path}")
+    return corpus_dict
@@ -0,0 +1,207 @@
+"""
+End-to-end benchmark of typical_frames on a synthetic NAF corpus (see synthetic_naf.py).
+Every stage (frame_info, event_type_info, delete_smallest_texts, corpus_to_json, frame_stats, ff_icf and the exports)
+is timed per corpus size, as well as extracting the frame info of every document and of the Canberra NAF in test/input_files
+with the streaming extraction (NafIndex.from_naf) and the tree-based extraction (parse_naf_info), reading the json corpus as
+dictionaries, as interned frame ids (InternedCorpus) and as interned frame, lemma and POS ids and counting the interned frames, together with the peak memory of the stage (Linux only) and of the process. The results are written to
+benchmark_results/<commit>.json, so that runs on different commits can be compared with --compare.
+
+usage: python benchmark.py --sizes 1000,10000,100000 [--workers 4] [--compare benchmark_results/<commit>.json]
+"""
+import sys
+import os
+import argparse
+import json
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from package_import import import_module
+from synthetic_naf import generate_corpus
+
+typical_frames_main = import_module('typical_frames_main')
+corpus_utils = import_module('corpus_utils')
+fficf_utils = import_module('fficf_utils')
+instrument_utils = import_module('instrument_utils')
+intern_utils = import_module('intern_utils')
+xml_utils = import_module('xml_utils')
+
+dir_path = os.path.dirname(os.path.realpath(__file__))
+RESULTS_FOLDER = f'{dir_path}/benchmark_results'
+NAF_PATH = f'{dir_path}/input_files/Canberra disappears in the dust.naf'
+NAF_REPEATS = 50
+
+def extract_streaming(paths):
+    """returns the frame info of every NAF file with the streaming extraction of frame_info"""
+    return [xml_utils.NafIndex.from_naf(path).frame_info_dict() for path in paths]
+
+def extract_tree(paths):
+    """returns the frame info of every NAF file with the tree-based extraction functions"""
+    return [xml_utils.frame_info_dict(*xml_utils.parse_naf_info(path)) for path in paths]
+
+def read_json(path):
+    """returns the content of a json file"""
+    with open(path, 'r') as infile:
+        return json.load(infile)
+
+def git_commit():
+    """returns the short hash of the checked out commit, or 'unknown' outside a git repository"""
+    try:
+        output = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=dir_path, capture_output=True, text=True, check=True)
+        return output.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+class StageTimer():
+    """records the wall time, the peak memory of the stage and the peak memory of the process after every stage of one benchmark run"""
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self.peaks = instrument_utils.StagePeaks()
+
+    def run(self, stage, function, *args, **kwargs):
+        """run function, record its duration and return its result"""
+        if self.trace_memory:
+            tracemalloc.start()
+        self.peaks.start()
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        seconds = time.perf_counter() - start
+        self.stages[stage] = {'seconds': round(seconds, 4),
+                              'peak rss mb': self.peaks.stop(),
+                              'process peak rss mb': self.peaks.process_peak}
+        if self.trace_memory:
+            self.stages[stage]['traced peak mb'] = round(tracemalloc.get_traced_memory()[1] / 1024 ** 2, 1)
+            tracemalloc.stop()
+        return result
+
+def benchmark(n_docs, work_folder, workers=1, trace_memory=False, verbose=0, **corpus_parameters):
+    """
+    generate a corpus of n_docs documents and time every stage of the pipeline on it.
+    :param n_docs: the number of documents
+    :param work_folder: folder for the corpus and the output
+    :param workers: the number of processes used by event_type_info
+    :param trace_memory: also record the Python heap peak per stage with tracemalloc (slower)
+    :type n_docs: integer
+    :type workers: integer
+    :type trace_memory: boolean
+    """
+    corpus_folder = os.path.join(work_folder, f'corpus_{n_docs}')
+    output_folder = os.path.join(work_folder, f'output_{n_docs}')
+    timer = StageTimer(trace_memory=trace_memory)
+
+    collections = timer.run('generate corpus', generate_corpus, corpus_folder, n_docs=n_docs, **corpus_parameters)
+    first_path = sorted(next(iter(collections.values())))[0]
+    timer.run('frame_info', typical_frames_main.frame_info, first_path)
+    paths = sorted(path for collection in collections.values() for path in collection)
+    timer.run('extract streaming', extract_streaming, paths)
+    timer.run('extract tree', extract_tree, paths)
+    timer.run('canberra streaming', extract_streaming, [NAF_PATH] * NAF_REPEATS)
+    timer.run('canberra tree', extract_tree, [NAF_PATH] * NAF_REPEATS)
+    event_type_frame_info = timer.run('event_type_info', typical_frames_main.event_type_info, collections, workers=workers, verbose=verbose)
+    sliced_corpus = timer.run('delete_smallest_texts', corpus_utils.delete_smallest_texts, event_type_frame_info, minimal_n_frames=10, verbose=verbose)
+    timer.run('corpus_to_json', corpus_utils.corpus_to_json, sliced_corpus, output_folder, start_from_scratch=True, verbose=verbose)
+    corpus_path = os.path.join(output_folder, 'corpus_info.json')
+    timer.run('read_corpus dictionaries', read_json, corpus_path)
+    interned_corpus = timer.run('read_corpus interned', intern_utils.InternedCorpus.from_json, corpus_path)
+    timer.run('read_corpus lemma POS', intern_utils.InternedCorpus.from_json, corpus_path, columns=('frame', 'lemma', 'POS'))
+    sampled_documents = corpus_utils.sample_corpus(interned_corpus.documents, verbose=verbose, seed=0)
+    timer.run('frame_count_matrix', interned_corpus.frame_count_matrix, sampled_documents)
+    sampled_corpus = timer.run('sample_corpus', corpus_utils.sample_corpus, sliced_corpus, verbose=verbose, seed=0)
+    event_type_frames = timer.run('frames_collections', fficf_utils.frames_collections, sampled_corpus, verbose=verbose)
+    frame_freq = timer.run('frame_stats', fficf_utils.frame_stats, event_type_frames, verbose=verbose)
+    fficf_dict = timer.run('ff_icf', fficf_utils.ff_icf, sampled_corpus, event_type_frames, frame_freq, verbose=verbose)
+    timer.run('scores_to_format', fficf_utils.scores_to_format, fficf_dict, frame_freq, output_folder, start_from_scratch=False,
+                event_types=list(sampled_corpus), verbose=verbose, file_format='csv')
+    timer.run('scores_to_json', fficf_utils.scores_to_json, fficf_dict, output_folder, start_from_scratch=False, verbose=verbose)
+
+    shutil.rmtree(corpus_folder)
+    shutil.rmtree(output_folder)
+    return {'documents': n_docs,
+            'documents after filter': sum(len(docs) for docs in sliced_corpus.values()),
+            'stages': timer.stages}
+
+def compare(results, reference):
+    """print the relative change in duration per stage against the results of another run"""
+    reference_runs = {run['documents']: run for run in reference['runs']}
+    print(f"comparison of {results['commit']} with {reference['commit']}")
+    for run in results['runs']:
+        reference_run = reference_runs.get(run['documents'])
+        if reference_run == None:
+            continue
+        for stage, stats in run['stages'].items():
+            if stage not in reference_run['stages']:
+                continue
+            before = reference_run['stages'][stage]['seconds']
+            after = stats['seconds']
+            change = (after - before) / before * 100 if before else 0.0
+            print(f"{run['documents']:>8} docs {stage:<26} {before:>10.3f}s -> {after:>10.3f}s ({change:+.1f}%)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,10000,100000', help='comma-separated corpus sizes')
+    parser.add_argument('--event-types', type=int, default=10)
+    parser.add_argument('--doc-length', type=int, default=300)
+    parser.add_argument('--frames-per-doc', type=int, default=30)
+    parser.add_argument('--vocabulary-size', type=int, default=1200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--trace-memory', action='store_true', help='record the Python heap peak per stage with tracemalloc')
+    parser.add_argument('--work-folder', default=None, help='folder for the synthetic corpus, a temporary folder by default')
+    parser.add_argument('--output', default=None, help='path of the results, benchmark_results/<commit>.json by default')
+    parser.add_argument('--compare', default=None, help='results of an earlier run to compare with')
+    parser.add_argument('--verbose', type=int, default=0)
+    args = parser.parse_args()
+
+    work_folder = args.work_folder or tempfile.mkdtemp(prefix='typical_frames_benchmark_')
+    os.makedirs(work_folder, exist_ok=True)
+
+    results = {'commit': git_commit(),
+               'python': platform.python_version(),
+               'platform': platform.platform(),
+               'workers': args.workers,
+               'parameters': {'event types': args.event_types,
+                              'doc length': args.doc_length,
+                              'frames per doc': args.frames_per_doc,
+                              'vocabulary size': args.vocabulary_size,
+                              'seed': args.seed},
+               'runs': []}
+
+    for n_docs in [int(size) for size in args.sizes.split(',')]:
+        run = benchmark(n_docs, work_folder,
+                        workers=args.workers,
+                        trace_memory=args.trace_memory,
+                        verbose=args.verbose,
+                        n_event_types=args.event_types,
+                        doc_length=args.doc_length,
+                        frames_per_doc=args.frames_per_doc,
+                        vocabulary_size=args.vocabulary_size,
+                        seed=args.seed)
+        results['runs'].append(run)
+        for stage, stats in run['stages'].items():
+            stage_peak = 'n/a' if stats['peak rss mb'] == None else f"{stats['peak rss mb']:.1f}"
+            print(f"{n_docs:>8} docs {stage:<26} {stats['seconds']:>10.3f}s {stage_peak:>10} MB stage {stats['process peak rss mb']:>10.1f} MB process")
+        stages = run['stages']
+        print(f"{n_docs:>8} docs the tree-based extraction takes {stages['extract tree']['seconds'] / stages['extract streaming']['seconds']:.2f}x "
+              f"the time of the streaming extraction, {stages['canberra tree']['seconds'] / stages['canberra streaming']['seconds']:.2f}x on the Canberra NAF")
+
+    if args.work_folder == None:
+        shutil.rmtree(work_folder)
+
+    output_path = args.output or f"{RESULTS_FOLDER}/{results['commit']}.json"
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, 'w') as outfile:
+        json.dump(results, outfile, indent=4)
+    print(f"results written to {output_path}")
+
+    if args.compare != None:
+        with open(args.compare) as infile:
+            compare(results, json.load(infile))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+"""
+data shared by the tests: frame info documents, typicality scores and a small synthetic NAF corpus.
+"""
+import os
+import tempfile
+
+from package_import import import_module
+from synthetic_naf import generate_corpus
+
+MINIMAL_N_FRAMES = 10
+
+FFICF_DICT = {'Q1': [('Killing', 1.0), ('Attack', 0.5), ('Arrest', 0.0)],
+              'Q2': [('Arrest', 1.0), ('Killing', 0.25), ('Attack', 0.0)]}
+FRAME_FREQ_DICT = {'Q1': {'Killing': {'absolute frequency': 3, 'relative frequency': 60.0},
+                          'Attack': {'absolute frequency': 1, 'relative frequency': 20.0},
+                          'Arrest': {'absolute frequency': 1, 'relative frequency': 20.0}},
+                   'Q2': {'Arrest': {'absolute frequency': 2, 'relative frequency': 50.0},
+                          'Killing': {'absolute frequency': 2, 'relative frequency': 50.0}}}
+
+def document(title, frames):
+    """returns a frame_info dictionary with one predicate per frame"""
+    return {title: {'frame frequency': len(frames), 'frame info': {f"t{index}": {'frame': frame} for index, frame in enumerate(frames)}}}
+
+def small_corpus(n_docs=24, n_event_types=3, frames_per_doc=12, seed=5):
+    """returns a work folder and the NAF paths per event type of a synthetic corpus in its subfolder naf"""
+    folder = tempfile.mkdtemp()
+    collections = generate_corpus(os.path.join(folder, 'naf'), n_docs=n_docs, n_event_types=n_event_types, doc_length=60,
+                                    frames_per_doc=frames_per_doc, vocabulary_size=30, seed=seed)
+    return folder, collections
+
+def sliced_corpus(collections, workers=1):
+    """returns the corpus dictionary of the NAF paths per event type without the texts with less than MINIMAL_N_FRAMES frames"""
+    main = import_module('typical_frames_main')
+    corpus_utils = import_module('corpus_utils')
+    return corpus_utils.delete_smallest_texts(main.event_type_info(collections, workers=workers), MINIMAL_N_FRAMES, verbose=0)
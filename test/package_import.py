@@ -0,0 +1,15 @@
+"""
+import the modules of the package in a test, whatever the name of the folder the package is checked out in.
+"""
+import importlib
+import os
+import sys
+
+package_dir = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+package_name = os.path.basename(package_dir)
+if os.path.dirname(package_dir) not in sys.path:
+    sys.path.insert(0, os.path.dirname(package_dir))
+
+def import_module(name):
+    """returns a module of the package, e.g. import_module('cache_utils')"""
+    return importlib.import_module(f"{package_name}.{name}")
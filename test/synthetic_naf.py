@@ -0,0 +1,134 @@
+"""
+Generate a synthetic corpus of NAF files with text, terms, deps and srl layers, distributed over event types.
+The frames of every event type follow their own Zipf-like distribution over a shared frame vocabulary, so that
+FF*ICF finds typical frames per event type. No network or DFNDataReleases checkout is needed.
+"""
+import os
+import random
+from xml.sax.saxutils import quoteattr
+
+PREMON_FRAME_PREFIX = "http://premon.fbk.eu/resource/fn17-"
+POS_TAGS = ['NOUN', 'VERB', 'ADJ', 'ADP', 'PROPN', 'ADV']
+ARTICLES = ['a', 'an', 'the']
+
+def frame_vocabulary(vocabulary_size):
+    """returns vocabulary_size FrameNet-like frame names"""
+    return [f"synthetic_frame_{index}" for index in range(vocabulary_size)]
+
+def event_type_frame_weights(frames, n_event_types, rng):
+    """returns per event type a Zipf-like weight for every frame, with a different frame ranking per event type"""
+    weights = []
+    for event_type in range(n_event_types):
+        ranking = list(range(len(frames)))
+        rng.shuffle(ranking)
+        event_type_weights = [0.0] * len(frames)
+        for rank, frame_id in enumerate(ranking):
+            event_type_weights[frame_id] = 1 / (rank + 1)
+        weights.append(event_type_weights)
+    return weights
+
+def naf_document(title, n_terms, frames, weights, n_frames, lemmas, rng, sentence_length=20):
+    """
+    returns the content of one NAF file.
+    :param title: the title in the NAF header
+    :param n_terms: the number of tokens and terms
+    :param frames: the frame vocabulary
+    :param weights: the weight of every frame for the event type of the document
+    :param n_frames: the number of SRL predicates
+    :param lemmas: the lemma vocabulary
+    :type n_terms: integer
+    :type n_frames: integer
+    """
+    n_frames = min(n_frames, n_terms)
+    lines = ['<?xml version=\'1.0\' encoding=\'UTF-8\'?>',
+             '<NAF xml:lang="en" version="v3.1">',
+             '  <nafHeader>',
+             f'    <fileDesc creationtime="2020-01-01T00:00:00UTC" title={quoteattr(title)}/>',
+             '  </nafHeader>']
+
+    words = []
+    term_lemmas = []
+    for index in range(1, n_terms + 1):
+        if rng.random() < 0.1:
+            lemma = rng.choice(ARTICLES)
+        else:
+            lemma = rng.choice(lemmas)
+        term_lemmas.append(lemma)
+        words.append(lemma)
+    lines.append(f'  <raw>{" ".join(words)}</raw>')
+
+    lines.append('  <text>')
+    offset = 0
+    for index, word in enumerate(words, start=1):
+        sentence = (index - 1) // sentence_length + 1
+        lines.append(f'    <wf sent="{sentence}" id="w{index}" length="{len(word)}" offset="{offset}">{word}</wf>')
+        offset += len(word) + 1
+    lines.append('  </text>')
+
+    lines.append('  <terms>')
+    for index, lemma in enumerate(term_lemmas, start=1):
+        lines.append(f'    <term id="t{index}" type="open" lemma="{lemma}" pos="{rng.choice(POS_TAGS)}">')
+        lines.append(f'      <span>\n        <target id="w{index}"/>\n      </span>')
+        lines.append('    </term>')
+    lines.append('  </terms>')
+
+    lines.append('  <deps>')
+    for index in range(2, n_terms + 1):
+        if term_lemmas[index - 2] in ARTICLES:
+            rfunc = 'det'
+        else:
+            rfunc = rng.choice(['compound', 'nsubj', 'dobj', 'amod', 'prep', 'pobj'])
+        lines.append(f'    <dep from="t{index}" to="t{index - 1}" rfunc="{rfunc}"/>')
+    lines.append('  </deps>')
+
+    lines.append('  <srl>')
+    predicate_terms = rng.sample(range(1, n_terms + 1), n_frames)
+    predicate_frames = rng.choices(frames, weights=weights, k=n_frames)
+    for index, (term, frame) in enumerate(zip(predicate_terms, predicate_frames), start=1):
+        lines.append(f'    <predicate id="pr{index}" status="system">')
+        lines.append(f'      <externalReferences>\n        <externalRef reference="{PREMON_FRAME_PREFIX}{frame}"/>\n      </externalReferences>')
+        lines.append(f'      <span>\n        <target id="t{term}"/>\n      </span>')
+        role_term = rng.randint(1, n_terms)
+        lines.append(f'      <role id="pr{index}_r1" semRole="Agent">\n        <span>\n          <target id="t{role_term}"/>\n        </span>\n      </role>')
+        lines.append('    </predicate>')
+    lines.append('  </srl>')
+    lines.append('</NAF>')
+    return "\n".join(lines)
+
+def generate_corpus(output_folder,
+                    n_docs=1000,
+                    n_event_types=10,
+                    doc_length=300,
+                    frames_per_doc=30,
+                    vocabulary_size=1200,
+                    lemma_vocabulary_size=5000,
+                    seed=0):
+    """
+    write a synthetic corpus of NAF files to output_folder/en and return a dictionary with event type as key and a set of NAF paths as value,
+    like path_utils.get_naf_paths. the number of terms and frames per document vary around doc_length and frames_per_doc.
+    :param output_folder: the folder of the corpus
+    :param n_docs: the number of documents
+    :param n_event_types: the number of event types
+    :param doc_length: the average number of tokens per document
+    :param frames_per_doc: the average number of SRL predicates per document
+    :param vocabulary_size: the number of distinct frames
+    :param lemma_vocabulary_size: the number of distinct lemmas
+    :param seed: seed of the random generator
+    """
+    rng = random.Random(seed)
+    frames = frame_vocabulary(vocabulary_size)
+    weights = event_type_frame_weights(frames, n_event_types, rng)
+    lemmas = [f"lemma{index}" for index in range(lemma_vocabulary_size)]
+    language_folder = os.path.join(output_folder, 'en')
+    os.makedirs(language_folder, exist_ok=True)
+
+    event_type_collection = {f"Q{event_type}": set() for event_type in range(n_event_types)}
+    for doc in range(n_docs):
+        event_type = doc % n_event_types
+        n_terms = max(1, int(rng.gauss(doc_length, doc_length / 4)))
+        n_frames = max(0, int(rng.gauss(frames_per_doc, frames_per_doc / 2)))
+        path = os.path.join(language_folder, f"doc_{doc}.naf")
+        with open(path, 'w') as outfile:
+            outfile.write(naf_document(f"synthetic document {doc}", n_terms, frames, weights[event_type], n_frames, lemmas, rng))
+        event_type_collection[f"Q{event_type}"].add(path)
+    return event_type_collection
@@ -0,0 +1,177 @@
+"""
+Reading NAF files that are compressed or stored in a tar or zip archive, and finding them per language. run with pytest or as a script.
+"""
+import gzip
+import io
+import os
+import sys
+import tarfile
+import tempfile
+import time
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from package_import import import_module
+
+archive_utils = import_module('archive_utils')
+corpus_utils = import_module('corpus_utils')
+path_utils = import_module('path_utils')
+xml_utils = import_module('xml_utils')
+
+dir_path = os.path.dirname(os.path.realpath(__file__))
+NAF_PATH = os.path.join(dir_path, 'input_files', 'Canberra disappears in the dust.naf')
+
+with open(NAF_PATH, 'rb') as infile:
+    CONTENT = infile.read()
+
+def zstd_compress(content):
+    import zstandard
+    return zstandard.ZstdCompressor().compress(content)
+
+def write_bytes(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as outfile:
+        outfile.write(content)
+
+def read(naf_root):
+    with archive_utils.open_naf(naf_root) as infile:
+        return infile.read()
+
+def write_tar(path, members, mode='w'):
+    """write a tar archive with the members (name -> bytes)"""
+    with tarfile.open(path, mode) as archive:
+        for name, content in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            info.mtime = 1600000000
+            archive.addfile(info, io.BytesIO(content))
+
+def write_zip(path, members):
+    """write a zip archive with the members (name -> bytes)"""
+    with zipfile.ZipFile(path, 'w') as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+
+def test_names():
+    assert archive_utils.doc_name('folder/doc.naf.gz') == 'doc'
+    assert archive_utils.doc_name('doc.naf') == 'doc'
+    assert archive_utils.is_naf_name('doc.naf.zst') and not archive_utils.is_naf_name('doc.txt')
+    assert archive_utils.is_archive_name('en.tgz') and not archive_utils.is_archive_name('doc.naf.gz')
+    reference = archive_utils.member_reference('en.zip', 'a/doc.naf')
+    assert archive_utils.split_reference(reference) == ('en.zip', 'a/doc.naf')
+    assert archive_utils.split_reference('doc.naf') == ('doc.naf', None)
+
+def test_open_compressed_files():
+    folder = tempfile.mkdtemp()
+    plain = os.path.join(folder, 'doc.naf')
+    gzipped = os.path.join(folder, 'doc.naf.gz')
+    zstd = os.path.join(folder, 'doc.naf.zst')
+    write_bytes(plain, CONTENT)
+    write_bytes(gzipped, gzip.compress(CONTENT))
+    write_bytes(zstd, zstd_compress(CONTENT))
+    for path in [plain, gzipped, zstd]:
+        assert read(path) == CONTENT, path
+    assert archive_utils.naf_stat(plain)[1] == len(CONTENT)
+
+def test_open_archive_members():
+    folder = tempfile.mkdtemp()
+    members = {'docs/doc.naf': CONTENT, 'docs/other.naf.gz': gzip.compress(CONTENT), 'readme.txt': b'not a NAF file'}
+    archives = {'en.tar': 'w', 'en.tar.gz': 'w:gz'}
+    for name, mode in archives.items():
+        write_tar(os.path.join(folder, name), members, mode=mode)
+    write_zip(os.path.join(folder, 'en.zip'), members)
+
+    for name in list(archives) + ['en.zip']:
+        archive_path = os.path.join(folder, name)
+        assert sorted(archive_utils.archive_members(archive_path)) == ['docs/doc.naf', 'docs/other.naf.gz']
+        for member in ['docs/doc.naf', 'docs/other.naf.gz']:
+            reference = archive_utils.member_reference(archive_path, member)
+            assert read(reference) == CONTENT, reference
+        mtime, size = archive_utils.naf_stat(archive_utils.member_reference(archive_path, 'docs/doc.naf'))
+        assert size == len(CONTENT)
+        assert mtime > 0
+        try:
+            read(archive_utils.member_reference(archive_path, 'docs/missing.naf'))
+            assert False, "a missing member is read"
+        except FileNotFoundError:
+            pass
+
+def test_changed_archive_is_reopened():
+    folder = tempfile.mkdtemp()
+    archive_path = os.path.join(folder, 'en.zip')
+    write_zip(archive_path, {'doc.naf': CONTENT})
+    assert archive_utils.archive_members(archive_path) == ['doc.naf']
+    archive, members = archive_utils.open_archive(archive_path)
+    time.sleep(0.01)
+    write_zip(archive_path, {'doc.naf': CONTENT, 'new.naf': CONTENT})
+    assert sorted(archive_utils.archive_members(archive_path)) == ['doc.naf', 'new.naf']
+    assert archive.fp == None, "the archive that changed on disk is not closed"
+
+def open_archives_count(item):
+    """returns the number of archives in the cache of the process"""
+    return len(archive_utils._ARCHIVES)
+
+def test_open_archives_are_bounded():
+    archive_utils.close_archives()
+    folder = tempfile.mkdtemp()
+    archive_paths = [os.path.join(folder, f"{index}.zip") for index in range(archive_utils.MAX_OPEN_ARCHIVES + 2)]
+    archives = []
+    for archive_path in archive_paths:
+        write_zip(archive_path, {'doc.naf': CONTENT})
+        archives.append(archive_utils.open_archive(archive_path)[0])
+    assert len(archive_utils._ARCHIVES) == archive_utils.MAX_OPEN_ARCHIVES
+    assert [archive.fp == None for archive in archives] == [True, True] + [False] * archive_utils.MAX_OPEN_ARCHIVES
+    #a used archive is not evicted
+    archive_utils.open_archive(archive_paths[2])
+    archive_utils.open_archive(archive_paths[0])
+    assert archives[2].fp != None and archives[3].fp == None
+    assert read(archive_utils.member_reference(archive_paths[1], 'doc.naf')) == CONTENT
+
+    #the workers of a pool do not use the archives of their parent
+    assert corpus_utils.parallel_map(open_archives_count, [0, 1, 2, 3], workers=2, chunksize=1) == [0, 0, 0, 0]
+    archive_utils.close_archives()
+    assert archive_utils._ARCHIVES == {}
+    assert all(archive.fp == None for archive in archives)
+
+def test_frame_count_from_archive():
+    folder = tempfile.mkdtemp()
+    archive_path = os.path.join(folder, 'en.tar')
+    write_tar(archive_path, {'doc.naf.gz': gzip.compress(CONTENT)})
+    reference = archive_utils.member_reference(archive_path, 'doc.naf.gz')
+    assert xml_utils.count_srl_predicates(reference) == xml_utils.count_srl_predicates(NAF_PATH)
+
+def test_language_sources():
+    unstructured = tempfile.mkdtemp()
+    #loose files: the uncompressed one is preferred
+    write_bytes(os.path.join(unstructured, 'en', 'loose.naf'), CONTENT)
+    write_bytes(os.path.join(unstructured, 'en', 'loose.naf.gz'), gzip.compress(CONTENT))
+    write_bytes(os.path.join(unstructured, 'en', 'compressed.naf.zst'), zstd_compress(CONTENT))
+    #archived files: a loose file is preferred over an archived one
+    write_zip(os.path.join(unstructured, 'en.zip'), {'loose.naf': CONTENT, 'archived.naf': CONTENT})
+    sources = path_utils.language_sources(unstructured, 'en')
+    archive_path = os.path.join(unstructured, 'en.zip')
+    assert sources == {'loose': os.path.join(unstructured, 'en', 'loose.naf'),
+                       'compressed': os.path.join(unstructured, 'en', 'compressed.naf.zst'),
+                       'archived': archive_utils.member_reference(archive_path, 'archived.naf')}
+    assert path_utils.language_sources(unstructured, 'nl') == {}
+
+    manifest = {'unstructured': unstructured, 'languages': {'en': {'Q1': ['loose', 'archived'], 'Q2': ['compressed']}}}
+    paths = path_utils.manifest_paths(manifest, ['en'])
+    assert paths['en'] == {'Q1': {sources['loose'], sources['archived']}, 'Q2': {sources['compressed']}}
+
+    manifest['languages']['en']['Q2'].append('missing')
+    try:
+        path_utils.manifest_paths(manifest, ['en'])
+        assert False, "a missing document is accepted"
+    except AssertionError as error:
+        assert 'does not exist' in str(error)
+
+if __name__ == '__main__':
+    test_names()
+    test_open_compressed_files()
+    test_open_archive_members()
+    test_changed_archive_is_reopened()
+    test_open_archives_are_bounded()
+    test_frame_count_from_archive()
+    test_language_sources()
+    print("archive tests passed")
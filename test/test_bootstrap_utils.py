@@ -0,0 +1,92 @@
+"""
+Resampled ff*icf scores: reproducibility, workers and the per-batch statistics compared with those of all replicates at once. run with pytest or as a script.
+"""
+import os
+import random
+import sys
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from package_import import import_module
+from fixtures import document
+
+bootstrap_utils = import_module('bootstrap_utils')
+
+def synthetic_collections(seed=0, n_frames=30):
+    """returns frame info documents per event type, the event types have 12, 9 and 6 documents"""
+    rng = random.Random(seed)
+    frames = [f"Frame_{index}" for index in range(n_frames)]
+    collections = {}
+    for event_type, n_docs in enumerate([12, 9, 6]):
+        weights = [rng.random() ** 3 for frame in frames]
+        collections[f"Q{event_type}"] = [document(f"Q{event_type} {doc}", rng.choices(frames, weights=weights, k=rng.randint(5, 25)))
+                                         for doc in range(n_docs)]
+    return collections
+
+def all_replicates(collections, n_replicates, seed, batch_size, replace=True):
+    """returns the scores of all replicates of bootstrap_ff_icf in one array"""
+    event_types, vocabulary, doc_matrix, offsets = bootstrap_utils.document_frame_matrix(collections)
+    sample_size = int(np.diff(offsets).min())
+    batch_sizes = [min(batch_size, n_replicates - start) for start in range(0, n_replicates, batch_size)]
+    seed_sequences = np.random.SeedSequence(seed).spawn(len(batch_sizes))
+    bootstrap_utils.share_documents(doc_matrix, offsets)
+    scores = np.concatenate([bootstrap_utils.score_replicates((sample_size, replace, seed_sequence, size))
+                             for seed_sequence, size in zip(seed_sequences, batch_sizes)])
+    bootstrap_utils.WORKER_DOCUMENTS.clear()
+    return event_types, vocabulary.labels, scores
+
+def statistic(bootstrap_dict, event_types, frames, name):
+    return np.array([[bootstrap_dict[event_type][frame][name] for frame in frames] for event_type in event_types])
+
+def test_statistics_equal_those_of_all_replicates():
+    collections = synthetic_collections()
+    bins = 200
+    bootstrap_dict = bootstrap_utils.bootstrap_ff_icf(collections, n_replicates=120, seed=4, batch_size=16, bins=bins)
+    event_types, frames, scores = all_replicates(collections, n_replicates=120, seed=4, batch_size=16)
+    scores = scores.astype(np.float64)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning) #frames that occur in fewer than two replicates
+        mean = np.nanmean(scores, axis=0)
+        variance = np.nanvar(scores, axis=0, ddof=1)
+        lower, upper = np.nanpercentile(scores, [2.5, 97.5], axis=0)
+    assert np.array_equal(statistic(bootstrap_dict, event_types, frames, 'replicates'), np.sum(~np.isnan(scores), axis=0))
+    assert np.allclose(statistic(bootstrap_dict, event_types, frames, 'mean'), mean, equal_nan=True)
+    assert np.allclose(statistic(bootstrap_dict, event_types, frames, 'variance'), variance, equal_nan=True)
+    for name, exact in [('ci lower', lower), ('ci upper', upper)]:
+        approximate = statistic(bootstrap_dict, event_types, frames, name)
+        assert np.array_equal(np.isnan(approximate), np.isnan(exact))
+        assert np.nanmax(np.abs(approximate - exact)) <= 0.5 / bins + 1e-6, name
+
+def test_seed_reproducibility():
+    collections = synthetic_collections(seed=1)
+    first = bootstrap_utils.bootstrap_ff_icf(collections, n_replicates=40, seed=7, batch_size=8)
+    assert bootstrap_utils.bootstrap_ff_icf(collections, n_replicates=40, seed=7, batch_size=8) == first
+    assert bootstrap_utils.bootstrap_ff_icf(collections, n_replicates=40, seed=8, batch_size=8) != first
+
+def test_workers_give_the_same_statistics():
+    collections = synthetic_collections(seed=2)
+    serial = bootstrap_utils.bootstrap_ff_icf(collections, n_replicates=60, seed=3, batch_size=10, workers=1)
+    assert bootstrap_utils.bootstrap_ff_icf(collections, n_replicates=60, seed=3, batch_size=10, workers=2) == serial
+    assert bootstrap_utils.WORKER_DOCUMENTS == {}
+
+def test_sampling_without_replacement():
+    #without replacement every replicate has all documents of the smallest event type, Q2
+    offsets = np.array([0, 12, 21, 27])
+    samples = bootstrap_utils.draw_samples(np.random.default_rng(0), offsets, 6, 20, replace=False)
+    assert all(sorted(replicate) == list(range(21, 27)) for replicate in samples[:, 2, :].tolist())
+    assert all(len(set(replicate)) == 6 for replicate in samples[:, 0, :].tolist())
+
+    collections = synthetic_collections(seed=3)
+    bootstrap_dict = bootstrap_utils.bootstrap_ff_icf(collections, n_replicates=60, seed=0, batch_size=20)
+    widths = [stats['ci upper'] - stats['ci lower'] for stats in bootstrap_dict['Q2'].values() if stats['replicates'] > 1]
+    assert max(widths) > 0, "the scores of the smallest event type do not vary with replacement"
+
+if __name__ == '__main__':
+    test_statistics_equal_those_of_all_replicates()
+    test_seed_reproducibility()
+    test_workers_give_the_same_statistics()
+    test_sampling_without_replacement()
+    print("bootstrap tests passed")
@@ -0,0 +1,76 @@
+"""
+FrameInfoCache hits, misses and corrupt entries. run with pytest or as a script.
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from package_import import import_module
+
+cache_utils = import_module('cache_utils')
+
+FRAME_INFO = {'doc 1': {'frame frequency': 1, 'frame info': {'t1': {'frame': 'Killing', 'lemma': 'kill', 'POS': 'VERB'}}}}
+
+class CountingCache(cache_utils.FrameInfoCache):
+    """counts the fingerprints that are computed"""
+    n_fingerprints = 0
+
+    def fingerprint(self, naf_root):
+        self.n_fingerprints += 1
+        return super().fingerprint(naf_root)
+
+def naf_file(folder, name='doc.naf', content=b'<NAF/>'):
+    path = os.path.join(folder, name)
+    with open(path, 'wb') as outfile:
+        outfile.write(content)
+    return path
+
+def test_miss_then_hit():
+    for key in ['stat', 'content']:
+        folder = tempfile.mkdtemp()
+        cache = CountingCache(os.path.join(folder, 'cache'), key=key)
+        path = naf_file(folder)
+        fingerprint, cached = cache.lookup(path)
+        assert cached == None
+        cache.put(path, FRAME_INFO, fingerprint=fingerprint)
+        assert cache.n_fingerprints == 1, "the fingerprint of a miss is computed twice"
+        assert cache.get(path) == FRAME_INFO
+        assert cache.report() == {'hits': 1, 'misses': 1}
+
+def test_changed_file_is_a_miss():
+    folder = tempfile.mkdtemp()
+    cache = cache_utils.FrameInfoCache(os.path.join(folder, 'cache'))
+    path = naf_file(folder)
+    cache.put(path, FRAME_INFO)
+    naf_file(folder, content=b'<NAF version="changed"/>')
+    assert cache.get(path) == None
+
+def test_corrupt_entry_is_a_miss():
+    folder = tempfile.mkdtemp()
+    cache = cache_utils.FrameInfoCache(os.path.join(folder, 'cache'))
+    path = naf_file(folder)
+    cache.put(path, FRAME_INFO)
+    entry_path, fingerprint = cache.fingerprint(path)
+    with open(entry_path, 'r') as infile:
+        content = infile.read()
+    for corrupt in [content[:len(content) // 2], '[]', '{"frame info": []}']:
+        with open(entry_path, 'w') as outfile:
+            outfile.write(corrupt)
+        assert cache.get(path) == None
+    cache.put(path, FRAME_INFO)
+    assert cache.get(path) == FRAME_INFO, "a corrupt entry is not replaced"
+
+def test_unreadable_file_is_a_miss():
+    folder = tempfile.mkdtemp()
+    cache = cache_utils.FrameInfoCache(os.path.join(folder, 'cache'), key='content')
+    assert cache.lookup(os.path.join(folder, 'missing.naf')) == (None, None)
+    assert cache.get(os.path.join(folder, 'missing.naf')) == None
+    assert cache.report() == {'hits': 0, 'misses': 2}
+
+if __name__ == '__main__':
+    test_miss_then_hit()
+    test_changed_file_is_a_miss()
+    test_corrupt_entry_is_a_miss()
+    test_unreadable_file_is_a_miss()
+    print("cache tests passed")
@@ -0,0 +1,84 @@
+"""
+Scoring and classifying documents with DocumentScorer. run with pytest or as a script.
+"""
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from package_import import import_module
+from fixtures import document
+
+classify_utils = import_module('classify_utils')
+main = import_module('typical_frames_main')
+
+dir_path = os.path.dirname(os.path.realpath(__file__))
+NAF_PATH = os.path.join(dir_path, 'input_files', 'Canberra disappears in the dust.naf')
+
+SCORES = {'Q1': [('Killing', 1.0), ('Attack', 0.5), ('Weather', 0.0)],
+          'Q2': [('Weather', 1.0), ('Motion', 0.25)],
+          'Q3': []} #an event type without scores
+
+def test_from_fficf_dict():
+    scorer = classify_utils.DocumentScorer.from_fficf_dict(SCORES)
+    assert list(scorer.event_types) == ['Q1', 'Q2', 'Q3']
+    assert scorer.vocabulary.labels == ['Attack', 'Killing', 'Motion', 'Weather']
+    #frame x event type, frames without a score for an event type score 0
+    assert np.array_equal(scorer.profiles.toarray(), [[0.5, 0.0, 0.0], [1.0, 0.0, 0.0], [0.0, 0.25, 0.0], [0.0, 1.0, 0.0]])
+
+def test_predict_known_scores():
+    scorer = classify_utils.DocumentScorer.from_fficf_dict(SCORES)
+    documents = [document('a', ['Killing', 'Attack', 'Killing', 'Weather']),
+                 document('b', ['Weather', 'Motion'])]
+    scores = scorer.scores(documents)
+    assert np.allclose(scores, [[2.5 / 4, 1.0 / 4, 0.0], [0.0, 1.25 / 2, 0.0]])
+    event_types, ranked_scores = scorer.predict(documents)
+    assert event_types.tolist() == [['Q1', 'Q2', 'Q3'], ['Q2', 'Q1', 'Q3']]
+    assert np.allclose(ranked_scores[:, 0], [2.5 / 4, 1.25 / 2])
+    event_types, ranked_scores = scorer.predict(documents, k=1)
+    assert event_types.tolist() == [['Q1'], ['Q2']]
+
+def test_unknown_frames():
+    scorer = classify_utils.DocumentScorer.from_fficf_dict(SCORES)
+    documents = [document('known and unknown', ['Killing', 'Unknown', 'Unknown', 'Unknown']),
+                 document('unknown', ['Unknown', 'Other']),
+                 document('empty', [])]
+    scores = scorer.scores(documents)
+    #unknown frames add nothing to a score, but count in the mean
+    assert np.allclose(scores[0], [0.25, 0.0, 0.0])
+    assert np.isnan(scores[1:]).all()
+    event_types, ranked_scores = scorer.predict(documents)
+    assert event_types[:, 0].tolist() == ['Q1', None, None]
+    assert event_types[1:].tolist() == [[None, None, None], [None, None, None]]
+    assert np.isnan(ranked_scores[1:]).all()
+
+def test_nan_profiles():
+    frames = ['Attack', 'Killing', 'Weather']
+    score_matrix = np.array([[np.nan, 1.0, np.nan],
+                             [np.nan, np.nan, np.nan],
+                             [0.5, np.nan, 0.2]])
+    scorer = classify_utils.DocumentScorer(['Q1', 'Q2', 'Q3'], frames, score_matrix)
+    scores = scorer.scores([document('a', ['Attack', 'Weather']), document('b', ['Killing'])])
+    assert not np.isnan(scores).any(), "a nan in the profiles makes the score of a document nan"
+    assert np.allclose(scores, [[0.0, 0.0, 0.35], [1.0, 0.0, 0.0]])
+    event_types, ranked_scores = scorer.predict([document('a', ['Attack', 'Weather'])], k=1)
+    assert event_types.tolist() == [['Q3']]
+
+def test_naf_files():
+    scorer = classify_utils.DocumentScorer.from_fficf_dict({'Q1': [('Information', 1.0)], 'Q2': [('Giving', 1.0)]})
+    frame_info = main.frame_info(NAF_PATH)
+    missing = os.path.join(dir_path, 'input_files', 'missing.naf')
+    scores = scorer.scores([NAF_PATH, missing, frame_info])
+    assert np.array_equal(scores[0], scores[2])
+    assert scores[0, 0] > scores[0, 1] > 0
+    assert np.isnan(scores[1]).all()
+    event_types, ranked_scores = scorer.predict([missing])
+    assert event_types.tolist() == [[None, None]]
+
+if __name__ == '__main__':
+    test_from_fficf_dict()
+    test_predict_known_scores()
+    test_unknown_frames()
+    test_nan_profiles()
+    test_naf_files()
+    print("classification tests passed")
@@ -0,0 +1,55 @@
+"""
+prefiltering with a frame info cache. run with pytest or as a script.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from package_import import import_module
+from fixtures import MINIMAL_N_FRAMES, small_corpus
+
+corpus_utils = import_module('corpus_utils')
+cache_utils = import_module('cache_utils')
+main = import_module('typical_frames_main')
+
+def counted_prefilter(collections, cache):
+    """run prefilter_collections and return its result with the paths whose SRL layer was read"""
+    counted = []
+    count_srl_predicates = corpus_utils.safe_count_srl_predicates
+    def counting(naf_root):
+        counted.append(naf_root)
+        return count_srl_predicates(naf_root)
+    corpus_utils.safe_count_srl_predicates = counting
+    try:
+        result = corpus_utils.prefilter_collections(collections, MINIMAL_N_FRAMES, cache=cache)
+    finally:
+        corpus_utils.safe_count_srl_predicates = count_srl_predicates
+    return result, counted
+
+def test_prefilter_reads_only_uncached_files():
+    folder, collections = small_corpus(n_docs=12, n_event_types=2, frames_per_doc=10, seed=3)
+    paths = sorted(path for collection in collections.values() for path in collection)
+    cache = cache_utils.FrameInfoCache(os.path.join(folder, 'cache'))
+
+    (filtered, frame_counts, n_removed), counted = counted_prefilter(collections, cache)
+    assert counted == paths
+    assert 0 < n_removed < len(paths), "the corpus has no documents on both sides of the threshold"
+    for path in paths:
+        assert frame_counts[path] == sum(stats['frame frequency'] for stats in main.frame_info(path).values())
+
+    cached_path = sorted(filtered['Q0'])[0]
+    cache.put(cached_path, main.frame_info(cached_path))
+    (filtered_again, frame_counts_again, n_removed_again), counted = counted_prefilter(collections, cache)
+    assert counted == [], "cached documents and counts are read again"
+    assert (filtered_again, frame_counts_again, n_removed_again) == (filtered, frame_counts, n_removed)
+
+def test_prefilter_without_cache():
+    folder, collections = small_corpus(n_docs=12, n_event_types=2, frames_per_doc=10, seed=3)
+    (filtered, frame_counts, n_removed), counted = counted_prefilter(collections, None)
+    assert len(counted) == len(frame_counts)
+    assert sum(len(collection) for collection in filtered.values()) + n_removed == len(frame_counts)
+
+if __name__ == '__main__':
+    test_prefilter_reads_only_uncached_files()
+    test_prefilter_without_cache()
+    print("corpus tests passed")
@@ -0,0 +1,45 @@
+"""
+Extracting the frame info per event type in one or several processes, and reporting NAF files that cannot be read. run with pytest or as a script.
+"""
+import contextlib
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from package_import import import_module
+from fixtures import small_corpus
+
+main = import_module('typical_frames_main')
+
+def titles(event_type_frame_info):
+    return {event_type: [title for document in documents for title in document] for event_type, documents in event_type_frame_info.items()}
+
+def test_workers_give_the_same_output():
+    folder, collections = small_corpus(n_docs=30, n_event_types=3)
+    serial = main.event_type_info(collections, workers=1)
+    assert main.event_type_info(collections, workers=2) == serial
+    assert main.event_type_info(collections, workers=2, chunksize=1) == serial
+    assert [len(documents) for documents in serial.values()] == [10, 10, 10]
+
+def test_truncated_naf_is_reported():
+    folder, collections = small_corpus(n_docs=12, n_event_types=2)
+    truncated = sorted(collections['Q1'])[0]
+    with open(truncated, 'rb') as infile:
+        content = infile.read()
+    with open(truncated, 'wb') as outfile:
+        outfile.write(content[:len(content) // 2])
+
+    expected = titles(main.event_type_info({event_type: collection - {truncated} for event_type, collection in collections.items()}))
+    for workers in [1, 2]:
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            event_type_frame_info = main.event_type_info(collections, workers=workers, verbose=1)
+        assert titles(event_type_frame_info) == expected
+        assert f"could not extract frame info from {truncated}: XMLSyntaxError" in output.getvalue()
+        assert "1 texts could not be processed" in output.getvalue()
+
+if __name__ == '__main__':
+    test_workers_give_the_same_output()
+    test_truncated_naf_is_reported()
+    print("event type info tests passed")
@@ -0,0 +1,113 @@
+"""
+streaming exports of the typicality scores to csv, xlsx and parquet. run with pytest or as a script.
+"""
+import csv
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from package_import import import_module
+from fixtures import FFICF_DICT, FRAME_FREQ_DICT
+
+export_utils = import_module('export_utils')
+fficf_utils = import_module('fficf_utils')
+
+def values(rows):
+    """returns the rows with numbers as floats, which every format writes in its own way"""
+    def value(cell):
+        try:
+            return float(cell)
+        except ValueError:
+            return cell
+    return [[value(cell) for cell in row] for row in rows]
+
+def exported_rows(file_format, top_k=None):
+    """export the scores and read the rows back as strings"""
+    folder = tempfile.mkdtemp()
+    fficf_utils.scores_to_format(fficf_dict=FFICF_DICT,
+                                    frame_freq_dict=FRAME_FREQ_DICT,
+                                    output_folder=folder,
+                                    start_from_scratch=False,
+                                    event_types=['Q1', 'Q2'],
+                                    verbose=0,
+                                    top_k=top_k,
+                                    file_format=file_format)
+    path = os.path.join(folder, f"typicality_scores_Q1_Q2.{file_format}")
+    if file_format == 'csv':
+        with open(path, newline='') as infile:
+            return list(csv.reader(infile))
+    if file_format == 'xlsx':
+        from openpyxl import load_workbook
+        worksheet = load_workbook(path, read_only=True).active
+        return [['' if value == None else str(value) for value in row] for row in worksheet.iter_rows(values_only=True)]
+    import pyarrow.parquet as pq
+    table = pq.read_table(path).to_pydict()
+    return [list(table)] + [[str(value) for value in row] for row in zip(*table.values())]
+
+def test_csv_rows():
+    rows = exported_rows('csv')
+    assert rows[0] == fficf_utils.SCORE_HEADERS
+    assert rows[1] == ['Q1', '1', 'Killing', '1.0', '3', '60.0', '']
+    assert rows[5] == ['Q2', '2', 'Killing', '0.25', '2', '50.0', '']
+    assert rows[6] == ['Q2', '3', 'Attack', '0.0', '0', '0.0', ''], "a frame without frequencies is not exported with 0"
+    assert len(rows) == 7
+
+def test_top_k():
+    rows = exported_rows('csv', top_k=1)
+    assert [row[2] for row in rows[1:]] == ['Killing', 'Arrest']
+
+def test_formats_export_the_same_rows():
+    expected = values(exported_rows('csv'))
+    for file_format in ['xlsx', 'parquet']:
+        assert values(exported_rows(file_format)) == expected, f"{file_format} export differs from csv"
+
+def test_unknown_format():
+    try:
+        export_utils.export_rows([], os.path.join(tempfile.mkdtemp(), 'scores.txt'), ['a'], 'txt')
+        raise AssertionError("no error for an unknown format")
+    except AssertionError as error:
+        assert 'unknown export format' in str(error)
+
+def test_json_formats_hold_the_same_scores():
+    folder = tempfile.mkdtemp()
+    fficf_utils.scores_to_json(FFICF_DICT, folder, start_from_scratch=False, verbose=0)
+    for bulk_format in ['jsonl', 'table']:
+        fficf_utils.scores_to_bulk_json(FFICF_DICT, folder, start_from_scratch=False, verbose=0, bulk_format=bulk_format)
+    files = {}
+    for event_type in FFICF_DICT:
+        with open(os.path.join(folder, f"typicality_scores_{event_type}.json")) as infile:
+            files[event_type] = json.load(infile)
+    with open(os.path.join(folder, "typicality_scores.jsonl")) as infile:
+        lines = {line['event type']: line['scores'] for line in map(json.loads, infile)}
+    with open(os.path.join(folder, "typicality_scores.json")) as infile:
+        table = json.load(infile)
+    rows = {event_type: {frame: score for frame, score in zip(table['frames'], scores) if score != None}
+            for event_type, scores in table['event types'].items()}
+    assert files == lines == rows
+    assert files['Q1'][fficf_utils.PREMON_FRAME_PREFIX + 'killing'] == 1.0
+    assert sorted(name for name in os.listdir(folder) if name.endswith('.tmp')) == [], "temporary files are left behind"
+
+def test_atomic_write_keeps_the_old_file_on_error():
+    path = os.path.join(tempfile.mkdtemp(), 'scores.json')
+    with export_utils.atomic_write(path) as outfile:
+        outfile.write('old')
+    try:
+        with export_utils.atomic_write(path) as outfile:
+            outfile.write('half')
+            raise RuntimeError("interrupted")
+    except RuntimeError:
+        pass
+    with open(path) as infile:
+        assert infile.read() == 'old'
+    assert os.listdir(os.path.dirname(path)) == ['scores.json']
+
+if __name__ == '__main__':
+    test_csv_rows()
+    test_top_k()
+    test_formats_export_the_same_rows()
+    test_unknown_format()
+    test_json_formats_hold_the_same_scores()
+    test_atomic_write_keeps_the_old_file_on_error()
+    print("export tests passed")
@@ -0,0 +1,218 @@
+"""
+FF*ICF scores of the score matrix, compared with the dictionary-based computation it replaced, the ranking of the scores and c_tf_idf between time buckets. run with pytest or as a script.
+"""
+import operator
+import os
+import random
+import sys
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from package_import import import_module
+from fixtures import document
+
+fficf_utils = import_module('fficf_utils')
+
+def baseline_ff_icf(collections, event_type_frames_dict, frame_freq_dict):
+    """the ff_icf of the first release, one c_tf_idf call per cell. the CountVectorizer counts are the Counter of the sorted frames"""
+    total_n_docs = 0
+    for event_type, info in collections.items():
+        total_n_docs += len(info)
+
+    column_headers = sorted({frame for frames in event_type_frames_dict.values() for frame in frames})
+    counters = [Counter(frames) for frames in event_type_frames_dict.values()]
+    frames_vector_array = np.array([[counter[frame] for frame in column_headers] for counter in counters])
+    list_of_lists = []
+
+    for row in frames_vector_array:
+        total_freq_frames_event_type = sum(row)
+        scores = []
+        for frame_freq_event_type, frame in zip(row, column_headers):
+            frame_freq_event_types = 0
+            for event_type, freq_dict in frame_freq_dict.items():
+                if frame in freq_dict:
+                    frame_freq_event_types += freq_dict[frame]['absolute frequency']
+            scores.append(fficf_utils.c_tf_idf(frame_freq_event_type, total_freq_frames_event_type, total_n_docs, frame_freq_event_types))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            list_of_lists.append(fficf_utils.normalize_data(scores))
+
+    c_tf_idf_round = np.round(list_of_lists, decimals=6)
+    c_tf_idfdict = {}
+    for event_type, array in zip(event_type_frames_dict, c_tf_idf_round):
+        frame_valuedict = dict(zip(column_headers, array))
+        c_tf_idfdict[event_type] = sorted(frame_valuedict.items(), key=operator.itemgetter(1), reverse=True)
+    return c_tf_idfdict
+
+def synthetic_collections(n_event_types, n_docs, n_frames, seed):
+    """returns frame info documents per event type with a skewed frame distribution per event type"""
+    rng = random.Random(seed)
+    frames = [f"Frame_{index}" for index in range(n_frames)]
+    collections = {}
+    for event_type in range(n_event_types):
+        weights = [rng.random() ** 4 for frame in frames]
+        collections[f"Q{event_type}"] = [document(f"Q{event_type} {doc}", rng.choices(frames, weights=weights, k=rng.randint(1, 40)))
+                                         for doc in range(n_docs)]
+    return collections
+
+def scores(collections, top_k=None):
+    """returns the baseline scores and those of ff_icf"""
+    event_type_frames = fficf_utils.frames_collections(collections, verbose=0)
+    frame_freq = fficf_utils.frame_stats(event_type_frames, verbose=0)
+    expected = baseline_ff_icf(collections, event_type_frames, frame_freq)
+    return expected, fficf_utils.ff_icf(collections, event_type_frames, frame_freq, verbose=0, top_k=top_k)
+
+def assert_scores_equal(expected, actual):
+    assert list(actual) == list(expected)
+    for event_type in expected:
+        expected_frames = [frame for frame, score in expected[event_type]]
+        expected_scores = dict(expected[event_type])
+        assert sorted(frame for frame, score in actual[event_type]) == sorted(expected_frames)
+        assert np.allclose([score for frame, score in actual[event_type]], [expected_scores[frame] for frame, score in actual[event_type]], equal_nan=True)
+        if not np.isnan(list(expected_scores.values())).any(): #the order of nan scores is not defined by sorted
+            assert [frame for frame, score in actual[event_type]] == expected_frames
+
+def test_scores_equal_the_baseline():
+    for seed in range(5):
+        expected, actual = scores(synthetic_collections(n_event_types=4, n_docs=12, n_frames=60, seed=seed))
+        assert_scores_equal(expected, actual)
+
+def test_top_k_equals_the_baseline():
+    collections = synthetic_collections(n_event_types=5, n_docs=8, n_frames=40, seed=11)
+    for k in [1, 5, 40, 100]:
+        expected, actual = scores(collections, top_k=k)
+        assert_scores_equal({event_type: ranking[:k] for event_type, ranking in expected.items()}, actual)
+
+def test_rows_with_one_score_are_nan():
+    #every frame of an event type has the same score when it has all frames in the same proportion and the frames occur equally often
+    #in the corpus. min-max scaling divides by zero
+    collections = {'Q1': [document('a', ['Arrest', 'Killing'])],
+                   'Q2': [document('b', ['Arrest', 'Killing', 'Arrest', 'Killing'])],
+                   'Q3': [document('c', ['Arrest', 'Arrest', 'Killing'])],
+                   'Q4': [document('d', ['Arrest', 'Killing', 'Killing'])]}
+    expected, actual = scores(collections)
+    assert np.isnan([score for frame, score in expected['Q1']]).all()
+    assert_scores_equal(expected, actual)
+    assert np.isnan([score for event_type in ['Q1', 'Q2'] for frame, score in actual[event_type]]).all()
+    assert actual['Q3'] == [('Killing', 1.0), ('Arrest', 0.0)]
+
+    counts = np.array([[1, 1], [2, 2], [2, 1], [1, 2]])
+    matrix = fficf_utils.ff_icf_matrix(counts, total_n_docs=4)
+    assert np.isnan(matrix[:2]).all() and not np.isnan(matrix[2:]).any()
+    assert fficf_utils.top_k_frames(matrix, ['Q1', 'Q2', 'Q3', 'Q4'], ['Arrest', 'Killing'], 1)['Q4'] == [('Arrest', 1.0)]
+
+def sorted_scores(row, column_headers):
+    """the (frame, score) tuples of a row with a full stable sort, nan scores last"""
+    scored = sorted((index for index in range(len(row)) if not np.isnan(row[index])), key=lambda index: -row[index])
+    unscored = [index for index in range(len(row)) if np.isnan(row[index])]
+    return [(column_headers[index], row[index]) for index in scored + unscored]
+
+def tied_score_matrix(seed, n_event_types=6, n_frames=25):
+    """returns a score matrix with many equal scores, a row with some nan scores and a row with only nan scores"""
+    rng = np.random.default_rng(seed)
+    matrix = rng.integers(0, 4, size=(n_event_types, n_frames)) / 4
+    matrix[1, rng.choice(n_frames, size=n_frames // 2, replace=False)] = np.nan
+    matrix[2] = np.nan
+    return matrix
+
+def test_top_k_equals_a_full_sort():
+    event_types = [f"Q{index}" for index in range(6)]
+    column_headers = [f"Frame_{index}" for index in range(25)]
+    for seed in range(10):
+        matrix = tied_score_matrix(seed)
+        ranked = fficf_utils.ranked_scores(matrix, event_types, column_headers)
+        nonzero = fficf_utils.nonzero_scores(matrix, event_types, column_headers)
+        for event_type, row in zip(event_types, matrix):
+            expected = sorted_scores(row, column_headers)
+            assert [frame for frame, score in ranked[event_type]] == [frame for frame, score in expected]
+            assert nonzero[event_type] == [(frame, score) for frame, score in expected if score > 0]
+        for k in [0, 1, 3, 12, 25, 40]:
+            top_k = fficf_utils.top_k_frames(matrix, event_types, column_headers, k)
+            for event_type, row in zip(event_types, matrix):
+                assert top_k[event_type] == [(frame, score) for frame, score in sorted_scores(row, column_headers) if not np.isnan(score)][:k]
+        assert fficf_utils.top_k_frames(matrix, event_types, column_headers, 5)['Q2'] == []
+        assert nonzero['Q2'] == []
+
+def baseline_time_bucket_c_tf_idf(typicality_scores, train_df, dev_df, test_df, top_n_typical_frames):
+    """compute_c_tf_idf_between_time_buckets of the first release, with a boolean mask and a Python sum per time bucket and frame"""
+    target_frames = fficf_utils.top_n_frames(typicality_scores=typicality_scores, top_n_typical_frames=top_n_typical_frames)
+    big_df = pd.concat([train_df, dev_df, test_df], axis=0)
+    time_bucket_to_frame_to_freq = {}
+    frame_to_freq = Counter()
+    time_bucket_to_total_frame_occurrences = Counter()
+
+    for time_bucket in set(big_df['time bucket']):
+        time_bucket_df = big_df[big_df['time bucket'] == time_bucket]
+        time_bucket_to_frame_to_freq[time_bucket] = {}
+        for frame_label in time_bucket_df.columns:
+            if frame_label != 'time bucket' and frame_label in target_frames:
+                total = sum(time_bucket_df[frame_label])
+                time_bucket_to_frame_to_freq[time_bucket][frame_label] = total
+                frame_to_freq[frame_label] += total
+                time_bucket_to_total_frame_occurrences[time_bucket] += total
+
+    list_of_lists = []
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for time_bucket, tb_frame_to_freq in time_bucket_to_frame_to_freq.items():
+            for frame, tb_freq in tb_frame_to_freq.items():
+                list_of_lists.append([time_bucket, frame, fficf_utils.c_tf_idf(tb_freq, time_bucket_to_total_frame_occurrences[time_bucket],
+                                                                               len(big_df), frame_to_freq[frame])])
+    return pd.DataFrame(list_of_lists, columns=['time bucket', 'frame', 'c_tf_idf'])
+
+def time_bucket_dfs(seed):
+    """returns train, dev and test dataframes with a time bucket and the frame frequencies of every document, and typicality scores"""
+    rng = np.random.default_rng(seed)
+    frames = [f"Frame_{index}" for index in range(12)]
+    dfs = []
+    for n_docs in [20, 8, 8]:
+        df = pd.DataFrame(rng.poisson(rng.random(len(frames)) * 2, size=(n_docs, len(frames))), columns=frames)
+        df['Frame_11'] = 0 #a frame that never occurs
+        df.insert(0, 'time bucket', rng.choice(['2000-2004', '2005-2009', '2010-2014', '2015-2019'], size=n_docs))
+        dfs.append(df)
+    typicality_scores = {frame: float(score) for frame, score in zip(frames, rng.random(len(frames)))}
+    return dfs, typicality_scores
+
+def sorted_rows(df):
+    return df.sort_values(['time bucket', 'frame'], kind='stable').reset_index(drop=True)
+
+def test_time_bucket_c_tf_idf_equals_the_baseline():
+    for seed in range(3):
+        (train_df, dev_df, test_df), typicality_scores = time_bucket_dfs(seed)
+        for top_n in [3, 12, 'all']:
+            expected = baseline_time_bucket_c_tf_idf(typicality_scores, train_df, dev_df, test_df, top_n)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                actual = fficf_utils.compute_c_tf_idf_between_time_buckets(typicality_scores, train_df, dev_df, test_df, top_n)
+            assert list(actual['time bucket']) == sorted(actual['time bucket']), "the rows are not in time bucket order"
+            pd.testing.assert_frame_equal(sorted_rows(actual), sorted_rows(expected), check_dtype=False)
+
+def test_time_bucket_c_tf_idf_for_event_types():
+    (train_df, dev_df, test_df), typicality_scores = time_bucket_dfs(4)
+    rng = random.Random(4)
+    event_type_to_typicality_scores = {'Q1': typicality_scores,
+                                       'Q2': {frame: rng.random() for frame in typicality_scores},
+                                       'Q3': {frame: rng.random() for frame in list(typicality_scores)[:6]}}
+    for top_n in [2, 5]:
+        actual = fficf_utils.compute_c_tf_idf_between_time_buckets_for_event_types(event_type_to_typicality_scores, train_df, dev_df, test_df, top_n)
+        dfs = []
+        for event_type, scores in event_type_to_typicality_scores.items():
+            df = fficf_utils.compute_c_tf_idf_between_time_buckets(scores, train_df, dev_df, test_df, top_n)
+            df.insert(0, 'event type', event_type)
+            dfs.append(df)
+        pd.testing.assert_frame_equal(actual, pd.concat(dfs, axis=0, ignore_index=True))
+        assert set(actual['event type']) == {'Q1', 'Q2', 'Q3'}
+
+        for event_type in event_type_to_typicality_scores:
+            expected = baseline_time_bucket_c_tf_idf(event_type_to_typicality_scores[event_type], train_df, dev_df, test_df, top_n)
+            rows = actual[actual['event type'] == event_type].drop(columns='event type')
+            pd.testing.assert_frame_equal(sorted_rows(rows), sorted_rows(expected), check_dtype=False)
+
+if __name__ == '__main__':
+    test_scores_equal_the_baseline()
+    test_top_k_equals_the_baseline()
+    test_rows_with_one_score_are_nan()
+    test_top_k_equals_a_full_sort()
+    test_time_bucket_c_tf_idf_equals_the_baseline()
+    test_time_bucket_c_tf_idf_for_event_types()
+    print("ff*icf tests passed")
@@ -0,0 +1,46 @@
+"""
+Importing the package and looking up frame_info must not load numpy, scipy, pandas or scikit-learn,
+and must stay within IMPORT_BUDGET seconds. Every measurement runs in a fresh interpreter.
+run with pytest or as a script.
+"""
+import os
+import json
+import subprocess
+import sys
+
+IMPORT_BUDGET = 0.5 #seconds, for importing the package and frame_info (which loads lxml)
+HEAVY_MODULES = ['numpy', 'scipy', 'pandas', 'sklearn']
+REPEATS = 3
+
+package_dir = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+package_name = os.path.basename(package_dir)
+
+MEASUREMENT = f"""
+import json, sys, time
+start = time.perf_counter()
+import {package_name}
+{package_name}.frame_info
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'loaded': [name for name in {HEAVY_MODULES!r} if name in sys.modules]}}))
+"""
+
+def measure_import():
+    """returns the import time in seconds and the heavy modules that were loaded, measured in a fresh interpreter"""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([os.path.dirname(package_dir), env.get('PYTHONPATH', '')])
+    output = subprocess.run([sys.executable, '-c', MEASUREMENT], env=env, capture_output=True, text=True, check=True)
+    result = json.loads(output.stdout)
+    return result['seconds'], result['loaded']
+
+def test_no_heavy_modules_on_import():
+    seconds, loaded = measure_import()
+    assert loaded == [], f"importing the package loaded {loaded}"
+
+def test_import_time_budget():
+    fastest = min(measure_import()[0] for repeat in range(REPEATS))
+    assert fastest <= IMPORT_BUDGET, f"importing the package took {fastest:.3f}s, the budget is {IMPORT_BUDGET}s"
+
+if __name__ == '__main__':
+    test_no_heavy_modules_on_import()
+    test_import_time_budget()
+    print(f"import time: {min(measure_import()[0] for repeat in range(REPEATS)):.3f}s")
@@ -0,0 +1,53 @@
+"""
+score index export and lookups. run with pytest or as a script.
+"""
+import os
+import sys
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from package_import import import_module
+from fixtures import FFICF_DICT
+
+index_utils = import_module('index_utils')
+fficf_utils = import_module('fficf_utils')
+
+INDEXED_SCORES = {'Q1': FFICF_DICT['Q1'], 'Q2': FFICF_DICT['Q2'][:2]} #Attack has no score for Q2
+
+def score_index():
+    folder = os.path.join(tempfile.mkdtemp(), 'score_index')
+    index_utils.scores_to_index(INDEXED_SCORES, folder)
+    return index_utils.ScoreIndex(folder)
+
+def test_lookups():
+    index = score_index()
+    assert index.event_types == ['Q1', 'Q2']
+    assert index.frames == ['Arrest', 'Attack', 'Killing']
+    assert index.score('Q1', 'Attack') == 0.5
+    assert index.score('Q2', fficf_utils.PREMON_FRAME_PREFIX + 'killing') == 0.25
+    assert np.isnan(index.score('Q2', 'Attack')), "a frame without a score is not nan"
+    assert np.array_equal(index.scores([('Q1', 'Killing'), ('Q2', 'Arrest')]), [1.0, 1.0])
+
+def test_top_k_and_event_types_for_frame():
+    index = score_index()
+    assert index.top_k('Q1', 2) == [('Killing', 1.0), ('Attack', 0.5)]
+    assert index.top_k('Q2', 3) == [('Arrest', 1.0), ('Killing', 0.25)], "frames without a score are returned"
+    assert index.event_types_for_frame('Killing') == [('Q1', 1.0), ('Q2', 0.25)]
+    assert index.event_types_for_frame('Killing', threshold=0.5) == [('Q1', 1.0)]
+    assert index.event_types_for_frame('Attack', k=5) == [('Q1', 0.5)]
+
+def test_unknown_labels():
+    index = score_index()
+    for lookup in [lambda: index.score('Q3', 'Killing'), lambda: index.score('Q1', 'Unknown')]:
+        try:
+            lookup()
+            raise AssertionError("no error for an unknown label")
+        except AssertionError as error:
+            assert 'not in score index' in str(error)
+
+if __name__ == '__main__':
+    test_lookups()
+    test_top_k_and_event_types_for_frame()
+    test_unknown_labels()
+    print("score index tests passed")
@@ -0,0 +1,87 @@
+"""
+Stage records of the Instrumentation and the per-stage peak memory. run with pytest or as a script.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from package_import import import_module
+
+instrument_utils = import_module('instrument_utils')
+
+def allocate_mb(n_mb):
+    """returns a bytearray of n_mb megabytes whose pages are all touched"""
+    return bytearray(os.urandom(n_mb * 1024 ** 2))
+
+def high_water_mark_kb():
+    """returns VmHWM of this process on Linux, or None"""
+    if not os.path.exists('/proc/self/status'):
+        return None
+    with open('/proc/self/status', 'r') as infile:
+        for line in infile:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1])
+    return None
+
+def test_memory_sink_records_stages():
+    sink = instrument_utils.MemorySink()
+    instrumentation = instrument_utils.Instrumentation(sinks=[sink])
+    with instrumentation.stage('outer', documents=3) as record:
+        record['predicates'] = 12
+        with instrumentation.stage('inner'):
+            pass
+    assert sink.stages() == ['inner', 'outer']
+    outer = sink.get('outer')
+    assert outer['documents'] == 3 and outer['predicates'] == 12
+    assert outer['predicates per second'] > 0
+    for key in ['wall seconds', 'cpu seconds', 'peak rss mb', 'process peak rss mb', 'process peak worker rss mb']:
+        assert key in outer
+    assert sink.get('missing') == None
+
+def test_stage_peak_is_per_stage():
+    sink = instrument_utils.MemorySink()
+    instrumentation = instrument_utils.Instrumentation(sinks=[sink])
+    with instrumentation.stage('outer'):
+        with instrumentation.stage('large'):
+            block = allocate_mb(64)
+            time.sleep(0.05) #a few sampling intervals
+            del block
+        with instrumentation.stage('small'):
+            pass
+    large = sink.get('large')['peak rss mb']
+    small = sink.get('small')['peak rss mb']
+    outer = sink.get('outer')['peak rss mb']
+    if large == None: #the resident memory cannot be read on this platform
+        assert small == None and outer == None
+        return
+    #the 64 MB of the large stage count for the enclosing stage, but not for the stage after it
+    assert large - small >= 48
+    assert outer >= large
+    assert sink.get('small')['process peak rss mb'] >= large
+
+def test_stages_keep_the_process_high_water_mark():
+    peaks = instrument_utils.StagePeaks()
+    block = allocate_mb(64)
+    del block
+    before = high_water_mark_kb()
+    peaks.start()
+    peaks.start()
+    peaks.stop()
+    peaks.stop()
+    assert peaks.sampler == None, "the sampling thread is stopped with the last stage"
+    if before != None:
+        assert high_water_mark_kb() >= before, "the high-water mark of the process was reset"
+        assert peaks.process_peak >= before / 1024 - 0.1
+
+def test_stage_without_instrumentation():
+    with instrument_utils.stage(None, 'anything', documents=2) as record:
+        record['predicates'] = 5
+    assert record == {'documents': 2, 'predicates': 5}
+
+if __name__ == '__main__':
+    test_memory_sink_records_stages()
+    test_stage_peak_is_per_stage()
+    test_stages_keep_the_process_high_water_mark()
+    test_stage_without_instrumentation()
+    print("instrumentation tests passed")
@@ -0,0 +1,160 @@
+"""
+Reading the frames of a corpus as interned frame ids, compared with reading the frame info dictionaries. run with pytest or as a script.
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from package_import import import_module
+
+intern_utils = import_module('intern_utils')
+store_utils = import_module('store_utils')
+corpus_utils = import_module('corpus_utils')
+fficf_utils = import_module('fficf_utils')
+
+def synthetic_corpus(n_docs, n_frames=200, seed=0):
+    """returns a corpus dictionary as written by load_corpus, with every predicate column filled in"""
+    rng = random.Random(seed)
+    frames = [f"Frame_{index}" for index in range(n_frames)]
+    corpus_dict = {}
+    for doc in range(n_docs):
+        frame_info = {}
+        for term in range(rng.randint(5, 30)):
+            frame_info[f"t{term}"] = {'frame': rng.choice(frames), 'lemma': f"lemma{rng.randint(0, 500)}", 'POS': 'VERB', 'sentence': str(term // 5),
+                                    'article': {'definite': None, 'lemma': None}, 'compound': {'function': None, 'lemma': None}}
+        corpus_dict.setdefault(f"Q{doc % 3}", []).append({f"title {doc}": {'frame frequency': len(frame_info), 'frame info': frame_info}})
+    return corpus_dict
+
+def written_corpus(n_docs):
+    """returns the folder with the corpus as json file and as sqlite store, and the corpus dictionary"""
+    folder = tempfile.mkdtemp()
+    corpus_dict = synthetic_corpus(n_docs)
+    with open(os.path.join(folder, 'corpus_info.json'), 'w') as outfile:
+        json.dump(corpus_dict, outfile, indent=4, sort_keys=True)
+    store_utils.corpus_to_sqlite(corpus_dict, folder, start_from_scratch=False, verbose=0)
+    return folder, corpus_dict
+
+def frame_lists(corpus):
+    """returns the sorted frames of every document of an interned corpus. the json file has the predicates in sorted order of their term ids"""
+    return {event_type: [sorted(corpus.frames.labels[frame_id] for frame_id in frame_ids) for frame_ids in documents]
+            for event_type, documents in corpus.documents.items()}
+
+def dictionary_frame_lists(corpus_dict):
+    """returns the sorted frames of every document of a corpus dictionary"""
+    return {event_type: [sorted(info['frame'] for stats in document.values() for info in stats['frame info'].values()) for document in documents]
+            for event_type, documents in corpus_dict.items()}
+
+def predicate_lists(corpus):
+    """returns the sorted (frame, lemma, POS) triples of every document of an interned corpus"""
+    return {event_type: [sorted(zip(*[corpus.decode(column, corpus.interned[column][event_type][position]) for column in ('frame', 'lemma', 'POS')]))
+                         for position in range(len(documents))]
+            for event_type, documents in corpus.documents.items()}
+
+def dictionary_predicate_lists(corpus_dict):
+    """returns the sorted (frame, lemma, POS) triples of every document of a corpus dictionary"""
+    return {event_type: [sorted((info['frame'], info['lemma'], info['POS']) for stats in document.values() for info in stats['frame info'].values())
+                         for document in documents]
+            for event_type, documents in corpus_dict.items()}
+
+def traced_peak_mb(function):
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024 ** 2
+
+def test_readers_keep_the_frames_of_every_document():
+    folder, corpus_dict = written_corpus(60)
+    expected = dictionary_frame_lists(corpus_dict)
+    from_json = intern_utils.InternedCorpus.from_json(os.path.join(folder, 'corpus_info.json'))
+    from_store = intern_utils.InternedCorpus.from_store(store_utils.store_path(folder))
+    assert frame_lists(from_json) == expected
+    assert frame_lists(from_store) == expected
+
+    selected = intern_utils.InternedCorpus.from_json(os.path.join(folder, 'corpus_info.json'), event_types=['Q2', 'Q0'])
+    assert frame_lists(selected) == {'Q2': expected['Q2'], 'Q0': expected['Q0']}
+    selected = intern_utils.InternedCorpus.from_store(store_utils.store_path(folder), event_types=['Q1'])
+    assert frame_lists(selected) == {'Q1': expected['Q1']}
+
+def test_readers_intern_lemma_and_pos():
+    folder, corpus_dict = written_corpus(60)
+    expected = dictionary_predicate_lists(corpus_dict)
+    columns = ('frame', 'lemma', 'POS')
+    from_json = intern_utils.InternedCorpus.from_json(os.path.join(folder, 'corpus_info.json'), columns=columns)
+    from_store = intern_utils.InternedCorpus.from_store(store_utils.store_path(folder), columns=columns)
+    for corpus in [from_json, from_store]:
+        assert predicate_lists(corpus) == expected
+        assert frame_lists(corpus) == dictionary_frame_lists(corpus_dict)
+        assert corpus.vocabularies['POS'].labels == ['VERB']
+        assert all(len(lemmas) == len(frames) for event_type, documents in corpus.documents.items()
+                   for frames, lemmas in zip(documents, corpus.interned['lemma'][event_type]))
+
+    selected = intern_utils.InternedCorpus.from_store(store_utils.store_path(folder), event_types=['Q1'], columns=('lemma',))
+    assert selected.columns == ('frame', 'lemma') and list(selected.interned['lemma']) == ['Q1']
+    try:
+        intern_utils.InternedCorpus(columns=('sentence',))
+        assert False, "an unknown column is interned"
+    except AssertionError as error:
+        assert 'cannot be interned' in str(error)
+
+def test_scores_equal_the_dictionary_path():
+    folder, corpus_dict = written_corpus(90)
+    sample = corpus_utils.sample_corpus(corpus_dict, verbose=0, seed=4)
+    event_type_frames = fficf_utils.frames_collections(sample, verbose=0)
+    frame_freq = fficf_utils.frame_stats(event_type_frames, verbose=0)
+    expected = fficf_utils.ff_icf(sample, event_type_frames, frame_freq, verbose=0)
+
+    for corpus in [intern_utils.InternedCorpus.from_json(os.path.join(folder, 'corpus_info.json')),
+                   intern_utils.InternedCorpus.from_store(store_utils.store_path(folder))]:
+        sampled_documents = corpus_utils.sample_corpus(corpus.documents, verbose=0, seed=4)
+        event_types, frames, counts = corpus.frame_count_matrix(sampled_documents)
+        assert fficf_utils.matrix_stats(event_types, frames, counts) == frame_freq
+        scores = fficf_utils.ff_icf_from_matrix(event_types, frames, counts,
+                                                total_n_docs=sum(len(documents) for documents in sampled_documents.values()),
+                                                verbose=0)
+        assert scores == expected
+
+def test_reading_takes_less_memory_than_the_dictionaries():
+    folder, corpus_dict = written_corpus(1500)
+    del corpus_dict
+    json_path = os.path.join(folder, 'corpus_info.json')
+    path = store_utils.store_path(folder)
+
+    def read_json_dictionaries():
+        with open(json_path, 'r') as infile:
+            return json.load(infile)
+
+    dictionaries = traced_peak_mb(lambda: store_utils.sqlite_to_corpus(path, columns=('frame',)))
+    interned = traced_peak_mb(lambda: intern_utils.InternedCorpus.from_store(path))
+    assert interned * 3 < dictionaries, f"{interned:.1f} MB interned, {dictionaries:.1f} MB as dictionaries"
+
+    dictionaries = traced_peak_mb(read_json_dictionaries)
+    interned = traced_peak_mb(lambda: intern_utils.InternedCorpus.from_json(json_path))
+    assert interned < dictionaries, f"{interned:.1f} MB interned, {dictionaries:.1f} MB as dictionaries"
+
+    columns = ('frame', 'lemma', 'POS')
+    dictionaries = traced_peak_mb(lambda: store_utils.sqlite_to_corpus(path, columns=columns))
+    interned = traced_peak_mb(lambda: intern_utils.InternedCorpus.from_store(path, columns=columns))
+    assert interned * 3 < dictionaries, f"{interned:.1f} MB interned lemma and POS, {dictionaries:.1f} MB as dictionaries"
+
+def test_frame_counts():
+    folder, corpus_dict = written_corpus(30)
+    corpus = intern_utils.InternedCorpus.from_store(store_utils.store_path(folder))
+    event_types, frames, counts = corpus.frame_count_matrix()
+    assert frames == sorted(frames)
+    for event_type, row in zip(event_types, counts):
+        expected = Counter(frame for frame_list in dictionary_frame_lists(corpus_dict)[event_type] for frame in frame_list)
+        assert {frame: int(count) for frame, count in zip(frames, row) if count} == dict(expected)
+
+if __name__ == '__main__':
+    test_readers_keep_the_frames_of_every_document()
+    test_readers_intern_lemma_and_pos()
+    test_scores_equal_the_dictionary_path()
+    test_reading_takes_less_memory_than_the_dictionaries()
+    test_frame_counts()
+    print("interning tests passed")
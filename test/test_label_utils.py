@@ -0,0 +1,75 @@
+"""
+LabelResolver against a local stand-in for the Wikidata entity endpoint. run with pytest or as a script.
+"""
+import os
+import sys
+import json
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from label_utils import LabelResolver
+
+LABELS = {f"Q{number}": f"event type {number}" for number in range(50)}
+REQUESTS = []
+
+class EntityHandler(BaseHTTPRequestHandler):
+    """serves /entity/<identifier>.json like wikidata, 404 for unknown identifiers"""
+    def do_GET(self):
+        identifier = os.path.basename(self.path)[:-len('.json')]
+        REQUESTS.append(identifier)
+        if identifier not in LABELS:
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = json.dumps({"entities": {identifier: {"labels": {"en": {"language": "en", "value": LABELS[identifier]}}}}})
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(body.encode('utf-8'))
+
+    def log_message(self, format, *args):
+        pass
+
+def stand_in_server():
+    """start the stand-in server in a thread and return it with its url template"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), EntityHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/entity/{{identifier}}.json"
+
+def test_resolve_and_cache():
+    server, endpoint = stand_in_server()
+    cache_path = os.path.join(tempfile.mkdtemp(), 'labels.sqlite')
+    identifiers = sorted(LABELS)
+    try:
+        REQUESTS.clear()
+        resolver = LabelResolver(cache_path=cache_path, endpoint=endpoint, max_workers=4)
+        assert resolver.resolve(identifiers) == LABELS
+        assert sorted(REQUESTS) == identifiers
+        resolver.close()
+
+        REQUESTS.clear()
+        resolver = LabelResolver(cache_path=cache_path, endpoint=endpoint)
+        assert resolver.resolve(identifiers + ['Q999']) == dict(LABELS, Q999=None)
+        assert REQUESTS == ['Q999'], "cached labels are fetched again"
+        assert 'Q999' in resolver.errors
+        resolver.close()
+    finally:
+        server.shutdown()
+
+def test_offline():
+    cache_path = os.path.join(tempfile.mkdtemp(), 'labels.sqlite')
+    resolver = LabelResolver(cache_path=cache_path, endpoint="http://127.0.0.1:9/{identifier}", offline=True)
+    resolver.store({'Q1': 'event type 1'})
+    assert resolver.resolve(['Q1', 'Q2']) == {'Q1': 'event type 1', 'Q2': None}
+    try:
+        resolver.label('Q2', strict=True)
+        raise AssertionError("no LookupError in strict mode")
+    except LookupError:
+        pass
+
+if __name__ == '__main__':
+    test_resolve_and_cache()
+    test_offline()
+    print("label resolver tests passed")
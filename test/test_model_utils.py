@@ -0,0 +1,71 @@
+"""
+TypicalityModel updates, failed removals and persistence. run with pytest or as a script.
+"""
+import os
+import sys
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from package_import import import_module
+from fixtures import document
+
+model_utils = import_module('model_utils')
+fficf_utils = import_module('fficf_utils')
+
+CORPUS = {'Q1': [document('a', ['A', 'A', 'B']), document('b', ['A', 'D'])],
+          'Q2': [document('c', ['B', 'B', 'D']), document('d', ['A', 'B'])]}
+
+def state(model):
+    """returns a copy of everything update changes"""
+    return (list(model.event_types), list(model.vocabulary.labels), model.counts.copy(), model.frame_totals.copy(),
+            model.event_type_totals.copy(), model.event_type_docs.copy(), model.tf.copy())
+
+def assert_same_state(first, second):
+    for first_value, second_value in zip(first, second):
+        assert np.array_equal(np.asarray(first_value), np.asarray(second_value))
+
+def test_scores_equal_ff_icf():
+    model = model_utils.TypicalityModel.from_corpus(CORPUS)
+    counters = {event_type: {} for event_type in CORPUS}
+    for event_type, documents in CORPUS.items():
+        for frame in fficf_utils.frames_collection(documents):
+            counters[event_type][frame] = counters[event_type].get(frame, 0) + 1
+    event_types, frames, expected = fficf_utils.ff_icf_counts(counters, total_n_docs=4)
+    assert model.scores()[:2] == (event_types, frames)
+    assert np.allclose(model.scores()[2], expected, equal_nan=True)
+
+def test_add_then_remove():
+    model = model_utils.TypicalityModel.from_corpus(CORPUS)
+    before = state(model)
+    model.add_documents('Q1', [document('e', ['A', 'B'])])
+    model.remove_documents('Q1', [document('e', ['A', 'B'])])
+    assert_same_state(state(model), before)
+
+def test_failed_remove_leaves_model_unchanged():
+    model = model_utils.TypicalityModel.from_corpus(CORPUS)
+    before = state(model)
+    for event_type, documents in [('Q1', [document('x', ['C', 'C'])]), #unseen frame
+                                    ('Q3', [document('y', ['A'])]), #unseen event type
+                                    ('Q1', [document('z', ['B', 'B'])]), #more occurrences than were added
+                                    ('Q1', [document('u', []), document('v', []), document('w', [])])]: #more documents than were added
+        try:
+            model.remove_documents(event_type, documents)
+            raise AssertionError(f"removing {documents} from {event_type} did not fail")
+        except AssertionError as error:
+            assert 'did not fail' not in str(error), str(error)
+        assert_same_state(state(model), before)
+
+def test_save_and_load():
+    model = model_utils.TypicalityModel.from_corpus(CORPUS)
+    path = os.path.join(tempfile.mkdtemp(), 'model.npz')
+    model.save(path)
+    loaded = model_utils.TypicalityModel.load(path)
+    assert loaded.fficf_dict() == model.fficf_dict()
+
+if __name__ == '__main__':
+    test_scores_equal_ff_icf()
+    test_add_then_remove()
+    test_failed_remove_leaves_model_unchanged()
+    test_save_and_load()
+    print("model tests passed")
@@ -0,0 +1,83 @@
+"""
+release fingerprints of a DFNDataReleases checkout. run with pytest or as a script.
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from package_import import import_module
+
+path_utils = import_module('path_utils')
+
+COMMIT = 'a' * 40
+OTHER_COMMIT = 'b' * 40
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as outfile:
+        outfile.write(content)
+
+def release(git=True):
+    """returns the folder of a fake release checkout with a json file per project"""
+    repo_dir = tempfile.mkdtemp()
+    write(os.path.join(repo_dir, 'structured', 'project_a.json'), '{}')
+    write(os.path.join(repo_dir, 'structured', 'project_b.json'), '{}')
+    if git:
+        write(os.path.join(repo_dir, '.git', 'HEAD'), 'ref: refs/heads/main\n')
+        write(os.path.join(repo_dir, '.git', 'refs', 'heads', 'main'), f"{COMMIT}\n")
+    return repo_dir
+
+def test_git_head():
+    repo_dir = release()
+    assert path_utils.git_head(repo_dir) == COMMIT
+    os.remove(os.path.join(repo_dir, '.git', 'refs', 'heads', 'main'))
+    write(os.path.join(repo_dir, '.git', 'packed-refs'), f"# pack-refs with: peeled\n{OTHER_COMMIT} refs/heads/main\n")
+    assert path_utils.git_head(repo_dir) == OTHER_COMMIT
+    write(os.path.join(repo_dir, '.git', 'HEAD'), f"{COMMIT}\n")
+    assert path_utils.git_head(repo_dir) == COMMIT
+    assert path_utils.git_head(release(git=False)) == None
+
+def test_git_head_of_submodule():
+    superproject = tempfile.mkdtemp()
+    repo_dir = os.path.join(superproject, 'DFNDataReleases')
+    write(os.path.join(repo_dir, '.git'), 'gitdir: ../.git/modules/DFNDataReleases\n')
+    write(os.path.join(superproject, '.git', 'modules', 'DFNDataReleases', 'HEAD'), f"{COMMIT}\n")
+    assert path_utils.git_head(repo_dir) == COMMIT
+
+def json_paths(fingerprint):
+    return [entry[0] for entry in fingerprint if entry[0] != 'HEAD']
+
+def test_fingerprint_follows_head():
+    repo_dir = release()
+    fingerprint = path_utils.release_fingerprint(repo_dir)
+    assert fingerprint[0] == ['HEAD', COMMIT]
+    assert json_paths(fingerprint) == [os.path.join('structured', 'project_a.json'), os.path.join('structured', 'project_b.json')]
+    write(os.path.join(repo_dir, '.git', 'refs', 'heads', 'main'), f"{OTHER_COMMIT}\n")
+    assert path_utils.release_fingerprint(repo_dir)[0] == ['HEAD', OTHER_COMMIT], "a new commit in a running process is not noticed"
+
+def test_fingerprint_notices_uncommitted_json_files():
+    repo_dir = release()
+    fingerprint = path_utils.release_fingerprint(repo_dir)
+    write(os.path.join(repo_dir, 'structured', 'project_b.json'), '{"regenerated": true}')
+    changed = path_utils.release_fingerprint(repo_dir)
+    assert changed[0] == fingerprint[0] and changed != fingerprint
+    write(os.path.join(repo_dir, 'structured', 'project_c.json'), '{}')
+    assert len(json_paths(path_utils.release_fingerprint(repo_dir))) == 3
+    write(os.path.join(repo_dir, 'unstructured', 'en', 'doc.json'), '{}')
+    assert len(json_paths(path_utils.release_fingerprint(repo_dir))) == 3, "the NAF folders are walked"
+
+def test_fingerprint_without_git():
+    repo_dir = release(git=False)
+    fingerprint = path_utils.release_fingerprint(repo_dir)
+    assert [path for path, mtime, size in fingerprint] == [os.path.join('structured', 'project_a.json'), os.path.join('structured', 'project_b.json')]
+    write(os.path.join(repo_dir, 'structured', 'project_b.json'), '{"changed": true}')
+    assert path_utils.release_fingerprint(repo_dir) != fingerprint
+
+if __name__ == '__main__':
+    test_git_head()
+    test_git_head_of_submodule()
+    test_fingerprint_follows_head()
+    test_fingerprint_notices_uncommitted_json_files()
+    test_fingerprint_without_git()
+    print("release fingerprint tests passed")
@@ -0,0 +1,220 @@
+"""
+The sqlite corpus store: the streamed store, sampling and counting in the store, closing the store on errors and stores of several languages. run with pytest or as a script.
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from package_import import import_module
+from fixtures import MINIMAL_N_FRAMES, small_corpus, sliced_corpus
+
+store_utils = import_module('store_utils')
+corpus_utils = import_module('corpus_utils')
+main = import_module('typical_frames_main')
+
+def extracted_corpus():
+    """returns a work folder, the NAF paths per event type and the sliced corpus dictionary"""
+    folder, collections = small_corpus()
+    return folder, collections, sliced_corpus(collections)
+
+def dump(path):
+    """returns all rows of the store"""
+    connection = sqlite3.connect(path)
+    tables = [connection.execute(f"SELECT * FROM {table} ORDER BY rowid").fetchall() for table in ['documents', 'predicates']]
+    connection.close()
+    return tables
+
+def titles(corpus_dict):
+    return {event_type: [title for document in documents for title in document] for event_type, documents in corpus_dict.items()}
+
+def test_streamed_store_equals_exported_store():
+    folder, collections, corpus_dict = extracted_corpus()
+    exported = os.path.join(folder, 'exported')
+    streamed = os.path.join(folder, 'streamed')
+    store_utils.corpus_to_sqlite(corpus_dict, exported, start_from_scratch=True, verbose=0)
+    stored = main.stream_corpus(collections, streamed, MINIMAL_N_FRAMES, workers=2, memory_limit_mb=1)
+    assert dump(store_utils.store_path(streamed)) == dump(store_utils.store_path(exported))
+    assert dict(stored) == {event_type: len(documents) for event_type, documents in corpus_dict.items()}
+
+def test_store_round_trip():
+    folder, collections, corpus_dict = extracted_corpus()
+    store_utils.corpus_to_sqlite(corpus_dict, folder, start_from_scratch=False, verbose=0)
+    path = store_utils.store_path(folder)
+    assert store_utils.sqlite_to_corpus(path) == corpus_dict
+    assert store_utils.store_event_types(path) == list(corpus_dict)
+    loaded = store_utils.sqlite_to_corpus(path, event_types=['Q1'], columns=('frame',))
+    assert list(loaded) == ['Q1']
+    for document in loaded['Q1']:
+        for title, stats in document.items():
+            assert all(list(info) == ['frame'] for info in stats['frame info'].values())
+
+def test_sample_documents_matches_sample_corpus():
+    folder, collections, corpus_dict = extracted_corpus()
+    store_utils.corpus_to_sqlite(corpus_dict, folder, start_from_scratch=False, verbose=0)
+    path = store_utils.store_path(folder)
+    connection = sqlite3.connect(path)
+    doc_titles = dict(connection.execute("SELECT doc_id, title FROM documents").fetchall())
+    connection.close()
+    for seed in [0, 7]:
+        sampled_ids = store_utils.sample_documents(path, seed=seed)
+        sampled_titles = {event_type: [doc_titles[doc_id] for doc_id in doc_ids] for event_type, doc_ids in sampled_ids.items()}
+        assert sampled_titles == titles(corpus_utils.sample_corpus(corpus_dict, verbose=0, seed=seed))
+
+def test_event_type_frame_counts():
+    folder, collections, corpus_dict = extracted_corpus()
+    store_utils.corpus_to_sqlite(corpus_dict, folder, start_from_scratch=False, verbose=0)
+    path = store_utils.store_path(folder)
+
+    def frame_counts(documents):
+        return Counter(info['frame'] for document in documents for stats in document.values() for info in stats['frame info'].values())
+
+    expected = {event_type: frame_counts(documents) for event_type, documents in corpus_dict.items()}
+    assert store_utils.event_type_frame_counts(path) == expected
+    assert store_utils.event_type_frame_counts(path, event_types=['Q0']) == {'Q0': expected['Q0']}
+
+    sampled_ids = store_utils.sample_documents(path, seed=3)
+    sample = corpus_utils.sample_corpus(corpus_dict, verbose=0, seed=3)
+    doc_ids = [doc_id for ids in sampled_ids.values() for doc_id in ids]
+    assert store_utils.event_type_frame_counts(path, doc_ids=doc_ids) == {event_type: frame_counts(documents) for event_type, documents in sample.items()}
+
+def test_writer_closes_on_error():
+    path = os.path.join(tempfile.mkdtemp(), store_utils.STORE_NAME)
+    stats = {'frame frequency': 1, 'frame info': {'t1': {'frame': 'Killing'}}}
+    try:
+        with store_utils.StoreWriter(path, max_rows=1) as writer:
+            writer.add_document('Q1', 'written', stats)
+            writer.add_document('Q1', 'written as well', stats)
+            raise ValueError("extraction failed")
+    except ValueError:
+        pass
+    try:
+        writer.connection.execute("SELECT 1")
+        assert False, "the store is still open"
+    except sqlite3.ProgrammingError:
+        pass
+    assert [title for doc_id, event_type, title, *rest in dump(path)[0]] == ['written', 'written as well']
+
+def test_stream_corpus_closes_store_on_error():
+    folder, collections, corpus_dict = extracted_corpus()
+    exits = []
+    class RecordingWriter(store_utils.StoreWriter):
+        def __exit__(self, exc_type, exc_value, traceback):
+            exits.append(exc_type)
+            return super().__exit__(exc_type, exc_value, traceback)
+
+    def failing(naf_root, cache=None):
+        raise RuntimeError("worker failed")
+
+    store_writer, safe_cached_frame_info = main.StoreWriter, main.safe_cached_frame_info
+    main.StoreWriter, main.safe_cached_frame_info = RecordingWriter, failing
+    try:
+        main.stream_corpus(collections, os.path.join(folder, 'streamed'), MINIMAL_N_FRAMES)
+        assert False, "the error of the extraction is not raised"
+    except RuntimeError:
+        pass
+    finally:
+        main.StoreWriter, main.safe_cached_frame_info = store_writer, safe_cached_frame_info
+    assert exits == [RuntimeError]
+
+def test_iter_parallel_map_window():
+    window = 3
+    submitted = []
+    def items():
+        for item in range(-20, 0):
+            submitted.append(item)
+            yield item
+
+    results = []
+    for result in corpus_utils.iter_parallel_map(abs, items(), workers=2, window=window):
+        assert len(submitted) - len(results) <= window, "more items in flight than the window"
+        results.append(result)
+    assert results == list(range(20, 0, -1))
+    assert list(corpus_utils.iter_parallel_map(abs, items(), workers=1)) == results
+
+def partitioned_store():
+    """returns the folder and the corpus dictionary of a store with the same event types in two languages of one project"""
+    folder, collections, corpus_dict = extracted_corpus()
+    other_folder, other_collections, other_corpus_dict = extracted_corpus()
+    partitioned = {}
+    for event_type in corpus_dict:
+        partitioned[('project', 'en', event_type)] = corpus_dict[event_type]
+        partitioned[('project', 'nl', event_type)] = other_corpus_dict[event_type][:-1]
+    store_utils.corpus_to_sqlite(partitioned, folder, start_from_scratch=False, verbose=0)
+    return folder, partitioned
+
+def selection(partitioned, language):
+    return {event_type: documents for (project, key_language, event_type), documents in partitioned.items() if key_language == language}
+
+def test_store_partitions():
+    folder, partitioned = partitioned_store()
+    path = store_utils.store_path(folder)
+    assert store_utils.store_partitions(path) == {key: len(documents) for key, documents in sorted(partitioned.items())}
+    assert store_utils.store_event_types(path, project='project', language='nl') == ['Q0', 'Q1', 'Q2']
+
+def test_partition_filters():
+    folder, partitioned = partitioned_store()
+    path = store_utils.store_path(folder)
+    for language in ['en', 'nl']:
+        corpus_dict = selection(partitioned, language)
+        assert store_utils.sqlite_to_corpus(path, project='project', language=language) == corpus_dict
+        #the project can be left out, there is only one
+        assert store_utils.sqlite_to_corpus(path, event_types=['Q1'], language=language) == {'Q1': corpus_dict['Q1']}
+        counts = store_utils.event_type_frame_counts(path, project='project', language=language)
+        assert counts == {event_type: Counter(info['frame'] for document in documents for stats in document.values() for info in stats['frame info'].values())
+                          for event_type, documents in corpus_dict.items()}
+        sampled_ids = store_utils.sample_documents(path, seed=2, project='project', language=language)
+        assert {event_type: len(doc_ids) for event_type, doc_ids in sampled_ids.items()} == {event_type: min(len(documents) for documents in corpus_dict.values()) for event_type in corpus_dict}
+        connection = sqlite3.connect(path)
+        languages = {doc_language for doc_ids in sampled_ids.values() for doc_id in doc_ids
+                     for (doc_language,) in connection.execute("SELECT language FROM documents WHERE doc_id = ?", (doc_id,))}
+        connection.close()
+        assert languages == {language}
+
+def test_partitions_are_not_merged():
+    folder, partitioned = partitioned_store()
+    path = store_utils.store_path(folder)
+    readers = [lambda **partition: store_utils.sqlite_to_corpus(path, **partition),
+               lambda **partition: store_utils.sample_documents(path, seed=1, **partition),
+               lambda **partition: store_utils.event_type_frame_counts(path, **partition),
+               lambda **partition: main.read_corpus(folder, None, 'sqlite', **partition)]
+    for reader in readers:
+        for selection_arguments in [{}, {'project': 'project'}]:
+            try:
+                reader(**selection_arguments)
+                assert False, "the documents of two languages are merged"
+            except AssertionError as error:
+                assert 'select one project and language' in str(error)
+        reader(project='project', language='nl')
+
+def test_contrastive_analysis_of_one_language():
+    folder, partitioned = partitioned_store()
+    try:
+        main.contrastive_analysis(['Q0', 'Q1'], folder, corpus_format='sqlite', export_format='csv', verbose=0)
+        assert False, "the documents of two languages are merged"
+    except AssertionError as error:
+        assert 'select one project and language' in str(error)
+    for streaming in [False, True]:
+        main.contrastive_analysis(['Q0', 'Q1'], folder, corpus_format='sqlite', export_format='csv', streaming=streaming, seed=3,
+                                  project='project', language='nl', verbose=0)
+        with open(os.path.join(folder, 'typicality_scores_Q0.json')) as infile:
+            scores = infile.read()
+        if streaming:
+            assert scores == not_streamed
+        not_streamed = scores
+
+if __name__ == '__main__':
+    test_streamed_store_equals_exported_store()
+    test_store_round_trip()
+    test_sample_documents_matches_sample_corpus()
+    test_event_type_frame_counts()
+    test_writer_closes_on_error()
+    test_stream_corpus_closes_store_on_error()
+    test_iter_parallel_map_window()
+    test_store_partitions()
+    test_partition_filters()
+    test_partitions_are_not_merged()
+    test_contrastive_analysis_of_one_language()
+    print("store tests passed")
@@ -0,0 +1,69 @@
+"""
+The frame count matrix of FrameVocabulary, compared with the CountVectorizer output it replaced. run with pytest or as a script.
+"""
+import os
+import random
+import sys
+from collections import Counter
+
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from package_import import import_module, package_dir
+
+vocab_utils = import_module('vocab_utils')
+fficf_utils = import_module('fficf_utils')
+sys.path.insert(0, package_dir) #typical_utils imports the modules of the package as top-level modules
+import typical_utils
+
+def event_type_frames(n_event_types, n_frames, seed):
+    """returns a list of frames per event type, with frames that occur in only some event types"""
+    rng = random.Random(seed)
+    frames = [f"Frame_{index}" for index in range(n_frames)] + ['Being_born', 'Cause_harm', 'Arrest']
+    return {f"Q{event_type}": rng.choices(frames[event_type:], k=rng.randint(1, 80)) for event_type in range(n_event_types)}
+
+def test_count_matrix_equals_count_vectorizer():
+    for seed in range(5):
+        frames_dict = event_type_frames(n_event_types=4, n_frames=30, seed=seed)
+        vectorizer = CountVectorizer(lowercase=False, analyzer=fficf_utils.split_on_space)
+        expected = vectorizer.fit_transform([' '.join(frames) for frames in frames_dict.values()])
+
+        counters = vocab_utils.frame_counters(frames_dict)
+        vocabulary = vocab_utils.FrameVocabulary.from_counters(counters.values())
+        matrix = vocabulary.count_matrix(counters.values())
+        assert vocabulary.labels == list(vectorizer.get_feature_names_out())
+        assert matrix.shape == expected.shape
+        assert np.array_equal(matrix.toarray(), expected.toarray())
+        assert matrix.nnz == expected.nnz #no explicit zeros
+
+def test_vocabulary_ids():
+    vocabulary = vocab_utils.FrameVocabulary(['Killing', 'Attack', 'Killing'])
+    assert vocabulary.labels == ['Attack', 'Killing']
+    assert vocabulary.add('Arrest') == 2 and vocabulary.add('Attack') == 0
+    assert len(vocabulary) == 3 and 'Arrest' in vocabulary
+    assert vocabulary.count_matrix([Counter(['Arrest', 'Arrest']), Counter()]).toarray().tolist() == [[0, 0, 2], [0, 0, 0]]
+
+def baseline_contrastive_analysis(event_type_frames_dict):
+    """the tf-idf matrix of contrastive_analysis in typical_utils before FrameVocabulary"""
+    vectorizer = CountVectorizer()
+    lists_vector_data = vectorizer.fit_transform([' '.join(frames) for frames in event_type_frames_dict.values()])
+    tf_idf_array = TfidfTransformer().fit_transform(lists_vector_data).toarray()
+    return list(vectorizer.get_feature_names_out()), tf_idf_array
+
+def test_contrastive_analysis_equals_count_vectorizer():
+    for seed in range(3):
+        frames_dict = event_type_frames(n_event_types=3, n_frames=20, seed=seed)
+        column_headers, tf_idf_array = baseline_contrastive_analysis(frames_dict)
+        tf_idf_dict = typical_utils.contrastive_analysis(frames_dict)
+        assert list(tf_idf_dict) == list(frames_dict)
+        for event_type, row in zip(frames_dict, tf_idf_array):
+            expected = dict(zip(column_headers, row))
+            assert sorted(frame for frame, value in tf_idf_dict[event_type]) == sorted(column_headers)
+            assert np.allclose([value for frame, value in tf_idf_dict[event_type]], [expected[frame] for frame, value in tf_idf_dict[event_type]])
+
+if __name__ == '__main__':
+    test_count_matrix_equals_count_vectorizer()
+    test_vocabulary_ids()
+    test_contrastive_analysis_equals_count_vectorizer()
+    print("frame vocabulary tests passed")
@@ -0,0 +1,103 @@
+"""
+Extracting NAF files in one streaming pass and the NafIndex dictionaries, compared with the tree-based extraction functions. run with pytest or as a script.
+"""
+import io
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from package_import import import_module
+from synthetic_naf import generate_corpus
+
+xml_utils = import_module('xml_utils')
+main = import_module('typical_frames_main')
+
+dir_path = os.path.dirname(os.path.realpath(__file__))
+NAF_PATH = os.path.join(dir_path, 'input_files', 'Canberra disappears in the dust.naf')
+
+#a term, wf, dep and predicate outside their layer, which the tree-based extraction functions do not read
+NESTED_NAF = b'''<?xml version='1.0' encoding='UTF-8'?>
+<NAF xml:lang="en" version="v3.1">
+  <nafHeader>
+    <fileDesc title="nested elements"/>
+  </nafHeader>
+  <text>
+    <wf sent="1" id="w1">the</wf>
+    <wf sent="1" id="w2">attack</wf>
+  </text>
+  <terms>
+    <term id="t1" lemma="the" pos="DET"><span><target id="w1"/></span></term>
+    <term id="t2" lemma="attack" pos="NOUN"><span><target id="w2"/></span></term>
+  </terms>
+  <deps>
+    <dep from="t2" to="t1" rfunc="det"/>
+  </deps>
+  <other>
+    <wf sent="2" id="w3">other</wf>
+    <term id="t3" lemma="other" pos="NOUN"><span><target id="w3"/></span></term>
+    <dep from="t2" to="t3" rfunc="compound"/>
+    <predicate id="pr9"><externalReferences><externalRef reference="http://premon.fbk.eu/resource/fn17-other"/></externalReferences><span><target id="t3"/></span></predicate>
+  </other>
+  <srl>
+    <predicate id="pr1">
+      <externalReferences><externalRef reference="http://premon.fbk.eu/resource/fn17-attack"/></externalReferences>
+      <span><target id="t2"/></span>
+    </predicate>
+  </srl>
+</NAF>'''
+
+#a predicate of a term that is not in the terms layer
+MISSING_TERM_NAF = NESTED_NAF.replace(b'<target id="t2"/></span>\n    </predicate>', b'<target id="t5"/></span>\n    </predicate>')
+
+def tree_frame_info(naf_root):
+    """the frame info of a NAF file with the tree-based extraction functions"""
+    return xml_utils.frame_info_dict(*xml_utils.parse_naf_info(naf_root))
+
+def test_frame_info_equals_the_tree_extraction():
+    folder = tempfile.mkdtemp()
+    collections = generate_corpus(folder, n_docs=20, n_event_types=2, doc_length=80, frames_per_doc=15, vocabulary_size=30, seed=1)
+    paths = [NAF_PATH] + sorted(path for collection in collections.values() for path in collection)
+    for path in paths:
+        assert main.frame_info(path) == tree_frame_info(path), path
+        assert xml_utils.count_srl_predicates(path) == len(xml_utils.parse_naf_info(path)[1])
+
+def test_elements_outside_their_layer():
+    streamed = xml_utils.stream_naf_info(io.BytesIO(NESTED_NAF))
+    assert streamed == xml_utils.parse_naf_info(io.BytesIO(NESTED_NAF))
+    title, framedict, lemmadict, sentencedict, detdict, compounddict = streamed
+    assert framedict == {'t2': 'Attack'}
+    assert list(lemmadict) == ['t1', 't2']
+    assert dict(sentencedict) == {'1': {'w1', 'w2'}}
+    assert compounddict == {}
+    assert xml_utils.count_srl_predicates(io.BytesIO(NESTED_NAF)) == 1
+    frame_info = xml_utils.NafIndex.from_naf(io.BytesIO(NESTED_NAF)).frame_info_dict()
+    assert frame_info == tree_frame_info(io.BytesIO(NESTED_NAF))
+    assert frame_info['nested elements']['frame info']['t2']['article'] == {'definite': True, 'lemma': 'the'}
+
+def test_index_dictionaries_equal_the_extraction_functions():
+    folder = tempfile.mkdtemp()
+    collections = generate_corpus(folder, n_docs=10, n_event_types=2, doc_length=80, frames_per_doc=15, vocabulary_size=30, seed=2)
+    for path in [NAF_PATH] + sorted(path for collection in collections.values() for path in collection):
+        dicts = xml_utils.parse_naf_info(path)
+        assert xml_utils.stream_naf_info(path) == dicts, path
+        index = xml_utils.NafIndex.from_dicts(*dicts)
+        assert index.to_dicts() == dicts
+        assert index.frame_info_dict() == xml_utils.NafIndex.from_naf(path).frame_info_dict()
+
+def test_missing_term():
+    assert xml_utils.stream_naf_info(io.BytesIO(MISSING_TERM_NAF)) == xml_utils.parse_naf_info(io.BytesIO(MISSING_TERM_NAF))
+    frame_info = xml_utils.NafIndex.from_naf(io.BytesIO(MISSING_TERM_NAF)).frame_info_dict()
+    #the lemma and POS of the predicate are None, it has no sentence
+    assert frame_info == {'nested elements': {'frame frequency': 1,
+                                              'frame info': {'t5': {'frame': 'Attack', 'lemma': None, 'POS': None,
+                                                                    'article': {'definite': None, 'lemma': None},
+                                                                    'compound': {'function': None, 'lemma': None}}}}}
+    assert frame_info == tree_frame_info(io.BytesIO(MISSING_TERM_NAF))
+
+if __name__ == '__main__':
+    test_frame_info_equals_the_tree_extraction()
+    test_elements_outside_their_layer()
+    test_index_dictionaries_equal_the_extraction_functions()
+    test_missing_term()
+    print("NAF extraction tests passed")
@@ -1,12 +1,17 @@
-from .xml_utils import srl_id_frames, term_id_lemmas, determiner_id_info, compound_id_info, get_text_title, frame_info_dict, sentence_info
-from .path_utils import get_naf_paths
-from .corpus_utils import delete_smallest_texts, corpus_to_json, select_event_types, sample_corpus
-from .fficf_utils import frames_collections, frame_stats, ff_icf, scores_to_format, scores_to_json
+from .xml_utils import NafIndex, srl_id_frames, term_id_lemmas, determiner_id_info, compound_id_info, get_text_title, frame_info_dict, sentence_info
+from .path_utils import get_naf_paths_multi
+from .cache_utils import FrameInfoCache
+from .store_utils import StoreWriter, partition_key, corpus_to_sqlite, store_path, sample_documents, event_type_frame_counts
+from .corpus_utils import parallel_map, iter_parallel_map, prefilter_collections, delete_smallest_texts, create_output_folder, corpus_to_json, sample_corpus
+from .instrument_utils import stage, count_predicates
+from .archive_utils import close_archives
 
-from lxml import etree
-import json
 import os
-import pandas as pd
+from collections import Counter
+from functools import partial
+
+DOCUMENT_BYTES = 256 * 1024 #estimate of the memory taken by the frame info of one document in flight
+PREDICATE_ROW_BYTES = 1024 #estimate of the memory taken by one buffered row of the corpus store
 
 def frame_info(naf_root,
                 verbose=0):
@@ -15,41 +20,190 @@ def frame_info(naf_root,
     :param naf_iterable: path to naf iterable
     :type naf_iterable: string
     '''
-    doc_tree = etree.parse(naf_root)
-    root = doc_tree.getroot()
-
-    title = get_text_title(root)
-    framedict = srl_id_frames(root)
-    lemmadict = term_id_lemmas(root)
-    sentencedict = sentence_info(root)
-    detdict = determiner_id_info(root)
-    compounddict = compound_id_info(root)
-
-    frame_info = frame_info_dict(title=title,
-                                    framedict=framedict,
-                                    lemmadict=lemmadict,
-                                    sentencedict=sentencedict,
-                                    detdict=detdict,
-                                    compounddict=compounddict)
+    naf_index = NafIndex.from_naf(naf_root)
+    frame_info = naf_index.frame_info_dict()
     if verbose >= 2:
         print(frame_info)
     return frame_info
 
+def safe_frame_info(naf_root):
+    """
+    run frame_info on one NAF file without raising.
+    returns a tuple of the path, the frame info dictionary (None on failure) and the error message (None on success).
+    :param naf_root: path to a NAF file
+    :type naf_root: string
+    """
+    try:
+        return naf_root, frame_info(naf_root), None
+    except Exception as error:
+        return naf_root, None, f"{type(error).__name__}: {error}"
+
+def safe_cached_frame_info(naf_root, cache=None):
+    """
+    safe_frame_info with a cache lookup first, for the worker processes of stream_corpus.
+    returns a tuple of the path, the frame info dictionary, the error message and whether the frame info came from the cache.
+    :param naf_root: path to a NAF file
+    :param cache: cache with the frame info of previously processed documents
+    :type naf_root: string
+    :type cache: FrameInfoCache
+    """
+    fingerprint = None
+    if cache != None:
+        fingerprint, cached = cache.lookup(naf_root)
+        if cached != None:
+            return naf_root, cached, None, True
+    naf_root, frame_info_dict, error = safe_frame_info(naf_root)
+    if cache != None and error == None:
+        cache.put(naf_root, frame_info_dict, fingerprint=fingerprint)
+    return naf_root, frame_info_dict, error, False
+
+def stream_corpus(collections,
+                output_folder,
+                minimal_n_frames,
+                start_from_scratch=True,
+                workers=1,
+                cache=None,
+                memory_limit_mb=512,
+                n_prefiltered=0,
+                verbose=0,
+                instrumentation=None):
+    """
+    extract the frame info of every NAF file, drop the texts with less than minimal_n_frames annotated frames and append the others
+    to the corpus store in the output folder, one document at a time. the corpus is never held in memory: half of memory_limit_mb
+    bounds the documents in flight between the workers and the store, the other half the rows buffered before they are written.
+    the store is the same as the one corpus_to_sqlite writes. returns the number of stored texts per key of collections.
+    :param collections: a collection of collections of NAF paths per event type, or per (project, language, event type)
+    :param output_folder: output folder
+    :param minimal_n_frames: filter of minimum number of annotated frames in a text
+    :param workers: the number of processes used to extract the frame info
+    :param cache: cache with the frame info of previously processed documents
+    :param memory_limit_mb: the memory in megabytes for documents in flight and buffered rows
+    :param n_prefiltered: the number of texts that were already removed by prefilter_collections
+    :type collections: dictionary
+    :type output_folder: string
+    :type minimal_n_frames: integer
+    :type workers: integer
+    :type cache: FrameInfoCache
+    :type memory_limit_mb: integer
+    :type n_prefiltered: integer
+    """
+    assert output_folder != None, "streaming requires an output folder for the corpus store"
+    create_output_folder(output_folder=output_folder,
+                        start_from_scratch=start_from_scratch,
+                        verbose=verbose)
+    budget = memory_limit_mb * 1024 ** 2 // 2
+    window = max(workers, budget // DOCUMENT_BYTES)
+
+    jobs = [(key, path) for key in sorted(collections) for path in sorted(collections[key])]
+    results = iter_parallel_map(partial(safe_cached_frame_info, cache=cache),
+                                (path for key, path in jobs),
+                                workers=workers,
+                                window=window)
+    stored = Counter()
+    count = n_prefiltered
+    errors = 0
+    hits = 0
+
+    with stage(instrumentation, 'stream_corpus', documents=len(jobs), workers=workers) as record:
+        with StoreWriter(store_path(output_folder), max_rows=max(1, budget // PREDICATE_ROW_BYTES)) as writer:
+            try:
+                for (key, path), (naf_root, frame_info_dict, error, hit) in zip(jobs, results):
+                    hits += hit
+                    if error != None:
+                        errors += 1
+                        if verbose >= 1:
+                            print(f"could not extract frame info from {naf_root}: {error}")
+                        continue
+                    project, language, event_type = partition_key(key)
+                    for title, stats in frame_info_dict.items():
+                        if stats['frame frequency'] >= minimal_n_frames:
+                            writer.add_document(event_type, title, stats, project, language)
+                            stored[key] += 1
+                        else:
+                            count += 1
+            finally:
+                results.close() #shut down the worker processes as well when the extraction fails
+        record['predicates'] = writer.n_predicates
+
+    for key in collections:
+        assert stored[key] != 0, "no documents containing more frames than provided threshold"
+    if verbose >= 1:
+        if errors:
+            print(f"{errors} texts could not be processed")
+        if cache != None:
+            print(f"frame info cache: {hits} hits, {len(jobs) - errors - hits} misses")
+        print(f"{count} texts with less than {minimal_n_frames} frames removed")
+        print(f"loaded and sliced corpus streamed to {store_path(output_folder)}")
+    return stored
+
 def event_type_info(collections,
-                verbose=0):
+                workers=1,
+                chunksize=None,
+                cache=None,
+                verbose=0,
+                instrumentation=None):
     """
     Returns a dictionary with event type as key and list of dictionaries with linguistic information as value.
+    The documents of each event type are processed in sorted path order, so the output does not depend on the number of workers.
+    Files that cannot be processed are reported and left out.
     :param collections: a collection of collections of NAF paths per event type
+    :param workers: the number of processes over which the documents are distributed
+    :param chunksize: the number of documents sent to a process at once. By default the documents are divided in four chunks per worker.
+    :param cache: cache with the frame info of previously processed documents. Only documents that are not in the cache are parsed.
+    :param instrumentation: records the duration and memory use of the stage
     :type collections: dictionary
+    :type workers: integer
+    :type chunksize: integer
+    :type cache: FrameInfoCache
+    :type instrumentation: Instrumentation
     """
-    event_type_frame_info_dict = {}
+    jobs = []
 
     for event_type, collection in collections.items():
-        collection_of_dicts = []
-        for file in collection:
-            frame_info_dict = frame_info(file)
-            collection_of_dicts.append(frame_info_dict)
-        event_type_frame_info_dict[event_type] = collection_of_dicts
+        for path in sorted(collection):
+            jobs.append((event_type, path))
+
+    results = [None] * len(jobs)
+    missing = []
+    fingerprints = {} #position -> fingerprint of the documents that are not in the cache, computed once
+
+    with stage(instrumentation, 'event_type_info', documents=len(jobs), workers=workers) as record:
+        for position, (event_type, path) in enumerate(jobs):
+            if cache != None:
+                fingerprint, cached = cache.lookup(path)
+                if cached != None:
+                    results[position] = (path, cached, None)
+                    continue
+                fingerprints[position] = fingerprint
+            missing.append(position)
+        paths = [jobs[position][1] for position in missing]
+
+        extracted = parallel_map(safe_frame_info, paths, workers=workers, chunksize=chunksize)
+
+        for position, result in zip(missing, extracted):
+            results[position] = result
+            naf_root, frame_info_dict, error = result
+            if cache != None and error == None:
+                cache.put(naf_root, frame_info_dict, fingerprint=fingerprints[position])
+        record['parsed'] = len(paths)
+        if instrumentation != None: #only counted for the stage record
+            record['predicates'] = sum(len(info['frame info']) for path, frame_info_dict, error in results if error == None for info in frame_info_dict.values())
+
+    event_type_frame_info_dict = {event_type: [] for event_type in collections}
+    errors = 0
+
+    for (event_type, path), (naf_root, frame_info_dict, error) in zip(jobs, results):
+        if error != None:
+            errors += 1
+            if verbose >= 1:
+                print(f"could not extract frame info from {naf_root}: {error}")
+            continue
+        event_type_frame_info_dict[event_type].append(frame_info_dict)
+
+    if verbose >= 1 and errors:
+        print(f"{errors} texts could not be processed")
+    if verbose >= 1 and cache != None:
+        print(f"frame info cache: {len(jobs) - len(missing)} hits, {len(missing)} misses")
     return event_type_frame_info_dict
 
 def load_corpus(project,
@@ -57,86 +211,288 @@ def load_corpus(project,
                 output_folder=None,
                 minimal_frames_per_doc=10,
                 start_from_scratch=True,
-                verbose=0):
+                workers=1,
+                cache_folder=None,
+                prefilter=False,
+                corpus_format='json',
+                streaming=False,
+                memory_limit_mb=512,
+                verbose=0,
+                instrumentation=None):
     """
     load the corpus from DFNDataReleases and distribute the linguistic information from the naf files
     over event types in dictionary.
-    :param project: the name of the project under which the corpus in DFNDataReleases is stored
-    :param language: the language of the corpus
+    several projects and languages are loaded in one pass: the release information is loaded once per project, the documents of all
+    languages share one pool of workers and the corpus store is partitioned by project, language and event type.
+    :param project: the name of the project under which the corpus in DFNDataReleases is stored, or a list of projects
+    :param language: the language of the corpus, or a list of languages
     :param output_folder: output folder
     :param minimal_frames_per_doc: the minimal number of annotated frames a document must contain
     :param start_from_scratch: start from scratch
-    :type project: string
-    :type language: string
+    :param workers: the number of processes used to extract the linguistic information from the naf files
+    :param cache_folder: folder in which the manifest of the project and the extracted information per naf file are cached. On a rerun, only new or changed files are parsed.
+    :param prefilter: count the frames in the SRL layer first and skip the full extraction of documents below minimal_frames_per_doc.
+    counting the frames of a document that is not in the cache costs about 55-65% of its full extraction, so the prefilter only saves time
+    when about half or more of the documents are below minimal_frames_per_doc, or when the counts are in the cache of an earlier run.
+    :param corpus_format: 'json' writes corpus_info.json, 'sqlite' writes a corpus_info.sqlite store with one row per predicate
+    :param streaming: stream the documents into the sqlite store one by one instead of loading the whole corpus first, see stream_corpus
+    :param memory_limit_mb: the memory in megabytes for documents in flight and buffered rows when streaming
+    :param instrumentation: records wall time, cpu time, peak memory and throughput per stage, see instrument_utils
+    :type project: string or list
+    :type language: string or list
     :type output_folder: string
     :type minimal_frames_per_doc: integer
     :type start_from_scratch: boolean
+    :type workers: integer
+    :type cache_folder: string
+    :type prefilter: boolean
+    :type corpus_format: string
+    :type streaming: boolean
+    :type memory_limit_mb: integer
+    :type instrumentation: Instrumentation
     """
-    event_type_paths_dict = get_naf_paths(project=project,
-                                        language=language,
-                                        verbose=verbose)
-    event_type_info_dict = event_type_info(collections=event_type_paths_dict)
+    assert corpus_format in {'json', 'sqlite'}, f"unknown corpus format {corpus_format}"
+    assert corpus_format == 'sqlite' or not streaming, "streaming requires corpus_format='sqlite'"
+    projects = [project] if isinstance(project, str) else list(project)
+    languages = [language] if isinstance(language, str) else list(language)
+    assert corpus_format == 'sqlite' or len(projects) == len(languages) == 1, "loading several projects or languages requires corpus_format='sqlite'"
+    try:
+        with stage(instrumentation, 'get_naf_paths') as record:
+            naf_paths = get_naf_paths_multi(projects=projects,
+                                            languages=languages,
+                                            cache_folder=cache_folder,
+                                            verbose=verbose)
+            #one collection per (project, language, event type), so that all documents are processed by the same workers
+            event_type_paths_dict = {(project, language, event_type): collection for (project, language), event_type_collection in naf_paths.items()
+                                                                                    for event_type, collection in event_type_collection.items()}
+            record['documents'] = sum(len(collection) for collection in event_type_paths_dict.values())
+        if verbose >= 2:
+            for key, collection in event_type_paths_dict.items():
+                print(f"{' '.join(key)}: {len(collection)} reference texts")
+        if cache_folder != None:
+            cache = FrameInfoCache(cache_folder)
+        else:
+            cache = None
+
+        n_prefiltered = 0
+        if prefilter:
+            event_type_paths_dict, frame_counts, n_prefiltered = prefilter_collections(collections=event_type_paths_dict,
+                                                                                        minimal_n_frames=minimal_frames_per_doc,
+                                                                                        workers=workers,
+                                                                                        cache=cache,
+                                                                                        verbose=verbose,
+                                                                                        instrumentation=instrumentation)
+
+        if streaming:
+            stream_corpus(collections=event_type_paths_dict,
+                            output_folder=output_folder,
+                            minimal_n_frames=minimal_frames_per_doc,
+                            start_from_scratch=start_from_scratch,
+                            workers=workers,
+                            cache=cache,
+                            memory_limit_mb=memory_limit_mb,
+                            n_prefiltered=n_prefiltered,
+                            verbose=verbose,
+                            instrumentation=instrumentation)
+            return
+
+        event_type_info_dict = event_type_info(collections=event_type_paths_dict,
+                                                workers=workers,
+                                                cache=cache,
+                                                verbose=verbose,
+                                                instrumentation=instrumentation)
+    finally:
+        close_archives() #all NAF files have been read
     sliced_corpus = delete_smallest_texts(collections=event_type_info_dict,
                                             minimal_n_frames=minimal_frames_per_doc,
-                                            verbose=verbose)
+                                            verbose=verbose,
+                                            n_prefiltered=n_prefiltered,
+                                            instrumentation=instrumentation)
 
     if verbose >= 2:
-        for event_type, collection in sliced_corpus.items():
-            print(f'{event_type}: {len(collection)} reference texts')
+        for key, collection in sliced_corpus.items():
+            print(f"{' '.join(key)}: {len(collection)} reference texts")
 
-    corpus_to_json(corpus_dict=sliced_corpus,
-                    output_folder=output_folder,
-                    start_from_scratch=start_from_scratch,
-                    verbose=verbose)
+    if corpus_format == 'sqlite':
+        with stage(instrumentation, 'corpus_to_sqlite') as record:
+            if instrumentation != None:
+                record['documents'], record['predicates'] = count_predicates(sliced_corpus)
+            corpus_to_sqlite(corpus_dict=sliced_corpus,
+                            output_folder=output_folder,
+                            start_from_scratch=start_from_scratch,
+                            verbose=verbose)
+    else:
+        corpus_to_json(corpus_dict={event_type: collection for (project, language, event_type), collection in sliced_corpus.items()},
+                        output_folder=output_folder,
+                        start_from_scratch=start_from_scratch,
+                        verbose=verbose,
+                        instrumentation=instrumentation)
     return
 
+def read_corpus(output_folder, event_types, corpus_format, project=None, language=None, columns=('frame',), verbose=0):
+    """
+    read the frames of the documents of the selected event types that load_corpus wrote to the output folder.
+    returns an InternedCorpus, the frames are interned while they are read, and the lemma and POS if they are among the columns.
+    :param output_folder: output folder of load_corpus
+    :param event_types: wikidata event type identifiers, all event types if None
+    :param corpus_format: 'json' or 'sqlite'
+    :param project: only read the documents of this project from a sqlite store
+    :param language: only read the documents of this language from a sqlite store
+    :param columns: the predicate columns that are interned, see intern_utils.INTERNED_COLUMNS
+    :type output_folder: string
+    :type event_types: list
+    :type corpus_format: string
+    :type project: string
+    :type language: string
+    :type columns: tuple
+    """
+    from .intern_utils import InternedCorpus
+    if corpus_format == 'sqlite':
+        corpus_path = store_path(output_folder)
+        assert os.path.isfile(corpus_path), "corpus not found"
+        corpus = InternedCorpus.from_store(path=corpus_path,
+                                            event_types=event_types,
+                                            project=project,
+                                            language=language,
+                                            columns=columns)
+    else:
+        assert project == None and language == None, "selecting a project or language requires corpus_format='sqlite'"
+        corpus_path = f"{output_folder}/corpus_info.json"
+        assert os.path.isfile(corpus_path) == True, "corpus not found"
+        corpus = InternedCorpus.from_json(path=corpus_path,
+                                            event_types=event_types,
+                                            columns=columns)
+
+    if verbose >= 1:
+        print(f"loaded {sum(len(documents) for documents in corpus.documents.values())} documents of {len(corpus.documents)} event types from {corpus_path}")
+    return corpus
+
 def contrastive_analysis(event_types=None,
                             output_folder=None,
                             start_from_scratch=False,
-                            verbose=2):
+                            corpus_format='json',
+                            top_k=None,
+                            seed=None,
+                            export_format='xlsx',
+                            json_format='files',
+                            streaming=False,
+                            project=None,
+                            language=None,
+                            verbose=2,
+                            instrumentation=None):
     """
     Extract frames from corpus per event type, perform ff*icf and return a dataframe in excel and json.
     :param event_types: specified wikidata event type identifiers
     :param output_folder: output folder
     :param start_from_scratch: start from scratch
+    :param corpus_format: the format in which load_corpus wrote the corpus, 'json' or 'sqlite'.
+    only the frames of the selected event types are read from a sqlite store.
+    :param top_k: only rank and export the k best frames per event type. all frames are exported if None
+    :param seed: seed of the random sample of reference texts per event type
+    :param export_format: the format of the table with ranked frames, 'xlsx' (default), 'csv' or 'parquet'
+    :param json_format: 'files' writes a json file per event type, 'jsonl' and 'table' write the scores of all event types to one file
+    :param streaming: sample the documents and count their frames in the sqlite store, without loading the documents
+    :param project: only analyse the documents of this project, required for a sqlite store of several projects or languages
+    :param language: only analyse the documents of this language, required for a sqlite store of several projects or languages
+    :param instrumentation: records wall time, cpu time, peak memory and throughput per stage, see instrument_utils
     :type event_types: list
     :type output_folder: string
     :type start_from_scratch: boolean
+    :type corpus_format: string
+    :type top_k: integer
+    :type seed: integer
+    :type export_format: string
+    :type json_format: string
+    :type streaming: boolean
+    :type project: string
+    :type language: string
+    :type instrumentation: Instrumentation
     """
     assert type(event_types) == list, "event type identifiers are not in list"
     assert len(event_types) >= 2, "provide at least two identifiers in the event types list"
+    assert corpus_format in {'json', 'sqlite'}, f"unknown corpus format {corpus_format}"
+    assert corpus_format == 'sqlite' or not streaming, "streaming requires corpus_format='sqlite'"
+    #numpy and scipy are loaded on the first analysis, not on import of the package
+    from .fficf_utils import counter_stats, matrix_stats, ff_icf_from_counts, ff_icf_from_matrix, scores_to_format, scores_to_json, scores_to_bulk_json
 
-    corpus_path = f"{output_folder}/corpus_info.json"
-    assert os.path.isfile(corpus_path) == True, "corpus not found"
-
-    with open(corpus_path, "r") as infile:
-        corpus_dict = json.load(infile)
-
-    if event_types!= None:
-        event_type_info_dict = select_event_types(event_types=event_types,
-                                                    corpus_dict=corpus_dict,
-                                                    verbose=verbose)
+    if streaming:
+        path = store_path(output_folder)
+        with stage(instrumentation, 'read_corpus', format='streaming') as record:
+            sampled_doc_ids = sample_documents(path=path,
+                                                event_types=event_types,
+                                                seed=seed,
+                                                project=project,
+                                                language=language,
+                                                verbose=verbose)
+            frame_counts = event_type_frame_counts(path=path,
+                                                    event_types=event_types,
+                                                    doc_ids=[doc_id for doc_ids in sampled_doc_ids.values() for doc_id in doc_ids],
+                                                    project=project,
+                                                    language=language)
+            counters = {event_type: frame_counts.get(event_type, Counter()) for event_type in sampled_doc_ids}
+            for event_type, counter in counters.items():
+                assert len(counter) != 0, "no frames in list"
+            total_n_docs = sum(len(doc_ids) for doc_ids in sampled_doc_ids.values())
+            record['documents'] = total_n_docs
+            if instrumentation != None:
+                record['predicates'] = sum(sum(counter.values()) for counter in counters.values())
+        frame_freq_dict = counter_stats(counters)
+        fficf_dict = ff_icf_from_counts(counters=counters,
+                                        total_n_docs=total_n_docs,
+                                        verbose=verbose,
+                                        top_k=top_k,
+                                        instrumentation=instrumentation)
     else:
-        event_type_info_dict = corpus_dict
+        with stage(instrumentation, 'read_corpus', format=corpus_format) as record:
+            corpus = read_corpus(output_folder=output_folder,
+                                event_types=event_types,
+                                corpus_format=corpus_format,
+                                project=project,
+                                language=language,
+                                verbose=verbose)
+            if instrumentation != None:
+                record['documents'] = sum(len(documents) for documents in corpus.documents.values())
+                record['predicates'] = sum(len(frame_ids) for documents in corpus.documents.values() for frame_ids in documents)
 
-    sampled_corpus = sample_corpus(collections=event_type_info_dict,
-                                    verbose=verbose)
-    event_type_frames_dict = frames_collections(event_type_frame_collections=sampled_corpus,
-                                                verbose=verbose)
-    frame_freq_dict = frame_stats(event_type_frames_dict=event_type_frames_dict,
-                                    verbose=verbose)
-    fficf_dict = ff_icf(collections=sampled_corpus,
-                        event_type_frames_dict=event_type_frames_dict,
-                        frame_freq_dict=frame_freq_dict,
-                        verbose=verbose)
+        sampled_documents = sample_corpus(collections=corpus.documents,
+                                        verbose=verbose,
+                                        seed=seed)
+        with stage(instrumentation, 'frame_stats', documents=sum(len(documents) for documents in sampled_documents.values())):
+            sampled_event_types, frames, frame_counts = corpus.frame_count_matrix(sampled_documents)
+            frame_freq_dict = matrix_stats(sampled_event_types, frames, frame_counts)
+        if verbose >= 2:
+            for event_type, row in zip(sampled_event_types, frame_counts):
+                print(f'{event_type}: {row.sum()} frames')
+        fficf_dict = ff_icf_from_matrix(event_types=sampled_event_types,
+                                        frames=frames,
+                                        count_matrix=frame_counts,
+                                        total_n_docs=sum(len(documents) for documents in sampled_documents.values()),
+                                        verbose=verbose,
+                                        top_k=top_k,
+                                        instrumentation=instrumentation)
+    if output_folder != None:
+        create_output_folder(output_folder=output_folder,
+                            start_from_scratch=start_from_scratch,
+                            verbose=verbose)
     scores_to_format(fficf_dict=fficf_dict,
                         frame_freq_dict=frame_freq_dict,
                         output_folder=output_folder,
-                        start_from_scratch=start_from_scratch,
+                        start_from_scratch=False,
                         event_types=event_types,
-                        verbose=verbose)
-    scores_to_json(fficf_dict=fficf_dict,
-                    output_folder=output_folder,
-                    start_from_scratch=start_from_scratch,
-                    verbose=verbose)
+                        verbose=verbose,
+                        file_format=export_format,
+                        instrumentation=instrumentation)
+    if json_format == 'files':
+        scores_to_json(fficf_dict=fficf_dict,
+                        output_folder=output_folder,
+                        start_from_scratch=False,
+                        verbose=verbose,
+                        instrumentation=instrumentation)
+    else:
+        scores_to_bulk_json(fficf_dict=fficf_dict,
+                            output_folder=output_folder,
+                            start_from_scratch=False,
+                            verbose=verbose,
+                            bulk_format=json_format,
+                            instrumentation=instrumentation)
     return
@@ -1,32 +1,27 @@
-from lxml import etree
-import numpy
-from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer
 import operator
-import pandas as pd
-import requests
 import json
 from collections import defaultdict, Counter
 import re
+from xml_utils import NafIndex
+from vocab_utils import FrameVocabulary
+from label_utils import LabelResolver
 
 ###GET FF-ICF PER EVENT TYPE###
 
+TOKEN_PATTERN = r"(?u)\b\w\w+\b"
+
 def frames_naf_predicate(path_to_doc, frame_to_info, languages={'en'}):
     """Load a NAF file, extract the frames from their predicate layers and add them to a list."""
-    doc_tree = etree.parse(path_to_doc) #parse the NAF file
-    root = doc_tree.getroot()
+    naf_index = NafIndex.from_naf(path_to_doc) #index the NAF file in one pass
 
-    lang = root.get('{http://www.w3.org/XML/1998/namespace}lang')
-    if lang not in languages:
+    if naf_index.language not in languages:
         return []
 
     frames = []
 
-    if root.find('srl') in root:
-        for predicate in root.find('srl'):
-            ext_ref_el = predicate.find('externalReferences/externalRef')
-            uri = ext_ref_el.get('reference')
-            label = frame_to_info[uri]['frame_label']
-            frames.append(label) #append the frames to a list
+    for uri in naf_index.predicate_uris:
+        label = frame_to_info[uri]['frame_label']
+        frames.append(label) #append the frames to a list
     return frames
 
 def frames_collection(collection, frame_to_info):
@@ -48,17 +43,19 @@ def frames_collections(event_types, collection_of_collections, frame_to_info):
 
 def contrastive_analysis(event_type_frames_dict):
     """returns a dictionary with event type as key and a sorted list of frames and their tf-idf values"""
-    lists_frames = []
+    counters = []
 
     for key in event_type_frames_dict: #iterate over the key:value (event type:list of frames) pairs
-        values = event_type_frames_dict[key] #create a variable for each list of frames
-        space = ' '
-        space = space.join(values) #join the frames
-        lists_frames.append(space) #append the string to a list
-
-    vectorizer = CountVectorizer() #frame vocabulary
-    lists_vector_data = vectorizer.fit_transform(lists_frames) #data structure that represents the instances through their vectors
-    column_headers = vectorizer.get_feature_names() #frame vocabulary mapped to data columns
+        counter = Counter()
+        for frame in event_type_frames_dict[key]:
+            counter.update(re.findall(TOKEN_PATTERN, frame.lower())) #same tokens as the default CountVectorizer
+        counters.append(counter)
+
+    vocabulary = FrameVocabulary.from_counters(counters) #frame vocabulary
+    lists_vector_data = vocabulary.count_matrix(counters) #data structure that represents the instances through their vectors
+    column_headers = vocabulary.labels #frame vocabulary mapped to data columns
+    import numpy #numpy and scikit-learn are loaded on the first analysis
+    from sklearn.feature_extraction.text import TfidfTransformer
     tfidf_transformer = TfidfTransformer()
     lists_frames_tfidf = tfidf_transformer.fit_transform(lists_vector_data)
     tf_idf_array = lists_frames_tfidf.toarray() #apply tf-idf
@@ -87,6 +84,7 @@ def output_tfidf_to_format(tf_idf_dict):
                 one_row.append('') #append placeholder for validation
                 list_of_lists.append(one_row) #append the list to a list of lists
 
+    import pandas as pd
     df = pd.DataFrame(list_of_lists, columns=headers) #turn the list into a table
 
     df.to_excel('tf_idf.xlsx', index=False) #export the table to an excel file
@@ -117,17 +115,25 @@ def validation_to_json(tf_idf_dict, output_path):
 
 ### CONVERT WIKIDATA IDENTIFIER TO ENTITY NAME ###
 
-def get_entity_name(identifier):
-    """returns name of the event type for a given identifier in wikidata"""
-    r = requests.get(f"https://www.wikidata.org/entity/{identifier}.json")
-    data = json.loads(r.text)
-    return data["entities"][identifier]["labels"]["en"]["value"]
-
-def get_entity_list(event_types):
-    """returns a list with the wikidata identifiers converted to their entity name"""
-    entity_list = []
-
-    for identifier in event_types:
-        entity = get_entity_name(identifier)
-        entity_list.append(entity)
+def get_entity_name(identifier, resolver=None):
+    """
+    returns name of the event type for a given identifier in wikidata
+    :param resolver: label resolver with a persistent cache, by default a resolver with a cache in memory
+    :type resolver: LabelResolver
+    """
+    if resolver == None:
+        resolver = LabelResolver()
+    return resolver.label(identifier, strict=True)
+
+def get_entity_list(event_types, resolver=None):
+    """
+    returns a list with the wikidata identifiers converted to their entity name.
+    the identifiers that are not in the cache of the resolver are fetched concurrently.
+    :param resolver: label resolver with a persistent cache, by default a resolver with a cache in memory
+    :type resolver: LabelResolver
+    """
+    if resolver == None:
+        resolver = LabelResolver()
+    labels = resolver.resolve(event_types, strict=True)
+    entity_list = [labels[identifier] for identifier in event_types]
     return entity_list
@@ -0,0 +1,62 @@
+from collections import Counter
+
+class FrameVocabulary(object):
+    """
+    Interns frame labels as integer ids, which are the column indices of the event type x frame count matrix.
+    the labels passed at construction get ids in sorted order, labels added later are appended.
+    """
+    def __init__(self, labels=()):
+        self.labels = sorted(set(labels))
+        self.ids = {label: index for index, label in enumerate(self.labels)}
+
+    @classmethod
+    def from_counters(cls, counters):
+        """create the vocabulary of all frames in a collection of frame counters"""
+        labels = set()
+        for counter in counters:
+            labels.update(counter)
+        return cls(labels)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __contains__(self, label):
+        return label in self.ids
+
+    def add(self, label):
+        """returns the id of a label, adding it to the vocabulary if it is new"""
+        if label not in self.ids:
+            self.ids[label] = len(self.labels)
+            self.labels.append(label)
+        return self.ids[label]
+
+    def count_matrix(self, counters):
+        """
+        returns a scipy csr matrix with a row of absolute frame frequencies per counter.
+        :param counters: frame counters, e.g. one Counter per event type
+        :type counters: list
+        """
+        import numpy as np
+        from scipy.sparse import csr_matrix
+        indptr = [0]
+        indices = []
+        data = []
+
+        for counter in counters:
+            for label, freq in counter.items():
+                indices.append(self.ids[label])
+                data.append(freq)
+            indptr.append(len(indices))
+
+        matrix = csr_matrix((np.array(data, dtype=np.int64), np.array(indices, dtype=np.int64), np.array(indptr, dtype=np.int64)),
+                            shape=(len(indptr) - 1, len(self.labels)))
+        matrix.sort_indices()
+        return matrix
+
+def frame_counters(event_type_frames_dict):
+    """
+    returns a dictionary with event type as key and a Counter of its frames as value
+    :param event_type_frames_dict: dictionary with for each event type a list of corresponding frames
+    :type event_type_frames_dict: dictionary
+    """
+    return {event_type: Counter(frames) for event_type, frames in event_type_frames_dict.items()}
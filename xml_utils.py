@@ -1,6 +1,242 @@
 import os
 from lxml import etree
 from collections import defaultdict
+try:
+    from .archive_utils import open_naf
+except ImportError: #imported as a top-level module by typical_utils
+    from archive_utils import open_naf
+
+EXTRACTOR_VERSION = 2 # increase when the output of NafIndex.frame_info_dict changes, this invalidates cached frame info
+NAF_ITEM_TAGS = ('NAF', 'fileDesc', 'wf', 'term', 'dep', 'predicate')
+NAF_LAYERS = {'NAF': None, 'fileDesc': 'nafHeader', 'wf': 'text', 'term': 'terms', 'dep': 'deps', 'predicate': 'srl'} # tag -> tag of the parent layer
+XML_LANG = '{http://www.w3.org/XML/1998/namespace}lang'
+ARTICLES = {'a': False, 'an': False, 'the': True}
+
+def iter_naf_elements(naf_root, tags=NAF_ITEM_TAGS):
+    """
+    Stream a NAF file and yield the elements with the given tags. Each element is freed after use.
+    the elements of NAF_LAYERS are only yielded as a child of their layer, e.g. a term only in the terms layer, like the tree-based extraction functions.
+    compressed NAF files and NAF files in archives are parsed from the decompression stream, see archive_utils.open_naf.
+    :param naf_root: path or archive reference to a NAF file, or a file object
+    :param tags: the element tags to yield
+    :type naf_root: string
+    :type tags: tuple
+    """
+    if isinstance(naf_root, str):
+        with open_naf(naf_root) as infile:
+            yield from iter_naf_elements(infile, tags=tags)
+        return
+
+    context = etree.iterparse(naf_root, events=('end',), tag=tags)
+    for event, element in context:
+        if element.tag in NAF_LAYERS:
+            parent = element.getparent()
+            layer = None if parent is None else parent.tag
+            if layer != NAF_LAYERS[element.tag]:
+                continue #e.g. a term nested in another layer, it is not cleared as it belongs to its parent
+        yield element
+        element.clear()
+        while element.getprevious() is not None:
+            del element.getparent()[0]
+    del context
+
+def frame_label(uri):
+    """convert a PreMOn frame uri to a capitalized FrameNet label"""
+    frame = uri[35:]
+    label = frame[0].upper() + frame[1:]
+    return label
+
+class NafIndex(object):
+    """
+    Compact index of the layers of one NAF document with direct lookups for terms, sentences, determiners and compounds.
+    terms map a term id to a (lemma, POS, wf) tuple, wf_sentences map a wf id to its sentence, determiners map
+    a head term id to its determiner term id and compounds map a term id to a (component, other term id) tuple.
+    """
+    __slots__ = ('title', 'language', 'frames', 'predicate_uris', 'terms', 'wf_sentences', 'determiners', 'compounds')
+
+    def __init__(self, title=None, language=None):
+        self.title = title
+        self.language = language
+        self.frames = {}
+        self.predicate_uris = []
+        self.terms = {}
+        self.wf_sentences = {}
+        self.determiners = {}
+        self.compounds = {}
+
+    @classmethod
+    def from_naf(cls, naf_root):
+        """
+        build the index from a NAF file in a single streaming pass.
+        :param naf_root: path to a NAF file or a file object
+        :type naf_root: string
+        """
+        index = cls()
+        frames = index.frames
+        terms = index.terms
+        wf_sentences = index.wf_sentences
+
+        for element in iter_naf_elements(naf_root):
+            tag = element.tag
+            if tag == 'wf':
+                wf_sentences[element.get('id')] = element.get('sent')
+            elif tag == 'term':
+                target = element.find('span/target')
+                terms[element.get('id')] = (element.get('lemma'), element.get('pos'), target.get('id'))
+            elif tag == 'dep':
+                rfunc = element.get('rfunc')
+                if rfunc == "compound":
+                    head_id = element.get('from')
+                    modifier_id = element.get('to')
+                    index.compounds[head_id] = ('head', modifier_id)
+                    index.compounds[modifier_id] = ('modifier', head_id)
+                elif rfunc == "det":
+                    index.determiners[element.get('from')] = element.get('to')
+            elif tag == 'predicate':
+                ext_ref_el = element.find('externalReferences/externalRef')
+                uri = ext_ref_el.get('reference')
+                target = element.find('span/target')
+                frames[target.get('id')] = frame_label(uri)
+                index.predicate_uris.append(uri)
+            elif tag == 'fileDesc':
+                index.title = element.get('title')
+            elif tag == 'NAF':
+                index.language = element.get(XML_LANG)
+        return index
+
+    @classmethod
+    def from_dicts(cls, title, framedict, lemmadict, sentencedict, detdict, compounddict):
+        """build the index from the dictionaries returned by the separate extraction functions"""
+        index = cls(title=title)
+        index.frames = dict(framedict)
+        for term_id, lemmapos in lemmadict.items():
+            index.terms[term_id] = (lemmapos['lemma'], lemmapos['POS'], lemmapos['wf'])
+        for sentence, wfs in sentencedict.items():
+            for wf in wfs:
+                index.wf_sentences[wf] = sentence
+        for predicate_id, det_info in detdict.items():
+            index.determiners[predicate_id] = det_info['det id']
+        for term_id, compound_info in compounddict.items():
+            if compound_info['component'] == 'head':
+                index.compounds[term_id] = ('head', compound_info['modifier id'])
+            else:
+                index.compounds[term_id] = ('modifier', compound_info['head id'])
+        return index
+
+    def lemma(self, term_id):
+        """return the lemma of a term or None if the term is not in the terms layer"""
+        term = self.terms.get(term_id)
+        if term is None:
+            return None
+        return term[0]
+
+    def sentence(self, term_id):
+        """return the sentence of a term or None if it cannot be found"""
+        term = self.terms.get(term_id)
+        if term is None:
+            return None
+        return self.wf_sentences.get(term[2])
+
+    def article(self, term_id):
+        """return the article info of a term"""
+        det_lemma = self.lemma(self.determiners.get(term_id))
+        if det_lemma in ARTICLES:
+            return {"definite": ARTICLES[det_lemma], "lemma": det_lemma}
+        return {"definite": None, "lemma": None}
+
+    def compound(self, term_id):
+        """return the compound info of a term"""
+        if term_id in self.compounds:
+            component, other_id = self.compounds[term_id]
+            lemma = self.lemma(term_id)
+            other_lemma = self.lemma(other_id)
+            if lemma is not None and other_lemma is not None:
+                if component == 'head':
+                    return {"function": "head", "lemma": f"{other_lemma} {lemma}"}
+                return {"function": "modifier", "lemma": f"{lemma} {other_lemma}"}
+        return {"function": None, "lemma": None}
+
+    def to_dicts(self):
+        """return the title, frame, lemma, sentence, determiner and compound dictionaries of the separate extraction functions"""
+        lemmadict = {}
+        sentencedict = defaultdict(set)
+        detdict = {}
+        compounddict = {}
+
+        for term_id, (lemma, pos, wf) in self.terms.items():
+            lemmadict[term_id] = {"lemma": lemma, "POS": pos, "wf": wf}
+        for wf, sentence in self.wf_sentences.items():
+            sentencedict[sentence].add(wf)
+        for predicate_id, det_id in self.determiners.items():
+            detdict[predicate_id] = {"det id": det_id}
+        for term_id, (component, other_id) in self.compounds.items():
+            if component == 'head':
+                compounddict[term_id] = {"component": 'head', "modifier id": other_id}
+            else:
+                compounddict[term_id] = {"component": 'modifier', "head id": other_id}
+        return self.title, dict(self.frames), lemmadict, sentencedict, detdict, compounddict
+
+    def frame_info_dict(self):
+        """create the frame_info_dict of the document in one pass over its predicates"""
+        id_info_dict = {}
+
+        for term_id, frame in self.frames.items():
+            term = self.terms.get(term_id)
+            if term is not None:
+                info_dict = {"frame": frame, "lemma": term[0], "POS": term[1]}
+                sentence = self.wf_sentences.get(term[2])
+                if sentence is not None:
+                    info_dict['sentence'] = sentence
+            else:
+                info_dict = {"frame": frame, "lemma": None, "POS": None}
+            info_dict['article'] = self.article(term_id)
+            info_dict['compound'] = self.compound(term_id)
+            id_info_dict[term_id] = info_dict
+
+        frame_info_dict = {self.title: {'frame frequency': len(self.frames), 'frame info': id_info_dict}}
+        return frame_info_dict
+
+def stream_naf_info(naf_root):
+    """
+    Load a NAF file in a single streaming pass and extract the title, frames, lemmas, sentences, determiners and compounds.
+    returns the same dictionaries as get_text_title, srl_id_frames, term_id_lemmas, sentence_info, determiner_id_info and compound_id_info.
+    :param naf_root: path to a NAF file or a file object
+    :type naf_root: string
+    """
+    return NafIndex.from_naf(naf_root).to_dicts()
+
+def parse_naf_info(naf_root):
+    """
+    Load a NAF file as a tree and extract the title, frames, lemmas, sentences, determiners and compounds with the separate extraction functions.
+    returns the same dictionaries as stream_naf_info.
+    :param naf_root: path to a NAF file or a file object
+    :type naf_root: string
+    """
+    if isinstance(naf_root, str):
+        with open_naf(naf_root) as infile:
+            return parse_naf_info(infile)
+
+    root = etree.parse(naf_root).getroot()
+    return (get_text_title(root),
+            srl_id_frames(root),
+            term_id_lemmas(root),
+            sentence_info(root),
+            determiner_id_info(root),
+            compound_id_info(root))
+
+def count_srl_predicates(naf_root):
+    """
+    count the annotated frames of a NAF file by streaming only its SRL predicates.
+    the count equals the 'frame frequency' in the output of frame_info.
+    :param naf_root: path to a NAF file or a file object
+    :type naf_root: string
+    """
+    target_ids = set()
+
+    for predicate in iter_naf_elements(naf_root, tags=('predicate',)):
+        target = predicate.find('span/target')
+        target_ids.add(target.get('id'))
+    return len(target_ids)
 
 def get_text_title(root):
     """extract text title from NAF"""
@@ -81,58 +317,10 @@ def frame_info_dict(title,
                     detdict,
                     compounddict):
     """integrate different dictionaries extracted from naf in order to create a frame_info_dict"""
-    frame_info_dict = {}
-    id_info_dict = {}
-    term_id_dict = {}
-    frame_freq_dict = {}
-    counter = 0
-
-    for term_id in framedict:
-        counter += 1
-        if term_id in lemmadict:
-            frame = framedict[term_id]
-            lemma = lemmadict[term_id]['lemma']
-            pos = lemmadict[term_id]['POS']
-            wf = lemmadict[term_id]['wf']
-            info_dict = {"frame": frame, "lemma": lemma, "POS": pos}
-            for sentence, words in sentencedict.items():
-                if wf in words:
-                    info_dict['sentence'] = sentence
-        if term_id in detdict:
-            det_id = detdict[term_id]['det id']
-            if det_id in lemmadict and (lemmadict[det_id]['lemma'] == 'an' or lemmadict[det_id]['lemma'] == 'a' or lemmadict[det_id]['lemma'] == 'the'):
-                article = lemmadict[det_id]['lemma']
-                if article == 'a' or article == 'an':
-                    definite_dict = {"definite": False, "lemma": article}
-                    info_dict['article'] = definite_dict
-                else:
-                    definite_dict = {"definite": True, "lemma": article}
-                    info_dict['article'] = definite_dict
-            else:
-                info_dict['article'] = {"definite": None, "lemma": None}
-        else:
-            info_dict['article'] = {"definite": None, "lemma": None}
-
-        if term_id in compounddict:
-            if compounddict[term_id]['component'] == 'head':
-                modifier_id = compounddict[term_id]['modifier id']
-                if modifier_id in lemmadict:
-                    modifier = lemmadict[modifier_id]['lemma']
-                if term_id in lemmadict:
-                    head = lemmadict[term_id]['lemma']
-                    compound = f"{modifier} {head}"
-                    info_dict["compound"] = {"function": "head", "lemma": compound}
-            if compounddict[term_id]['component'] == 'modifier':
-                head_id = compounddict[term_id]['head id']
-                if head_id in lemmadict:
-                    head = lemmadict[head_id]['lemma']
-                if term_id in lemmadict:
-                    modifier = lemmadict[term_id]['lemma']
-                    compound = f"{modifier} {head}"
-                    info_dict["compound"] = {"function": "modifier", "lemma": compound}
-        else:
-            info_dict["compound"] = {"function": None, "lemma": None}
-        id_info_dict[term_id] = info_dict
-
-    frame_info_dict[title] = {'frame frequency': counter, 'frame info': id_info_dict}
-    return frame_info_dict
+    index = NafIndex.from_dicts(title=title,
+                                framedict=framedict,
+                                lemmadict=lemmadict,
+                                sentencedict=sentencedict,
+                                detdict=detdict,
+                                compounddict=compounddict)
+    return index.frame_info_dict()